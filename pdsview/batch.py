@@ -0,0 +1,155 @@
+"""Measure one Region of Interest in every image of an image set"""
+
+import sys
+import math
+import csv
+import warnings
+from functools import partial
+from collections import namedtuple
+from multiprocessing import cpu_count
+from concurrent.futures import ThreadPoolExecutor
+
+from .reader import read_product, band_arrays
+from .stats import roi_stats
+
+
+#: The statistics of the Region of Interest in one channel of an image
+ROIRow = namedtuple(
+    'ROIRow',
+    ['image', 'filepath', 'pixels', 'mean', 'std_dev', 'median', 'minimum',
+     'maximum'])
+
+#: The header of the exported CSV files
+CSV_HEADER = [
+    'Image', 'File', 'Pixels', 'Mean', 'Std Dev', 'Median', 'Min', 'Max']
+
+
+class ROIMeasurement(object):
+    """The statistics of a Region of Interest in every image of a set
+
+    Each product is opened and measured by a thread of a pool, so reading
+    the next products overlaps measuring the current ones. Images that are
+    already loaded are measured without being read again. Mapped products
+    only read the pages of the Region of Interest.
+
+    Iterating over the measurement starts it if needed and yields a
+    :data:`ROIRow` for each channel of each image, in the order of the
+    images, as soon as it is measured. Products that cannot be opened are
+    skipped with a warning.
+
+    Parameters
+    ----------
+    images : :obj:`list`
+        The channels of each image (see :attr:`ImageSet.images`)
+    left : :obj:`float`
+        The x coordinate value of the left side of the Region of Interest
+    bottom : :obj:`float`
+        The y coordinate value of the bottom side of the Region of Interest
+    right : :obj:`float`
+        The x coordinate value of the right side of the Region of Interest
+    top : :obj:`float`
+        The y coordinate value of the top side of the Region of Interest
+    max_workers : :obj:`int`
+        The number of threads, twice the number of processors by default
+    """
+
+    def __init__(self, images, left, bottom, right, top, max_workers=None):
+        self.images = list(images)
+        self.sides = tuple(
+            int(math.ceil(side)) for side in (left, bottom, right, top))
+        self.max_workers = max_workers or 2 * cpu_count()
+        self._futures = None
+
+    def __len__(self):
+        return sum(len(channels) for channels in self.images)
+
+    def __iter__(self):
+        self.start()
+        for future in self._futures:
+            for row in _rows(future):
+                yield row
+
+    def start(self, done=None):
+        """Start measuring the images if not started yet
+
+        Parameters
+        ----------
+        done : callable
+            Called with the index of each image and its rows once it has been
+            measured, from the thread that measured it. The rows are empty
+            when the product cannot be opened
+        """
+        if self._futures is not None:
+            return
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        self._futures = []
+        for index, channels in enumerate(self.images):
+            future = executor.submit(_measure, channels, self.sides)
+            if done is not None:
+                future.add_done_callback(partial(_report, done, index))
+            self._futures.append(future)
+        # The threads stop once the submitted images are measured
+        executor.shutdown(wait=False)
+
+    def cancel(self):
+        """Drop the images that have not started being measured"""
+        for future in self._futures or []:
+            future.cancel()
+
+    def write_csv(self, path):
+        """Write the statistics to a CSV file, waiting for all of them"""
+        write_csv(self, path)
+
+
+def write_csv(rows, path):
+    """Write the statistics of a Region of Interest to a CSV file
+
+    Parameters
+    ----------
+    rows : :obj:`list`
+        The :data:`ROIRow` of each channel
+    path : :obj:`str`
+        The path of the CSV file
+    """
+    if sys.version_info[0] < 3:
+        csv_file = open(path, 'wb')
+    else:
+        csv_file = open(path, 'w', newline='')
+    with csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(CSV_HEADER)
+        for row in rows:
+            writer.writerow(row)
+
+
+def _measure(channels, sides):
+    filepath = channels[0].filepath
+    # The data is taken once, the viewer may release it at any time and
+    # loading it again is only safe in the viewer's thread
+    band_data = [image._band_data for image in channels]
+    try:
+        if any(data is None for data in band_data):
+            pds_image, image_data = read_product(
+                filepath, channels[0].label, channels[0].layout)
+            band_data = band_arrays(image_data, len(channels))
+    except Exception:
+        warnings.warn(filepath + " cannnot be opened")
+        return []
+    x1, y1, x2, y2 = sides
+    rows = []
+    for image, data in zip(channels, band_data):
+        stats = roi_stats(data[y1:y2, x1:x2], by_band=False)
+        rows.append(ROIRow(
+            image.image_name, filepath, stats.count, stats.mean,
+            stats.std_dev, stats.median, stats.minimum, stats.maximum))
+    return rows
+
+
+def _rows(future):
+    if future.cancelled():
+        return []
+    return future.result()
+
+
+def _report(done, index, future):
+    done(index, _rows(future))
@@ -0,0 +1,209 @@
+"""Keep the data of the most recently viewed images within a byte budget"""
+
+import threading
+from collections import OrderedDict
+
+
+#: The number of Region of Interest statistics a StatsCache keeps
+STATS_CACHE_ENTRIES = 256
+
+
+class ImageCache(object):
+    """Least recently viewed cache of the products' data in an image set
+
+    The channels of each product are tracked by their filepath. When the data
+    of the loaded products takes more than ``max_bytes``, the data of the least
+    recently viewed products is released with :meth:`ImageStamp.unload`. The
+    images keep their label and view parameters and load their data again
+    when they are next used.
+
+    Parameters
+    ----------
+    max_bytes : :obj:`int`
+        The number of bytes of data to keep in memory
+
+    Attributes
+    ----------
+    hits : :obj:`int`
+        The number of times a viewed product's data was in memory
+    misses : :obj:`int`
+        The number of times a viewed product's data had to be loaded
+    evictions : :obj:`int`
+        The number of times a product's data was released
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, filepath):
+        return filepath in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def resident_bytes(self):
+        """:obj:`int` The number of bytes of data in memory
+
+        Data mapped from the products is left out, it costs hardly any
+        memory and is not released to stay within ``max_bytes``.
+        """
+        return sum(nbytes for channels, nbytes in self._entries.values())
+
+    @property
+    def mapped_bytes(self):
+        """:obj:`int` The number of bytes of data mapped from the products"""
+        return sum(
+            image.mapped_bytes for channels, nbytes in self._entries.values()
+            for image in channels)
+
+    @property
+    def hit_rate(self):
+        """:obj:`float` The fraction of views served from memory"""
+        views = self.hits + self.misses
+        if views == 0:
+            return 0.0
+        return self.hits / float(views)
+
+    def use(self, channels):
+        """Record that the channels of a product are being viewed
+
+        Parameters
+        ----------
+        channels : :obj:`list`
+            The :class:`ImageStamp` of each channel of the product
+        """
+        filepath = channels[0].filepath
+        if filepath in self._entries:
+            self.hits += 1
+            # The size changes when a composite image is set on a channel
+            self._entries[filepath] = (channels, _nbytes(channels))
+            self._move_to_end(filepath)
+        else:
+            self.misses += 1
+
+    def add(self, channels, keep=()):
+        """Track the channels of a product once their data is loaded
+
+        Parameters
+        ----------
+        channels : :obj:`list`
+            The :class:`ImageStamp` of each channel of the product
+        keep : :obj:`list`
+            The filepaths of products that must not be released, such as the
+            displayed product
+        """
+        filepath = channels[0].filepath
+        self._entries[filepath] = (channels, _nbytes(channels))
+        self._move_to_end(filepath)
+        self.evict(keep=set(keep) | {filepath})
+
+    def evict(self, keep=()):
+        """Release the least recently viewed data until it fits the budget
+
+        Parameters
+        ----------
+        keep : :obj:`set`
+            The filepaths of products that must not be released
+        """
+        resident_bytes = self.resident_bytes
+        for filepath in list(self._entries):
+            if resident_bytes <= self.max_bytes:
+                break
+            if filepath in keep:
+                continue
+            channels, nbytes = self._entries.pop(filepath)
+            for image in channels:
+                image.unload()
+            resident_bytes -= nbytes
+            self.evictions += 1
+
+    def _move_to_end(self, filepath):
+        # OrderedDict.move_to_end is not available in python 2
+        self._entries[filepath] = self._entries.pop(filepath)
+
+
+class StatsCache(object):
+    """Least recently used cache of Region of Interest statistics
+
+    The statistics are stored under a key that identifies the data they
+    describe, such as the image, its data version and the pixels of the
+    Region of Interest (see :meth:`ImageSet.ROI_stats`). Statistics of data
+    that has since changed are never found again and are the first to be
+    dropped. Statistics may be calculated and stored from other threads.
+
+    Parameters
+    ----------
+    max_entries : :obj:`int`
+        The number of statistics to keep
+
+    Attributes
+    ----------
+    hits : :obj:`int`
+        The number of times statistics were found in the cache
+    misses : :obj:`int`
+        The number of times statistics had to be calculated
+    evictions : :obj:`int`
+        The number of times statistics were dropped to make room
+    """
+
+    def __init__(self, max_entries=STATS_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def hit_rate(self):
+        """:obj:`float` The fraction of lookups served from the cache"""
+        lookups = self.hits + self.misses
+        if lookups == 0:
+            return 0.0
+        return self.hits / float(lookups)
+
+    def get(self, key, calculate):
+        """The statistics stored under the key, calculating them if needed
+
+        Parameters
+        ----------
+        key : :obj:`tuple`
+            Identifies the data the statistics describe
+        calculate : callable
+            Called without arguments to calculate the statistics when they
+            are not in the cache
+        """
+        with self._lock:
+            if key in self._entries:
+                self.hits += 1
+                stats = self._entries.pop(key)
+                self._entries[key] = stats
+                return stats
+            self.misses += 1
+        # Other lookups go on while the statistics are calculated
+        stats = calculate()
+        with self._lock:
+            self._entries[key] = stats
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def _nbytes(channels):
+    return sum(image.nbytes for image in channels)
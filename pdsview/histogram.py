@@ -1,17 +1,39 @@
+import math
 import warnings
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
 from matplotlib.figure import Figure
+from matplotlib.patches import Polygon
 from qtpy import QtWidgets, QtCore
 from qtpy import QT_VERSION
 
 from .warningtimer import WarningTimer, WarningTimerModel
+from .cache import StatsCache
+from .stats import value_counts
 qt_ver = int(QT_VERSION[0])
 if qt_ver == 4:
     from matplotlib.backends.backend_qt4agg import FigureCanvasQTAgg
 elif qt_ver == 5:
     from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg
 
+#: The number of histograms a HistogramModel keeps
+HISTOGRAM_CACHE_ENTRIES = 64
+
+#: The number of fine histograms a HistogramModel keeps
+BASE_HISTOGRAM_CACHE_ENTRIES = 16
+
+#: The number of bins of the fine histogram of images that are not integers
+BASE_HISTOGRAM_BINS = 4096
+
+#: The most pixels read for the histogram of an image before it is refined
+HISTOGRAM_MAX_PIXELS = 2 * 1024 * 1024
+
+#: How long the histogram waits for the user to stop before refining, in ms
+REFINE_DELAY = 500
+
+_executor = ThreadPoolExecutor(max_workers=1)
+
 
 class HistogramModel(object):
     """Model for a Histogram which can apply cut levels to an image
@@ -33,15 +55,34 @@ class HistogramModel(object):
         The higher cut level
     bins : :obj:`int`
         The number of bins the histogram uses
+    max_pixels : :obj:`int`
+        The most pixels read for the histogram of an image. Bigger images are
+        sampled every few lines and samples. None to always read every pixel
+    refine_when_idle : :obj:`bool`
+        Whether the views should find the exact histogram of a sampled image
+        in the background once the user stops changing it
+
+    Attributes
+    ----------
+    histograms : :class:`cache.StatsCache`
+        The most recently used histograms
+    base_histograms : :class:`cache.StatsCache`
+        The most recently used fine histograms
     """
 
-    def __init__(self, image_view, cut_low=None, cut_high=None, bins=100):
+    def __init__(self, image_view, cut_low=None, cut_high=None, bins=100,
+                 max_pixels=HISTOGRAM_MAX_PIXELS, refine_when_idle=True):
 
         self._image_view = image_view
         self._views = set()
         self._cut_low = cut_low
         self._cut_high = cut_high
         self._bins = bins
+        self.max_pixels = max_pixels
+        self.refine_when_idle = refine_when_idle
+        self._refining = {}
+        self.histograms = StatsCache(HISTOGRAM_CACHE_ENTRIES)
+        self.base_histograms = StatsCache(BASE_HISTOGRAM_CACHE_ENTRIES)
 
     @property
     def image_view(self):
@@ -153,6 +194,140 @@ class HistogramModel(object):
         """:class:`ndarray` The current image data"""
         return self.image_view.get_image().get_data()
 
+    @property
+    def value_range(self):
+        """:obj:`tuple` The smallest and largest finite values of the image"""
+        return tuple(self.image_view.get_image().get_minmax(noinf=True))
+
+    def base_histogram(self):
+        """The fine histogram the histograms of the current image are made of
+
+        Integers of up to 16 bits have a bin for each value, other images
+        have :data:`BASE_HISTOGRAM_BINS` bins across their range of values.
+        The pixels are read once for each image and version of its data, and
+        the fine histogram is kept in :attr:`base_histograms`.
+
+        Images with more than :attr:`max_pixels` pixels are sampled every
+        :attr:`sample_step` lines and samples, always the same pixels of an
+        image, until :meth:`refine` has found their exact histogram.
+
+        Returns
+        -------
+        counts : :class:`ndarray`
+            The number of sampled pixels in each fine bin
+        centers : :class:`ndarray`
+            The value at the center of each fine bin
+        scale : :obj:`float`
+            The number of pixels of the image for each sampled pixel, 1 when
+            every pixel was read
+        """
+        image = self.image_view.get_image()
+        data = image.get_data()
+        value_range = self.value_range
+        key = (image, getattr(image, 'data_key', None), value_range)
+        step = self.sample_step
+        return self.base_histograms.get(
+            key + (step,), lambda: _base_histogram(data, value_range, step))
+
+    @property
+    def sample_step(self):
+        """:obj:`int` The step between the lines and samples read for the
+        histogram of the current image, 1 once it is exact"""
+        self._keep_refined()
+        image = self.image_view.get_image()
+        key = (image, getattr(image, 'data_key', None), self.value_range)
+        if self.max_pixels is None or key + (1,) in self.base_histograms:
+            return 1
+        lines, samples = image.get_data().shape[:2]
+        return max(1, int(math.ceil(
+            math.sqrt(lines * samples / float(self.max_pixels)))))
+
+    @property
+    def sampled(self):
+        """:obj:`bool` Whether the histogram of the current image is sampled
+        """
+        return self.sample_step > 1
+
+    def refine(self):
+        """Find the exact histogram of the current image in the background
+
+        The histogram becomes exact the first time it is asked for after the
+        returned future is done. Refining a different image cancels the
+        refinement that has not started yet.
+
+        Returns
+        -------
+        future : :class:`concurrent.futures.Future`
+            The exact fine histogram, None when the histogram is not sampled
+        """
+        if not self.sampled:
+            return None
+        image = self.image_view.get_image()
+        value_range = self.value_range
+        key = (image, getattr(image, 'data_key', None), value_range, 1)
+        for other_key, future in list(self._refining.items()):
+            if other_key != key and future.cancel():
+                del self._refining[other_key]
+        if key not in self._refining:
+            self._refining[key] = _executor.submit(
+                _base_histogram, image.get_data(), value_range, 1)
+        return self._refining[key]
+
+    def _keep_refined(self):
+        """Keep the exact fine histograms that were found in the background
+        """
+        for key, future in list(self._refining.items()):
+            if future.done():
+                del self._refining[key]
+                if not future.cancelled() and future.exception() is None:
+                    self.base_histograms.get(key, future.result)
+
+    def histogram(self):
+        """The histogram of the current image
+
+        The counts are added up from the bins of :meth:`base_histogram`, so
+        changing the number of bins does not read the pixels again. They are
+        exact for integers of up to 16 bits and when the number of bins
+        divides :data:`BASE_HISTOGRAM_BINS`. Otherwise each fine bin is
+        counted in the bin that holds its center.
+
+        The counts are kept in :attr:`histograms` for each image, the data it
+        displays (its ``data_key``), number of bins and range of values.
+        Flipping back to an image or toggling its RGB composite does not read
+        its pixels again.
+
+        The counts of a sampled image are the sampled counts scaled up to
+        the whole image, see :meth:`sampling_errors`.
+
+        Returns
+        -------
+        counts : :class:`ndarray`
+            The number of pixels in each bin
+        edges : :class:`ndarray`
+            The edges of the bins, one more than the counts
+        """
+        return self._histogram()[:2]
+
+    def sampling_errors(self):
+        """The standard error of each count of :meth:`histogram`
+
+        Returns
+        -------
+        errors : :class:`ndarray`
+            The standard error of the count of each bin from sampling the
+            image, zero when every pixel was read
+        """
+        return self._histogram()[2]
+
+    def _histogram(self):
+        base = self.base_histogram()
+        image = self.image_view.get_image()
+        bins, value_range = self.bins, self.value_range
+        key = (image, getattr(image, 'data_key', None), bins, value_range,
+               base[2])
+        return self.histograms.get(
+            key, lambda: _rebin(base, bins, value_range))
+
     def register(self, view):
         """Register a view with the model
 
@@ -223,6 +398,40 @@ class HistogramModel(object):
             view.change_bins()
 
 
+def _base_histogram(data, value_range, step=1):
+    sample = data[::step, ::step]
+    scale = data.size / float(sample.size) if sample.size else 1.0
+    if data.dtype.kind in 'iu' and data.dtype.itemsize <= 2:
+        values, counts = value_counts(sample)
+        return counts, values, scale
+    # A view of the data is binned, unlike flatten which copies it
+    counts, edges = np.histogram(
+        np.ravel(sample), bins=BASE_HISTOGRAM_BINS, range=value_range)
+    return counts, (edges[:-1] + edges[1:]) / 2.0, scale
+
+
+def _rebin(base_histogram, bins, value_range):
+    """Add up the fine bins in the bins numpy.histogram would use
+
+    The counts of a sample are scaled up to the whole image, with the
+    standard error of a binomial count of the sample.
+    """
+    counts, centers, scale = base_histogram
+    edges = np.histogram_bin_edges([], bins=bins, range=value_range)
+    indices = np.searchsorted(edges, centers, side='right') - 1
+    # The last bin holds its right edge too
+    indices[centers == edges[-1]] = bins - 1
+    inside = (indices >= 0) & (indices < bins)
+    counts = np.bincount(
+        indices[inside], weights=counts[inside], minlength=bins)
+    counts = counts.astype(np.int64)
+    if scale == 1:
+        return counts, edges, np.zeros(bins)
+    total = float(max(1, counts.sum()))
+    errors = scale * np.sqrt(counts * (1 - counts / total))
+    return counts * scale, edges, errors
+
+
 class HistogramController(object):
 
     def __init__(self, model, view):
@@ -368,6 +577,9 @@ class Histogram(FigureCanvasQTAgg):
         The view's model
     """
 
+    # Tells the view on the main thread which image's histogram was refined
+    _refined = QtCore.Signal(object)
+
     def __init__(self, model):
         fig = Figure(figsize=(2, 2), dpi=100)
         fig.subplots_adjust(
@@ -387,6 +599,19 @@ class Histogram(FigureCanvasQTAgg):
         self._ax.set_facecolor('black')
         self._left_vline = None
         self._right_vline = None
+        self._outline = None
+        # The histogram without the cut lines, which are drawn over it
+        self._background = None
+        # Connected once, the lines are found when the mouse moves
+        self.mpl_connect('draw_event', self._draw_vlines)
+        self.mpl_connect('motion_notify_event', self._move_line)
+        self.mpl_connect('button_press_event', self._move_line)
+        # Sampled histograms are refined once the user stops for a moment
+        self._refine_timer = QtCore.QTimer(self)
+        self._refine_timer.setSingleShot(True)
+        self._refine_timer.setInterval(REFINE_DELAY)
+        self._refine_timer.timeout.connect(self.refine)
+        self._refined.connect(self._show_refined)
 
     def change_cut_low(self, draw=True):
         """Change the position of the left line to the low cut level"""
@@ -394,7 +619,7 @@ class Histogram(FigureCanvasQTAgg):
             return
         self._left_vline.set_xdata([self.model.cut_low, self.model.cut_low])
         if draw:
-            self.draw()
+            self.blit_vlines()
 
     def change_cut_high(self, draw=True):
         """Change the position of the right line to the high cut level"""
@@ -402,13 +627,35 @@ class Histogram(FigureCanvasQTAgg):
             return
         self._right_vline.set_xdata([self.model.cut_high, self.model.cut_high])
         if draw:
-            self.draw()
+            self.blit_vlines()
 
     def change_cuts(self):
         """Change the position of the left & right lines to respective cuts"""
         self.change_cut_low(draw=False)
         self.change_cut_high(draw=False)
-        self.draw()
+        self.blit_vlines()
+
+    def blit_vlines(self):
+        """Draw the lines over the histogram without drawing the histogram
+
+        The histogram is drawn again only when it has not been drawn yet.
+        """
+        if self._background is None:
+            self.draw()
+            return
+        self.restore_region(self._background)
+        self._draw_vline_artists()
+        self.blit(self._ax.bbox)
+
+    def _draw_vlines(self, event):
+        # The lines are animated, so a full draw leaves them out
+        self._background = self.copy_from_bbox(self._ax.bbox)
+        self._draw_vline_artists()
+
+    def _draw_vline_artists(self):
+        for vline in (self._left_vline, self._right_vline):
+            if vline is not None:
+                self._ax.draw_artist(vline)
 
     def change_bins(self):
         """Adjust the number of bins without adjusting the lines"""
@@ -423,18 +670,56 @@ class Histogram(FigureCanvasQTAgg):
             Reset the vertical lines to the default cut levels if True,
             otherwise False. True by default
         """
-        self._ax.cla()
-        self._left_vline = None
-        self._right_vline = None
-        self._ax.hist(
-            self.model.data.flatten(), self.model.bins, color='white')
+        self._background = None
+        counts, edges = self.model.histogram()
+        # The counts are drawn as the outline of the bins, a single artist
+        # that is reused with the lines rather than clearing the axes
+        outline = _outline(counts, edges)
+        if self._outline is None:
+            self._outline = Polygon(outline, closed=True, color='white')
+            self._outline.sticky_edges.y.append(0)
+            self._ax.add_patch(self._outline)
+        else:
+            self._outline.set_xy(outline)
         self._set_vlines(reset_vlines)
+        # Fit the axes to the bins and lines, like a new plot of them would
+        cut_low, cut_high = self.model.cuts
+        self._ax.ignore_existing_data_limits = True
+        self._ax.update_datalim([
+            (edges[0], 0), (edges[-1], np.max(counts)), (cut_low, 0),
+            (cut_high, 0)])
+        self._ax.autoscale_view()
         self.draw()
+        if self.model.refine_when_idle and self.model.sampled:
+            self._refine_timer.start()
+
+    def refine(self):
+        """Find the exact histogram in the background and then show it"""
+        future = self.model.refine()
+        if future is not None:
+            refined = self._displayed()
+            future.add_done_callback(
+                lambda future: self._refined.emit(refined))
+
+    def _displayed(self):
+        image = self.model.image_view.get_image()
+        return image, getattr(image, 'data_key', None)
+
+    def _show_refined(self, refined):
+        # The histogram of another image or data is not shown
+        if self._refine_timer.isActive() or refined != self._displayed():
+            return
+        # Keep the cut lines where the user left them
+        self.set_data(False)
 
     def _move_line(self, event):
         # The left mouse button must be down to adjust the cut levels
         if not event.inaxes or event.button != 1:
             return
+        if self._left_vline is None:
+            return
+        if self._refine_timer.isActive():
+            self._refine_timer.start()
         x = event.xdata
         cut_low, cut_high = self.model.cuts
         # Adjust the line that is closer to the point
@@ -447,12 +732,21 @@ class Histogram(FigureCanvasQTAgg):
         if reset:
             self.model.restore()
         cut_low, cut_high = self.model.cuts
+        if self._left_vline is not None:
+            self._left_vline.set_xdata([cut_low, cut_low])
+            self._right_vline.set_xdata([cut_high, cut_high])
+            return
         self._left_vline = self._ax.axvline(
-            cut_low, color='r', linewidth=2)
+            cut_low, color='r', linewidth=2, animated=True)
         self._right_vline = self._ax.axvline(
-            cut_high, color='r', linewidth=2)
-        self._figure.canvas.mpl_connect('motion_notify_event', self._move_line)
-        self._figure.canvas.mpl_connect('button_press_event', self._move_line)
+            cut_high, color='r', linewidth=2, animated=True)
 
     def warn(self, title, message):
         return False
+
+
+def _outline(counts, edges):
+    """The corners of the outline of the bins of a histogram"""
+    x = np.repeat(edges, 2)
+    y = np.concatenate([[0], np.repeat(counts, 2), [0]])
+    return np.column_stack([x, y])
@@ -0,0 +1,119 @@
+"""Remember the labels and image layouts of products between sessions"""
+
+import os
+import sqlite3
+from collections import namedtuple
+
+import numpy as np
+
+
+#: What the index knows about a product. ``layout`` is the data filepath,
+#: offset, dtype and shape of the image object (see
+#: :func:`reader.image_layout`) or None when it cannot be mapped
+IndexEntry = namedtuple('IndexEntry', ['bands', 'label_array', 'layout'])
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    bands INTEGER NOT NULL,
+    label TEXT NOT NULL,
+    data_path TEXT,
+    offset INTEGER,
+    dtype TEXT,
+    lines INTEGER,
+    samples INTEGER
+)
+"""
+
+
+class MetadataIndex(object):
+    """A SQLite file of the labels and layouts of opened products
+
+    Products are keyed on their absolute path, size and modification time, so
+    a product that changed on disk is read again. Looking a product up in the
+    index replaces reading and parsing its label.
+
+    Parameters
+    ----------
+    path : :obj:`str`
+        Path to the index file. It is created when it does not exist
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._connection = sqlite3.connect(path)
+        self._connection.execute(_SCHEMA)
+
+    def get(self, filepath):
+        """Look up a product
+
+        Parameters
+        ----------
+        filepath : :obj:`str`
+            Path to the PDS product
+
+        Returns
+        -------
+        entry : :class:`IndexEntry`
+            None when the product is not in the index or changed since it was
+            added
+        """
+        try:
+            size, mtime = _stat(filepath)
+        except OSError:
+            return None
+        row = self._connection.execute(
+            'SELECT size, mtime, bands, label, data_path, offset, dtype, '
+            'lines, samples FROM products WHERE path = ?',
+            (os.path.abspath(filepath), )
+        ).fetchone()
+        if row is None or (row[0], row[1]) != (size, mtime):
+            return None
+        bands, label, data_path, offset, dtype, lines, samples = row[2:]
+        layout = None
+        if data_path is not None:
+            shape = (bands, lines, samples)
+            layout = (data_path, offset, np.dtype(dtype), shape)
+        return IndexEntry(bands, label.split('\n'), layout)
+
+    def add(self, filepath, bands, label_array, layout=None):
+        """Add or replace a product, see :meth:`commit`
+
+        Parameters
+        ----------
+        filepath : :obj:`str`
+            Path to the PDS product
+        bands : :obj:`int`
+            The number of bands in the image object
+        label_array : :obj:`list`
+            The lines of the label
+        layout : :obj:`tuple`
+            The layout of the image object when it can be mapped
+        """
+        size, mtime = _stat(filepath)
+        data_path = offset = dtype = lines = samples = None
+        if layout is not None:
+            data_path, offset, dtype, shape = layout
+            data_path = os.path.abspath(data_path)
+            dtype = np.dtype(dtype).str
+            lines, samples = shape[1:]
+        self._connection.execute(
+            'INSERT OR REPLACE INTO products VALUES '
+            '(?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (os.path.abspath(filepath), size, mtime, bands,
+             '\n'.join(label_array), data_path, offset, dtype, lines, samples)
+        )
+
+    def commit(self):
+        """Write the added products to the file"""
+        self._connection.commit()
+
+    def close(self):
+        self._connection.close()
+
+
+def _stat(filepath):
+    stat = os.stat(filepath)
+    return stat.st_size, stat.st_mtime
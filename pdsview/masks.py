@@ -0,0 +1,130 @@
+"""Masks of the pixels inside polygon and ellipse Regions of Interest
+
+A pixel is inside a shape when its center is. Pixel centers are at integer
+coordinates, so a mask covers the lines and samples of a bounding box given
+as the first and one past the last sample and line, like
+:meth:`ImageStamp.cutout_data` takes them.
+"""
+
+import math
+
+import numpy as np
+
+
+def polygon_box(points):
+    """The samples and lines whose pixels may be inside a polygon
+
+    Parameters
+    ----------
+    points : :obj:`list`
+        The x and y coordinates of the vertices
+
+    Returns
+    -------
+    box : :obj:`tuple`
+        The first and one past the last sample and line
+    """
+    points = np.asarray(points, dtype=np.float64)
+    x1, y1 = np.ceil(points.min(axis=0))
+    x2, y2 = np.floor(points.max(axis=0)) + 1
+    return int(x1), int(y1), int(x2), int(y2)
+
+
+def polygon_mask(points, box):
+    """The pixels of a bounding box inside a polygon
+
+    Each edge marks where it crosses the line through the center of each
+    line of pixels, and a running parity of the marks along each line fills
+    in the pixels between crossings (the even-odd rule). The crossings of
+    all the edges are found at once, so the time taken grows with the
+    number of crossings and pixels, not with their product.
+
+    Parameters
+    ----------
+    points : :obj:`list`
+        The x and y coordinates of the vertices
+    box : :obj:`tuple`
+        The first and one past the last sample and line of the mask
+
+    Returns
+    -------
+    mask : :class:`numpy.ndarray`
+        Whether each pixel of the box is inside the polygon
+    """
+    x1, y1, x2, y2 = box
+    samples, lines = max(0, x2 - x1), max(0, y2 - y1)
+    points = np.asarray(points, dtype=np.float64)
+    xa, ya = points[:, 0] - x1, points[:, 1] - y1
+    xb, yb = np.roll(xa, -1), np.roll(ya, -1)
+
+    # The lines of pixels whose centers are from the lower end of each edge
+    # up to, but not including, its upper end
+    first = np.clip(np.ceil(np.minimum(ya, yb)), 0, lines).astype(np.int64)
+    last = np.clip(np.ceil(np.maximum(ya, yb)), 0, lines).astype(np.int64)
+    crossed = last - first
+    edges = np.repeat(np.arange(len(points)), crossed)
+    starts = np.repeat(np.cumsum(crossed) - crossed, crossed)
+    rows = first[edges] + np.arange(edges.size) - starts
+
+    # The first sample right of each crossing
+    xa, ya, xb, yb = xa[edges], ya[edges], xb[edges], yb[edges]
+    x = xa + (rows - ya) * (xb - xa) / (yb - ya)
+    columns = np.clip(np.floor(x) + 1, 0, samples).astype(np.int64)
+
+    marks = np.zeros((lines, samples + 1), dtype=np.uint8)
+    np.add.at(marks, (rows, columns), 1)
+    marks &= 1
+    np.bitwise_xor.accumulate(marks, axis=1, out=marks)
+    return marks[:, :samples].view(bool)
+
+
+def ellipse_box(x, y, xradius, yradius, rot_deg=0.0):
+    """The samples and lines whose pixels may be inside an ellipse
+
+    Parameters
+    ----------
+    x, y : :obj:`float`
+        The center of the ellipse
+    xradius, yradius : :obj:`float`
+        The radii of the ellipse before it is rotated
+    rot_deg : :obj:`float`
+        The counterclockwise rotation of the ellipse in degrees
+
+    Returns
+    -------
+    box : :obj:`tuple`
+        The first and one past the last sample and line
+    """
+    theta = math.radians(rot_deg)
+    half_width = math.hypot(xradius * math.cos(theta),
+                            yradius * math.sin(theta))
+    half_height = math.hypot(xradius * math.sin(theta),
+                             yradius * math.cos(theta))
+    return polygon_box([(x - half_width, y - half_height),
+                        (x + half_width, y + half_height)])
+
+
+def ellipse_mask(x, y, xradius, yradius, rot_deg, box):
+    """The pixels of a bounding box inside an ellipse
+
+    Parameters
+    ----------
+    x, y, xradius, yradius, rot_deg : :obj:`float`
+        See :func:`ellipse_box`
+    box : :obj:`tuple`
+        The first and one past the last sample and line of the mask
+
+    Returns
+    -------
+    mask : :class:`numpy.ndarray`
+        Whether each pixel of the box is inside the ellipse
+    """
+    x1, y1, x2, y2 = box
+    theta = math.radians(rot_deg)
+    cos_t, sin_t = math.cos(theta), math.sin(theta)
+    dy = np.arange(y1, y2)[:, np.newaxis] - y
+    dx = np.arange(x1, x2) - x
+    # Rotate the pixel centers back to the axes of the ellipse
+    along = (dx * cos_t + dy * sin_t) / max(xradius, 1e-12)
+    across = (dy * cos_t - dx * sin_t) / max(yradius, 1e-12)
+    return along * along + across * across <= 1.0
@@ -0,0 +1,201 @@
+"""Power of two overviews of large images for drawing them zoomed out"""
+
+import os
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+#: Bands with at least this many pixels get overviews
+OVERVIEW_MIN_PIXELS = 2048 * 2048
+
+#: The smallest overview has no side shorter than this
+OVERVIEW_MIN_SIZE = 256
+
+#: Overviews with more bytes are only kept when they are saved to disk
+OVERVIEW_MAX_BYTES = 64 * 1024 * 1024
+
+#: Where overviews are saved between sessions, None to not save them (see
+#: :class:`OverviewDiskCache`)
+disk_cache = None
+
+_executor = ThreadPoolExecutor(max_workers=1)
+
+
+class OverviewPyramid(object):
+    """Overviews of an image, each half the size of the previous one
+
+    The overviews are averages of 2 x 2 blocks of the level below them. They
+    are built in a background thread, reading the image a strip at a time,
+    or loaded from a :class:`OverviewDiskCache`.
+
+    Parameters
+    ----------
+    data : :class:`numpy.ndarray`
+        The lines and samples of the image
+    key : :obj:`tuple`
+        Identifies the image in the disk cache
+    disk_cache : :class:`OverviewDiskCache`
+        Where the overviews are saved. They are only kept in memory when None
+
+    Attributes
+    ----------
+    depth : :obj:`int`
+        The number of overviews
+    levels : :obj:`dict`
+        The overviews by level once they are built. Level ``k`` is ``2 ** k``
+        times smaller than the image
+    """
+
+    def __init__(self, data, key=None, disk_cache=None):
+        self.data = data
+        self.key = key
+        self.disk_cache = disk_cache
+        self.levels = {}
+        self._future = None
+        lines, samples = data.shape[:2]
+        self.depth = 0
+        while min(lines, samples) >> (self.depth + 1) >= OVERVIEW_MIN_SIZE:
+            self.depth += 1
+
+    @property
+    def ready(self):
+        """:obj:`bool` Whether the overviews have been built"""
+        return self._future is not None and self._future.done()
+
+    def start(self):
+        """Build the overviews in the background if not started yet"""
+        if self._future is None:
+            self._future = _executor.submit(self.build)
+
+    def wait(self):
+        """Wait for the overviews to be built"""
+        self.start()
+        self._future.result()
+
+    def level_for(self, scale):
+        """The overview to draw the image with at a zoom scale
+
+        Parameters
+        ----------
+        scale : :obj:`float`
+            The number of screen pixels per image pixel
+
+        Returns
+        -------
+        overview : :obj:`tuple`
+            The factor the overview is smaller than the image by and the
+            overview. None when no overview is built for the scale
+        """
+        best = None
+        for level in self.levels:
+            if 2 ** level * scale <= 1 and (best is None or level > best):
+                best = level
+        if best is None:
+            return None
+        return 2 ** best, self.levels[best]
+
+    def build(self):
+        """Build or load the overviews, see :meth:`start`"""
+        levels = None
+        if self.disk_cache is not None:
+            levels = self.disk_cache.load(self.key, self.depth)
+        if levels is None:
+            if self.disk_cache is None:
+                levels = self._build(_allocate_in_memory)
+            else:
+                levels = self._build(self.disk_cache.allocator(self.key))
+                levels = self.disk_cache.save(self.key, levels)
+        self.levels = levels
+
+    def _build(self, allocate):
+        lines, samples = self.data.shape[:2]
+        levels = {}
+        for level in range(1, self.depth + 1):
+            overview = allocate(level, (lines >> level, samples >> level))
+            if overview is not None:
+                levels[level] = overview
+        strip = 2 ** self.depth
+        for line in range(0, lines, strip):
+            block = np.asarray(self.data[line:line + strip], dtype=np.float32)
+            for level in range(1, self.depth + 1):
+                block = _halve(block)
+                if level in levels:
+                    first = line >> level
+                    levels[level][first:first + block.shape[0]] = block
+        return levels
+
+
+class OverviewDiskCache(object):
+    """Overviews saved as ``.npy`` files in a directory
+
+    Each image is keyed on the path, size and modification time of its
+    product and its band, so the overviews of a changed product are built
+    again.
+
+    Parameters
+    ----------
+    directory : :obj:`str`
+        The directory to save the overviews in. Created if it does not exist
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    @staticmethod
+    def key(filepath, band):
+        """The key of the band of a product"""
+        stat = os.stat(filepath)
+        return (os.path.abspath(filepath), stat.st_size, stat.st_mtime, band)
+
+    def load(self, key, depth):
+        """The saved overviews of an image, None when they are not saved"""
+        paths = [self._path(key, level) for level in range(1, depth + 1)]
+        if not all(os.path.exists(path) for path in paths):
+            return None
+        return dict(
+            (level, np.load(path, mmap_mode='r'))
+            for level, path in enumerate(paths, 1)
+        )
+
+    def allocator(self, key):
+        """Create the files the overviews of an image are built in"""
+        def allocate(level, shape):
+            return np.lib.format.open_memmap(
+                self._path(key, level) + '.part', mode='w+',
+                dtype=np.float32, shape=shape)
+        return allocate
+
+    def save(self, key, levels):
+        """Finish writing the built overviews and open them read only"""
+        saved = {}
+        for level, overview in levels.items():
+            overview.flush()
+            del overview
+            path = self._path(key, level)
+            os.rename(path + '.part', path)
+            saved[level] = np.load(path, mmap_mode='r')
+        return saved
+
+    def _path(self, key, level):
+        digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, '%s_%d.npy' % (digest, level))
+
+
+def _allocate_in_memory(level, shape):
+    if shape[0] * shape[1] * 4 > OVERVIEW_MAX_BYTES:
+        return None
+    return np.empty(shape, dtype=np.float32)
+
+
+def _halve(block):
+    lines = block.shape[0] // 2 * 2
+    samples = block.shape[1] // 2 * 2
+    block = block[:lines, :samples]
+    return (
+        block[0::2, 0::2] + block[1::2, 0::2] +
+        block[0::2, 1::2] + block[1::2, 1::2]
+    ) / 4
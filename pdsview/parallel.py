@@ -0,0 +1,138 @@
+"""Open products in worker processes"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from planetaryimage import PDS3Image
+
+from .reader import read_label_lines, read_product, MappedPDS3Image
+try:
+    from multiprocessing import shared_memory, resource_tracker
+except ImportError:
+    # Before python 3.8 decoded data is sent back through the pipe
+    shared_memory = None
+
+
+class DecodedPDS3Image(PDS3Image):
+    """A :class:`PDS3Image` with the label and data decoded by a worker
+
+    Parameters
+    ----------
+    filename : :obj:`str`
+        Path to the PDS product
+    label : :class:`pvl.PVLModule`
+        The parsed label of the product
+    data : :class:`numpy.ndarray`
+        The bands, lines and samples of the image object
+    """
+
+    def __init__(self, filename, label, data):
+        self.filename = filename
+        self.compression = None
+        self.label = label
+        self.data = data
+
+
+def open_products(filepaths, max_workers=None):
+    """Open products in worker processes
+
+    The labels are parsed and the images are decoded in the workers. Images
+    that can be mapped into memory (see :class:`MappedPDS3Image`) are mapped
+    again by the calling process, the others are sent back through shared
+    memory.
+
+    Parameters
+    ----------
+    filepaths : :obj:`list`
+        Paths to the PDS products
+    max_workers : :obj:`int`
+        The number of worker processes. The number of processors by default
+
+    Yields
+    ------
+    filepath : :obj:`str`
+        The path of the product, in the order of ``filepaths``
+    product : :obj:`tuple`
+        The :class:`PDS3Image`, its image data (see :func:`read_product`) and
+        the lines of its label. None when the product cannot be opened
+    """
+    if shared_memory is not None:
+        # Start the tracker before the workers so they share it with this
+        # process, which unlinks the blocks the workers create
+        resource_tracker.ensure_running()
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(_open_product, filepath) for filepath in filepaths
+        ]
+        for filepath, future in zip(filepaths, futures):
+            try:
+                product = _receive_product(filepath, *future.result())
+            except Exception:
+                product = None
+            yield filepath, product
+
+
+def _open_product(filepath):
+    label_array = read_label_lines(filepath)
+    pds_image, image_data = read_product(filepath, label_array)
+    label = _pack_label(pds_image.label)
+    if isinstance(pds_image, MappedPDS3Image):
+        # Mapping the file again is cheaper than sending the data
+        return label_array, label, None
+    return label_array, label, _share_array(pds_image.data)
+
+
+def _receive_product(filepath, label_array, label, data):
+    label = _unpack_label(label)
+    if data is None:
+        pds_image = MappedPDS3Image(filepath, label)
+    else:
+        pds_image = DecodedPDS3Image(filepath, label, _receive_array(data))
+    return pds_image, pds_image.image, label_array
+
+
+def _pack_label(module):
+    # pvl modules cannot be pickled, so send their class and items instead
+    items = []
+    for key, value in module.items():
+        if isinstance(value, dict):
+            value = _pack_label(value)
+        items.append((key, value))
+    return type(module), items
+
+
+def _unpack_label(packed):
+    label_type, items = packed
+    label = label_type()
+    for key, value in items:
+        if isinstance(value, tuple) and len(value) == 2 and \
+                isinstance(value[0], type) and issubclass(value[0], dict):
+            value = _unpack_label(value)
+        label.append(key, value)
+    return label
+
+
+def _share_array(data):
+    if shared_memory is None:
+        return data
+    block = shared_memory.SharedMemory(create=True, size=max(data.nbytes, 1))
+    shared = np.ndarray(data.shape, dtype=data.dtype, buffer=block.buf)
+    shared[...] = data
+    del shared
+    block.close()
+    return block.name, data.shape, data.dtype.str
+
+
+def _receive_array(data):
+    if shared_memory is None:
+        return data
+    name, shape, dtype = data
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        shared = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+        data = shared.copy()
+        del shared
+    finally:
+        block.close()
+        block.unlink()
+    return data
@@ -6,16 +6,36 @@ import math
 import argparse
 import warnings
 from glob import glob
-from functools import wraps
+from functools import wraps, partial
+from itertools import count
+from concurrent.futures import Future
 
 import numpy as np
 from qtpy import QtWidgets, QtCore
-from planetaryimage import PDS3Image
 from ginga.BaseImage import BaseImage
+from ginga.misc import Bunch
+from ginga import trcalc
 from ginga.qtw.ImageViewCanvasQt import ImageViewCanvas
 
 from .histogram import HistogramWidget, HistogramModel
 from .channels_dialog import ChannelsDialog, ChannelsDialogModel
+from .roi_table import ROITable, NamedROITable
+from .batch import ROIMeasurement
+from .rois import ROISet
+from .cache import ImageCache, StatsCache
+from .index import MetadataIndex
+from .parallel import open_products
+from .prefetch import Prefetcher
+from .tiles import TiledImage, TILED_MIN_BYTES
+from .preview import PreviewLoader, PROVISIONAL
+from .stats import (
+    roi_stats, roi_percentiles, start_roi_stats, SummedAreaTable,
+    SUMMED_AREA_MAX_BYTES)
+from . import overviews
+from . import masks
+from .reader import (
+    read_label_lines, probe_product, read_product, band_arrays, is_pds_image,
+    is_mapped)
 try:
     from . import label
 except ImportError:
@@ -26,6 +46,21 @@ app = QtWidgets.QApplication.instance()
 if not app:
     app = QtWidgets.QApplication(sys.argv)
 
+#: The most pixels sampled for the statistics shown while an ROI is drawn
+LIVE_ROI_PIXELS = 256 * 256
+
+#: Bands with at least this many pixels have their whole-image statistics
+#: found in the background
+BACKGROUND_STATS_PIXELS = 1024 * 1024
+
+#: The shapes of ROI that can be drawn and their ginga draw types
+ROI_SHAPES = [
+    ('Rectangle', 'rectangle'), ('Ellipse', 'ellipse'),
+    ('Polygon', 'freepolygon')]
+
+#: Numbers the displayed data that is neither a band nor a composite image
+_other_data = count(1)
+
 
 class ImageStamp(BaseImage):
     """A ginga BaseImage object that will be displayed in PDSViewer.
@@ -34,6 +69,22 @@ class ImageStamp(BaseImage):
     ----------
     filepath: string
         A file and its relative path from the current working directory
+    name : string
+        The name of the image (band)
+    pds_image : planetaryimage object
+        A planetaryimage object. None when the image has not been loaded yet
+    data_np : np array
+        The data of the band. None when the image has not been loaded yet
+    label : list
+        The lines of the product's label. Read from the file when not given
+    layout : tuple
+        Where the image object is in the file when it is known and can be
+        mapped (see reader.image_layout)
+    band : int
+        The band of the image object the image is
+    loader : callable
+        Called without arguments to load the data when the image was created
+        without data (see :meth:`ImageSet.create_image_set`)
 
 
     Attributes
@@ -57,35 +108,366 @@ class ImageStamp(BaseImage):
         switched
     not_been_displayed : bool
         Whether the image has been displayed already
+    prepared_cuts : tuple (float, float)
+        The default cut levels when they were calculated while the image was
+        loaded in the background, None otherwise
+    tiles : TiledImage object
+        Reads the band from the file a tile at a time when the band takes at
+        least TILED_MIN_BYTES and its layout is known, None otherwise
+    overviews : OverviewPyramid object
+        Smaller versions of the band to draw it zoomed out with. Created the
+        first time a band with at least OVERVIEW_MIN_PIXELS is zoomed out,
+        None otherwise
+    preview_step : int
+        The number of lines and samples between the pixels of the displayed
+        preview while the band is loaded in the background (see
+        show_preview), None otherwise
+    summed_area : SummedAreaTable object
+        The integral images of the band, created the first time the mean or
+        standard deviation of a Region of Interest is looked up (see
+        summed_area_table), None otherwise
+    data_version : int
+        Counts the times the band's data was replaced by different data
+    data_key : tuple
+        Identifies the displayed data to cache its statistics and histograms
+        with. The band's data, a composite image of the same bands (see
+        set_data) and any other data each have their own key
     """
 
-    def __init__(self, filepath, name, pds_image, data_np, metadata=None,
-                 logger=None):
+    def __init__(self, filepath, name, pds_image=None, data_np=None,
+                 metadata=None, logger=None, label=None, loader=None,
+                 layout=None, band=0):
+        self._loader = loader
+        self._band_data = None
+        self._prepared_minmax = None
+        self.preview_step = None
+        self.data_version = 0
+        self.data_key = None
         BaseImage.__init__(self, data_np=data_np, metadata=metadata,
                            logger=logger)
-        self.set_data(data_np)
-        with open(filepath, 'rb') as f:
-            label_array = []
-            for lineno, line in enumerate(f):
-                line = line.decode().rstrip()
-                label_array.append(line)
-                if line.strip() == 'END':
-                    break
         self.data = data_np
+        if data_np is not None:
+            self.set_data(data_np)
+        if label is None:
+            label = read_label_lines(filepath)
         self.image_name = name
+        self.filepath = filepath
         self.file_name = os.path.basename(filepath)
         self.pds_image = pds_image
-        self.label = label_array
+        self.label = label
+        self.layout = layout
+        self.band = band
+        self.tiles = None
+        if layout is not None:
+            tiles = TiledImage(layout, band)
+            if tiles.nbytes >= TILED_MIN_BYTES:
+                self.tiles = tiles
+        self.overviews = None
+        self.summed_area = None
+        self._whole_stats = None
         self.cuts = None
         self.sarr = None
         self.zoom = None
         self.rotation = None
         self.transforms = None
         self.not_been_displayed = True
+        self.prepared_cuts = None
 
     def __repr__(self):
         return self.image_name
 
+    @property
+    def data(self):
+        """The band's data, loaded from the file on first access"""
+        self.load()
+        return self._band_data
+
+    @data.setter
+    def data(self, data_np):
+        # Loading the band again, or unloading it, keeps its contents
+        replaced = self._band_data is not None and data_np is not None
+        if replaced and data_np is not self._band_data:
+            self.data_version += 1
+        self._band_data = data_np
+
+    @property
+    def is_loaded(self):
+        """Whether the band's data is in memory"""
+        return self._band_data is not None
+
+    def load(self):
+        """Load the data with the loader if it has not been loaded yet"""
+        if not self.is_loaded and self._loader is not None:
+            self._loader()
+
+    def set_band_data(self, pds_image, data_np, minmax=None):
+        """Set the band's data once the product has been opened
+
+        The minimum and maximum values, and those that are not infinite, are
+        found again unless given as ``minmax``.
+        """
+        self.pds_image = pds_image
+        self.data = data_np
+        self.preview_step = None
+        self.summed_area = None
+        self._prepared_minmax = minmax
+        try:
+            self.set_data(data_np)
+        finally:
+            self._prepared_minmax = None
+
+    def set_data(self, data_np, *args, **kwargs):
+        """Display the data, see BaseImage.set_data
+
+        Parameters
+        ----------
+        data_key : tuple
+            Identifies the data when it is the same each time it is displayed,
+            such as a composite image of the same bands. Set to the band's key
+            when the data is the band's data, a new key otherwise
+        """
+        data_key = kwargs.pop('data_key', None)
+        if data_key is None:
+            if data_np is not None and data_np is self._band_data:
+                data_key = ('band', self.data_version)
+            else:
+                data_key = ('data', next(_other_data))
+        self.data_key = data_key
+        BaseImage.set_data(self, data_np, *args, **kwargs)
+
+    def _set_minmax(self):
+        if self._prepared_minmax is None:
+            BaseImage._set_minmax(self)
+        else:
+            (self.minval, self.maxval, self.minval_noinf,
+             self.maxval_noinf) = self._prepared_minmax
+
+    @property
+    def is_preview(self):
+        """Whether a preview is displayed while the band is loaded"""
+        return self.preview_step is not None
+
+    def show_preview(self, preview, step):
+        """Display a preview of the band until its data is set
+
+        The image keeps the shape of the band. Views of it, such as the
+        displayed area, the Region of Interest and the pixel under the cursor,
+        are taken from the nearest previewed pixels.
+
+        Parameters
+        ----------
+        preview : np array
+            Every step-th line and sample of the band (see
+            preview.read_preview)
+        step : int
+            The number of lines and samples between the previewed pixels
+        """
+        self.preview_step = step
+        self.set_data(preview)
+
+    @property
+    def shape(self):
+        if self.is_preview:
+            return self.tiles.shape
+        return BaseImage.shape.fget(self)
+
+    @property
+    def nbytes(self):
+        """The number of bytes of data held in memory by the image
+
+        Data mapped from the product is not counted, see mapped_bytes
+        """
+        if not self.is_loaded:
+            return 0
+        nbytes = sum(
+            data.nbytes for data in self._arrays() if not is_mapped(data))
+        if self.summed_area is not None:
+            nbytes += self.summed_area.nbytes
+        return nbytes
+
+    @property
+    def mapped_bytes(self):
+        """The number of bytes of data mapped from the product"""
+        if not self.is_loaded:
+            return 0
+        return sum(data.nbytes for data in self._arrays() if is_mapped(data))
+
+    def _arrays(self):
+        if self._data is not self._band_data:
+            # A composite image is displayed instead of the band
+            return [self._band_data, self._data]
+        return [self._band_data]
+
+    def unload(self):
+        """Release the data so it is loaded again when it is next used
+
+        The label and the view parameters are kept. Images without a loader
+        keep their data.
+        """
+        if self._loader is None:
+            return
+        self.cancel_whole_stats()
+        self._band_data = None
+        self.pds_image = None
+        self.overviews = None
+        self.summed_area = None
+        self.preview_step = None
+        self._data = np.zeros((1, 1))
+
+    def get_data(self):
+        if not self.is_preview:
+            self.load()
+        return BaseImage.get_data(self)
+
+    def _get_data(self):
+        if not self.is_preview:
+            self.load()
+        return BaseImage._get_data(self)
+
+    def _slice(self, view):
+        if self.is_preview:
+            return self._preview_slice(view)
+        # Views of the data, such as the displayed area, the Region of
+        # Interest and the pixel under the cursor, are read as tiles unless a
+        # composite image is displayed instead of the band
+        data = self._get_data()
+        if self.tiles is not None and data is self._band_data:
+            return self.tiles[view]
+        return data[view]
+
+    def _preview_slice(self, view):
+        # Slices skip the lines and samples that are not previewed, so the
+        # Region of Interest is a sample of the band
+        step = self.preview_step
+        preview_view = []
+        for index, length in zip(view, self.shape):
+            if isinstance(index, slice):
+                start, stop, stride = index.indices(length)
+                index = slice(
+                    -(-start // step), -(-stop // step),
+                    max(1, stride // step))
+            else:
+                index = np.asarray(index) // step
+            preview_view.append(index)
+        return self._data[tuple(preview_view)]
+
+    def get_scaled_cutout_wdht(self, x1, y1, x2, y2, new_wd, new_ht,
+                               method='basic'):
+        if self.is_preview:
+            return self._preview_cutout(x1, y1, x2, y2, new_wd, new_ht)
+        # ginga draws the image with this method, so an overview is used
+        # instead of the band when the image is zoomed out far enough
+        scale = min(
+            new_wd / float(x2 - x1 + 1), new_ht / float(y2 - y1 + 1))
+        overview = None
+        if method in ('basic', 'view') and scale <= 0.5:
+            overview = self._overview_for(scale)
+        if overview is None:
+            return BaseImage.get_scaled_cutout_wdht(
+                self, x1, y1, x2, y2, new_wd, new_ht, method=method)
+        factor, data = overview
+        view, scales = trcalc.get_scaled_cutout_wdht_view(
+            data.shape, x1 // factor, y1 // factor, x2 // factor,
+            y2 // factor, new_wd, new_ht)
+        return Bunch.Bunch(
+            data=data[view], scale_x=new_wd / float(x2 - x1 + 1),
+            scale_y=new_ht / float(y2 - y1 + 1))
+
+    def _preview_cutout(self, x1, y1, x2, y2, new_wd, new_ht):
+        """Draw the preview stretched over the shape of the band"""
+        view, (scale_x, scale_y) = trcalc.get_scaled_cutout_wdht_view(
+            self.shape, x1, y1, x2, y2, new_wd, new_ht)
+        rows, cols = view
+        if isinstance(rows, slice):
+            rows = np.arange(*rows.indices(self.height)).reshape(-1, 1)
+        if isinstance(cols, slice):
+            cols = np.arange(*cols.indices(self.width)).reshape(1, -1)
+        return Bunch.Bunch(
+            data=self._preview_slice((rows, cols)), scale_x=scale_x,
+            scale_y=scale_y)
+
+    def summed_area_table(self):
+        """The summed-area tables of the band, building them if needed
+
+        The tables are built in the background, check SummedAreaTable.ready
+        before using them.
+
+        Returns
+        -------
+        summed_area : SummedAreaTable object
+            None when a preview or composite image is displayed instead of
+            the band, or the tables would take more than
+            SUMMED_AREA_MAX_BYTES
+        """
+        data = self._get_data()
+        if data is not self._band_data or data.ndim != 2:
+            return None
+        if self.summed_area is None:
+            if SummedAreaTable.table_bytes(data) > SUMMED_AREA_MAX_BYTES:
+                return None
+            self.summed_area = SummedAreaTable(data)
+            self.summed_area.start()
+        return self.summed_area
+
+    def whole_stats(self):
+        """The statistics of the whole band, finding them if needed
+
+        The statistics of bands with at least BACKGROUND_STATS_PIXELS are
+        found in the background, check Future.done before using them. They
+        are kept when the band is unloaded, so they are not found again when
+        the band is displayed again.
+
+        Returns
+        -------
+        whole_stats : Future object
+            The ROIStats of the band once found. None when a preview or
+            composite image is displayed instead of the band
+        """
+        data = self._get_data()
+        if data is not self._band_data:
+            return None
+        whole_stats = self._whole_stats
+        if whole_stats is not None and whole_stats.done() and (
+                whole_stats.cancelled() or whole_stats.result() is None):
+            # The band was released before its statistics were found
+            self._whole_stats = None
+        if self._whole_stats is None:
+            if data.size >= BACKGROUND_STATS_PIXELS:
+                # The band is taken when the statistics start being found,
+                # so a band released in the meantime is not kept
+                self._whole_stats = start_roi_stats(
+                    self._get_band_data, by_band=False)
+            else:
+                self._whole_stats = Future()
+                self._whole_stats.set_result(roi_stats(data, by_band=False))
+        return self._whole_stats
+
+    def cancel_whole_stats(self):
+        """Drop the statistics of the whole band if not started being found
+        """
+        if self._whole_stats is not None and self._whole_stats.cancel():
+            self._whole_stats = None
+
+    def _get_band_data(self):
+        return self._band_data
+
+    def _overview_for(self, scale):
+        """The overview for the scale, building the overviews if needed"""
+        data = self._get_data()
+        if data is not self._band_data:
+            return None
+        if self.overviews is None:
+            if data.size < overviews.OVERVIEW_MIN_PIXELS:
+                return None
+            key = None
+            disk_cache = overviews.disk_cache
+            if disk_cache is not None:
+                key = disk_cache.key(self.filepath, self.band)
+            self.overviews = overviews.OverviewPyramid(
+                data, key=key, disk_cache=disk_cache)
+            self.overviews.start()
+        return self.overviews.level_for(scale)
+
 
 class ImageSet(object):
     """A set of ginga images to be displayed and methods to control the images.
@@ -94,6 +476,23 @@ class ImageSet(object):
     ----------
     filepaths: list
         A list of filepaths to pass through ImageStamp
+    lazy : bool
+        Only read the labels when the set is created and load each image's
+        data when it is first displayed. False by default
+    max_cache_bytes : int
+        When given, the data of the least recently viewed images is released
+        once the loaded data takes more bytes and loaded again when the
+        images are next displayed
+    processes : int
+        When given, the products are opened in this many worker processes.
+        Not used when lazy
+    index_path : str
+        Path to a MetadataIndex file. Products in the index are opened
+        without parsing their labels and new products are added to it
+    preview_step : int
+        When given, large images that are not loaded when they are displayed
+        show a preview of every preview_step-th line and sample while their
+        data is read in the background (see finish_preview)
 
     Attribute
     ---------
@@ -110,13 +509,45 @@ class ImageSet(object):
         Which channel in the image the view should be in
     next_prev_enabled : bool
         Whether the next and previous buttons should be enabled
+    prefetcher : Prefetcher object
+        Decodes the images around the current image in the background when
+        enabled (see enable_prefetch), None otherwise
+    cache : ImageCache object
+        Keeps the data of the most recently viewed images when
+        max_cache_bytes is given, None otherwise
+    index : MetadataIndex object
+        The index of the products' labels when index_path is given, None
+        otherwise
+    previews : PreviewLoader object
+        Reads the data of previewed images in the background when
+        preview_step is given, None otherwise
+    rois : ROISet object
+        The named Regions of Interest measured in every image displayed
+    stats_cache : StatsCache object
+        The most recently used statistics of Regions of Interest
     """
 
-    def __init__(self, filepaths):
+    def __init__(self, filepaths, lazy=False, max_cache_bytes=None,
+                 processes=None, index_path=None, preview_step=None):
         # Remove any duplicate filepaths and sort the list alpha-numerically.
         filepaths = sorted(list(set(filepaths)))
 
         self._views = set()
+        self.lazy = lazy
+        self.processes = processes
+        self.prefetcher = None
+        self.cache = None
+        if max_cache_bytes is not None:
+            self.cache = ImageCache(max_cache_bytes)
+        self.current_image = None
+        self.index = None
+        if index_path is not None:
+            self.index = MetadataIndex(index_path)
+        self.previews = None
+        if preview_step is not None:
+            self.previews = PreviewLoader(preview_step)
+        self.rois = ROISet()
+        self.stats_cache = StatsCache()
 
         # Create image objects with attributes set in ImageStamp
         # These objects contain the data ginga will use to display the image
@@ -132,6 +563,7 @@ class ImageSet(object):
         self.rgb = []
         if self.images:
             self.current_image = self.images[self.current_image_index]
+            self._load_current_image()
         else:
             self.current_image = None
 
@@ -144,33 +576,230 @@ class ImageSet(object):
         self._views.remove(view)
 
     def create_image_set(self, filepaths):
+        if self.lazy:
+            self._create_lazy_image_set(filepaths)
+        else:
+            self._create_loaded_image_set(filepaths)
+        if self.index is not None:
+            self.index.commit()
+
+    def _create_loaded_image_set(self, filepaths):
         rgb = ['R', 'G', 'B']
-        for filepath in filepaths:
+        for filepath, product in self._open_products(filepaths):
+            if product is None:
+                warnings.warn(filepath + " cannnot be opened")
+                continue
             try:
                 channels = []
-                pds_image = PDS3Image.open(filepath)
-                bands = pds_image.label['IMAGE']['BANDS']
+                loader = partial(self._load_channels, channels)
+                pds_image, image_data, label_array = product
+                layout = getattr(pds_image, 'layout', None)
+                bands = pds_image.bands
                 if bands == 3:
+                    band_data = band_arrays(image_data, bands)
                     for n in range(bands):
                         name = os.path.basename(filepath) + '(%s)' % (rgb[n])
-                        data = pds_image.image[:, :, n]
+                        data = band_data[n]
                         image = ImageStamp(
                             filepath=filepath, name=name, data_np=data,
-                            pds_image=pds_image)
+                            pds_image=pds_image, label=label_array,
+                            loader=loader, layout=layout, band=n)
                         # self.file_dict[image.image_name] = image
                         channels.append(image)
                     self.images.append(channels)
                 else:
                     name = os.path.basename(filepath)
-                    data = pds_image.image
+                    data = image_data
                     image = ImageStamp(
                         filepath=filepath, name=name, data_np=data,
-                        pds_image=pds_image)
-                    self.images.append([image])
+                        pds_image=pds_image, label=label_array,
+                        loader=loader, layout=layout)
+                    channels.append(image)
+                    self.images.append(channels)
                     # self.file_dict[image.image_name] = image
+                self._cache_channels(channels)
             except:
                 warnings.warn(filepath + " cannnot be opened")
 
+    def _open_products(self, filepaths):
+        """Open the products in order, None for those that cannot be opened"""
+        opened = {}
+        if self.processes:
+            # Products in the index are cheap enough to open here
+            unindexed = [
+                filepath for filepath in filepaths
+                if self.index is None or self.index.get(filepath) is None
+            ]
+            opened = dict(open_products(unindexed, self.processes))
+        for filepath in filepaths:
+            try:
+                if filepath in opened:
+                    product = opened[filepath]
+                    if product is not None and self.index is not None:
+                        pds_image, image_data, label_array = product
+                        self.index.add(
+                            filepath, pds_image.bands, label_array,
+                            getattr(pds_image, 'layout', None))
+                else:
+                    # Read the label once for all of the channels
+                    bands, label_array, layout = self._probe(filepath)
+                    pds_image, image_data = read_product(
+                        filepath, label_array, layout)
+                    product = pds_image, image_data, label_array
+            except Exception:
+                product = None
+            yield filepath, product
+
+    def _probe(self, filepath):
+        """The bands, label and layout of a product, using the index if set"""
+        entry = None
+        if self.index is not None:
+            entry = self.index.get(filepath)
+        if entry is None:
+            entry = probe_product(filepath)
+            if self.index is not None:
+                self.index.add(filepath, *entry)
+        return entry
+
+    def _create_lazy_image_set(self, filepaths):
+        """Create images without data that load themselves when displayed"""
+        rgb = ['R', 'G', 'B']
+        for filepath in filepaths:
+            try:
+                bands, label_array, layout = self._probe(filepath)
+            except Exception:
+                warnings.warn(filepath + " cannnot be opened")
+                continue
+            channels = []
+            loader = partial(self._load_channels, channels)
+            if bands == 3:
+                names = [
+                    os.path.basename(filepath) + '(%s)' % (rgb[n])
+                    for n in range(bands)
+                ]
+            else:
+                names = [os.path.basename(filepath)]
+            for band, name in enumerate(names):
+                image = ImageStamp(
+                    filepath=filepath, name=name, label=label_array,
+                    loader=loader, layout=layout, band=band)
+                channels.append(image)
+            self.images.append(channels)
+
+    def _load_channels(self, channels):
+        """Open the product and set the data of each of its channels"""
+        filepath = channels[0].filepath
+        pds_image = None
+        image_data = None
+        cuts = None
+        try:
+            product = None
+            if self.prefetcher is not None:
+                product = self.prefetcher.pop(filepath)
+            if product is None:
+                pds_image, image_data = read_product(
+                    filepath, channels[0].label, channels[0].layout)
+            else:
+                pds_image, image_data, cuts = product
+        except Exception:
+            warnings.warn(filepath + " cannnot be opened")
+        if image_data is None:
+            # Mimic an empty ginga image so the data is not read again
+            image_data = np.zeros((1, 1))
+            cuts = None
+        if cuts is None:
+            cuts = [None] * len(channels)
+        band_data = band_arrays(image_data, len(channels))
+        for image, data, prepared_cuts in zip(channels, band_data, cuts):
+            image.set_band_data(pds_image, data)
+            if prepared_cuts is not None:
+                image.prepared_cuts = prepared_cuts
+        self._cache_channels(channels)
+
+    def _cache_channels(self, channels):
+        """Track the loaded channels, releasing the least recently viewed"""
+        if self.cache is None:
+            return
+        keep = []
+        if self.current_image:
+            keep.append(self.current_image[0].filepath)
+        self.cache.add(channels, keep=keep)
+
+    def _load_current_image(self):
+        if self.cache is not None:
+            self.cache.use(self.current_image)
+        if self.preview_read(self.current_image):
+            # The product was read while it was not displayed
+            self.finish_preview(self.current_image)
+        elif self._can_preview(self.current_image):
+            self.previews.start(self.current_image, self._preview_loaded)
+        else:
+            self.current_image[0].load()
+
+    def _can_preview(self, channels):
+        """Whether to preview the channels instead of loading them now"""
+        image = channels[0]
+        if self.previews is None or image.is_loaded or image.tiles is None:
+            return False
+        # A prefetched product is loaded faster than it can be previewed
+        return self.prefetcher is None or image.filepath not in self.prefetcher
+
+    def preview_read(self, channels):
+        """Whether previewed channels have been read and can be finished"""
+        return (self.previews is not None and
+                self.previews.is_read(channels[0].filepath))
+
+    def _preview_loaded(self, channels):
+        # Called from the thread that read the product, the views have to
+        # call finish_preview from their own thread
+        for view in list(self._views):
+            view.preview_loaded(channels)
+
+    def finish_preview(self, channels):
+        """Swap the full data in for the previews of the channels
+
+        Waits for the data when it has not been read yet.
+
+        Parameters
+        ----------
+        channels : list
+            The ImageStamp of each channel of a previewed product
+
+        Returns
+        -------
+        finished : bool
+            False when the channels were not previewed
+        """
+        try:
+            finished = self.previews.finish(channels)
+        except Exception:
+            warnings.warn(channels[0].filepath + " cannnot be opened")
+            finished = True
+        if not finished:
+            return False
+        if not channels[0].is_loaded:
+            # Mimic an empty ginga image so the data is not read again
+            for image in channels:
+                image.set_band_data(None, np.zeros((1, 1)))
+        self._cache_channels(channels)
+        return True
+
+    def enable_prefetch(self, forward=2, backward=1, max_workers=2,
+                        autocuts=None):
+        """Decode the products around the current image in the background
+
+        Only images that are not loaded are prefetched, so this is meant to
+        be used with a lazy image set. See :class:`Prefetcher` for the
+        parameters.
+        """
+        if self.prefetcher is not None:
+            self.prefetcher.shutdown()
+        self.prefetcher = Prefetcher(
+            self, forward=forward, backward=backward,
+            max_workers=max_workers, autocuts=autocuts)
+        if self.images:
+            self.prefetcher.update(self.current_image_index)
+
     @property
     def next_prev_enabled(self):
         """Set whether the next and previous buttons are enabled."""
@@ -186,8 +815,14 @@ class ImageSet(object):
             index -= len(self.images)
         while index < 0:
             index += len(self.images)
+        for image in self.current_image or []:
+            # The statistics of an image that is no longer shown can wait
+            image.cancel_whole_stats()
         self._current_image_index = index
         self.current_image = self.images[index]
+        if self.prefetcher is not None:
+            self.prefetcher.update(index)
+        self._load_current_image()
         self._channel = 0
         for view in self._views:
             view.display_image()
@@ -205,6 +840,7 @@ class ImageSet(object):
         number_channels = len(self.current_image)
         if number_channels == 1:
             return
+        self.current_image[self._channel].cancel_whole_stats()
         self._previous_channel = self._channel
         self._channel = new_channel
         if self._channel == number_channels:
@@ -254,13 +890,21 @@ class ImageSet(object):
         for view in self._views:
             view.set_pixel_value_text()
 
+    @property
+    def provisional(self):
+        """Whether the current channel is displayed as a preview"""
+        return self.current_image[self.channel].is_preview
+
     @property
     def pixel_value_text(self):
         current_image = self.current_image[self.channel]
         if current_image.ndim == 3:
-            return 'R: %.3f G: %.3f B: %.3f' % (self.pixel_value)
+            text = 'R: %.3f G: %.3f B: %.3f' % (self.pixel_value)
         else:
-            return 'Value: %.3f' % (self.pixel_value)
+            text = 'Value: %.3f' % (self.pixel_value)
+        if self.provisional:
+            text += PROVISIONAL
+        return text
 
     def append(self, new_files, dipslay_first_new_image):
         """Append a new image to the images list if it is pds compatible"""
@@ -298,6 +942,12 @@ class ImageSet(object):
         )
         return rgb_image
 
+    @property
+    def rgb_key(self):
+        """The data_key of the composite image of the rgb bands"""
+        return ('rgb',) + tuple(
+            (band, band.data_version) for band in self.rgb)
+
     def ROI_data(self, left, bottom, right, top):
         """Calculate the data in the Region of Interest
 
@@ -345,9 +995,9 @@ class ImageSet(object):
         pixels = (right - left) * (top - bottom)
         return pixels
 
-    def ROI_std_dev(
-            self, left=None, bottom=None, right=None, top=None, data=None):
-        """Calculate the standard deviation in the Region of Interest
+    def ROI_stats(self, left=None, bottom=None, right=None, top=None,
+                  data=None, median=True, by_band=True, mask=None):
+        """Calculate the statistics of the Region of Interest in one pass
 
         Note
         ----
@@ -366,6 +1016,199 @@ class ImageSet(object):
             The y coordinate value of the top side of the Region of Interest
         data : Optional[array]
             The data within the Region of Interest
+        median : bool
+            Whether to calculate the median
+        by_band : bool
+            Whether each band of a RGB Region of Interest is described
+            separately
+        mask : Optional[array]
+            Whether each pixel of the data is in the Region of Interest, for
+            polygon and ellipse Regions of Interest (see masks)
+
+        Returns
+        -------
+        stats : ROIStats
+            The number of pixels, mean, standard deviation, minimum, maximum
+            and median of the Region of Interest, an array of each band's for
+            RGB data (see stats.roi_stats)
+
+        Note
+        ----
+        The statistics of a rectangle given by its sides are kept in
+        stats_cache under the image, channel, pixels of the rectangle and
+        the version of the image's data, so they are calculated once until
+        the data is set again.
+
+        """
+
+        if data is not None or mask is not None:
+            if data is None:
+                data = self.ROI_data(left, bottom, right, top)
+            return roi_stats(data, median=median, by_band=by_band, mask=mask)
+        key = self._ROI_stats_key(left, bottom, right, top, median, by_band)
+        return self.stats_cache.get(key, lambda: roi_stats(
+            self.ROI_data(*key[2]), median=median, by_band=by_band))
+
+    def start_ROI_stats(self, left, bottom, right, top, by_band=True):
+        """Start calculating the statistics of the Region of Interest
+
+        Regions of at least BACKGROUND_STATS_PIXELS pixels are measured in
+        the background and their statistics are then kept in stats_cache.
+        Smaller regions and those already in stats_cache are measured right
+        away.
+
+        Parameters
+        ----------
+        See ROI_data
+        by_band : bool
+            See ROI_stats
+
+        Returns
+        -------
+        stats : Future object
+            The ROIStats of the Region of Interest once calculated
+
+        """
+
+        key = self._ROI_stats_key(left, bottom, right, top, True, by_band)
+        x1, y1, x2, y2 = key[2]
+        pixels = max(0, x2 - x1) * max(0, y2 - y1)
+        if key in self.stats_cache or pixels < BACKGROUND_STATS_PIXELS:
+            future = Future()
+            future.set_result(self.ROI_stats(
+                left, bottom, right, top, by_band=by_band))
+            return future
+        future = start_roi_stats(self.ROI_data(x1, y1, x2, y2),
+                                 by_band=by_band)
+        stats_cache = self.stats_cache
+
+        def keep(future):
+            if not future.cancelled() and future.exception() is None:
+                stats_cache.get(key, future.result)
+
+        future.add_done_callback(keep)
+        return future
+
+    def _ROI_stats_key(self, left, bottom, right, top, median, by_band):
+        """The key of the statistics of a rectangle in stats_cache"""
+        image = self.current_image[self.channel]
+        sides = tuple(
+            int(math.ceil(side)) for side in (left, bottom, right, top))
+        return (image, self.channel, sides, image.data_key, median, by_band)
+
+    def ROI_moments(self, left, bottom, right, top):
+        """Find the number of pixels, mean and std dev of the ROI
+
+        The values are looked up in the summed-area tables of the current
+        channel once they are built, which takes the same time for any size
+        of Region of Interest. They are calculated from the data until then.
+
+        Parameters
+        ----------
+        See ROI_data
+
+        Returns
+        -------
+        moments : tuple
+            The number of pixels, mean and standard deviation of the Region
+            of Interest
+
+        """
+
+        image = self.current_image[self.channel]
+        table = image.summed_area_table()
+        moments = None
+        if table is not None:
+            sides = (left, bottom, right, top)
+            moments = table.moments(*[int(math.ceil(x)) for x in sides])
+        if moments is None:
+            stats = self.ROI_stats(
+                left, bottom, right, top, median=False, by_band=False)
+            moments = stats.count, stats.mean, stats.std_dev
+        return moments
+
+    def ROI_estimate(self, left, bottom, right, top,
+                     max_pixels=LIVE_ROI_PIXELS):
+        """Quickly estimate the mean and std dev of the Region of Interest
+
+        The values are exact once the summed-area tables of the current
+        channel are built (see ROI_moments). Until then they are calculated
+        from every few lines and samples, at most max_pixels of them.
+
+        Parameters
+        ----------
+        See ROI_data
+        max_pixels : int
+            The most pixels to sample
+
+        Returns
+        -------
+        moments : tuple
+            The number of pixels, mean and standard deviation of the Region
+            of Interest
+
+        """
+
+        image = self.current_image[self.channel]
+        x1, y1, x2, y2 = [
+            int(math.ceil(side)) for side in (left, bottom, right, top)]
+        table = image.summed_area_table()
+        if table is not None:
+            moments = table.moments(x1, y1, x2, y2)
+            if moments is not None:
+                return moments
+        count = max(0, x2 - x1) * max(0, y2 - y1)
+        step = max(1, int(math.ceil(math.sqrt(count / float(max_pixels)))))
+        data = image.cutout_data(x1, y1, x2, y2, xstep=step, ystep=step)
+        stats = roi_stats(data, median=False, by_band=False)
+        return count, stats.mean, stats.std_dev
+
+    def measure_ROI(self, left, bottom, right, top, max_workers=None):
+        """Measure the Region of Interest in every image of the set
+
+        Parameters
+        ----------
+        See ROI_data
+        max_workers : int
+            The number of threads opening and measuring the images
+
+        Returns
+        -------
+        measurement : ROIMeasurement object
+            Yields the statistics of each channel of each image when iterated
+            over, see batch.ROIMeasurement
+
+        """
+
+        return ROIMeasurement(
+            self.images, left, bottom, right, top, max_workers=max_workers)
+
+    def named_ROI_stats(self):
+        """The statistics of each named Region of Interest
+
+        All of the named Regions of Interest are measured in the current
+        channel at once, see ROISet.measure
+
+        Returns
+        -------
+        stats : OrderedDict
+            The ROIStats of each Region of Interest in rois by name
+
+        """
+
+        return self.rois.measure(self.current_image[self.channel])
+
+    def ROI_std_dev(
+            self, left=None, bottom=None, right=None, top=None, data=None):
+        """Calculate the standard deviation in the Region of Interest
+
+        Note
+        ----
+        See ROI_stats
+
+        Parameters
+        ----------
+        See ROI_stats
 
         Returns
         -------
@@ -375,8 +1218,11 @@ class ImageSet(object):
         """
 
         if data is None:
-            data = self.ROI_data(left, bottom, right, top)
-        std_dev = round(np.std(data), 6)
+            count, mean, std_dev = self.ROI_moments(left, bottom, right, top)
+        else:
+            std_dev = self.ROI_stats(
+                data=data, median=False, by_band=False).std_dev
+        std_dev = round(std_dev, 6)
         return std_dev
 
     def ROI_mean(
@@ -385,11 +1231,11 @@ class ImageSet(object):
 
         Parameters
         ----------
-        See ROI_std_dev
+        See ROI_stats
 
         Note
         ----
-        See ROI_std_dev
+        See ROI_stats
 
         Returns
         -------
@@ -399,8 +1245,10 @@ class ImageSet(object):
         """
 
         if data is None:
-            data = self.ROI_data(left, bottom, right, top)
-        mean = round(np.mean(data), 4)
+            count, mean, std_dev = self.ROI_moments(left, bottom, right, top)
+        else:
+            mean = self.ROI_stats(data=data, median=False, by_band=False).mean
+        mean = round(mean, 4)
         return mean
 
     def ROI_median(
@@ -409,11 +1257,11 @@ class ImageSet(object):
 
         Parameters
         ----------
-        See ROI_std_dev
+        See ROI_stats
 
         Note
         ----
-        See ROI_std_dev
+        See ROI_stats
 
         Returns
         -------
@@ -422,10 +1270,34 @@ class ImageSet(object):
 
         """
 
+        stats = self.ROI_stats(left, bottom, right, top, data, by_band=False)
+        return stats.median
+
+    def ROI_percentiles(self, q, left=None, bottom=None, right=None,
+                        top=None, data=None):
+        """Find percentiles of the pixel values of the Region of Interest
+
+        Parameters
+        ----------
+        q : list
+            The percentiles to find, between 0 and 100
+        See ROI_stats for the other parameters
+
+        Note
+        ----
+        See ROI_stats
+
+        Returns
+        -------
+        percentiles : array
+            The pixel value at each percentile, exact for integer data (see
+            stats.roi_percentiles)
+
+        """
+
         if data is None:
             data = self.ROI_data(left, bottom, right, top)
-        median = np.median(data)
-        return median
+        return roi_percentiles(data, q, by_band=False)
 
     def ROI_min(
             self, left=None, bottom=None, right=None, top=None, data=None):
@@ -433,11 +1305,11 @@ class ImageSet(object):
 
         Parameters
         ----------
-        See ROI_std_dev
+        See ROI_stats
 
         Note
         ----
-        See ROI_std_dev
+        See ROI_stats
 
         Returns
         -------
@@ -446,10 +1318,9 @@ class ImageSet(object):
 
         """
 
-        if data is None:
-            data = self.ROI_data(left, bottom, right, top)
-        minimum = np.nanmin(data)
-        return minimum
+        stats = self.ROI_stats(
+            left, bottom, right, top, data, median=False, by_band=False)
+        return stats.minimum
 
     def ROI_max(
             self, left=None, bottom=None, right=None, top=None, data=None):
@@ -457,11 +1328,11 @@ class ImageSet(object):
 
         Parameters
         ----------
-        See ROI_std_dev
+        See ROI_stats
 
         Note
         ----
-        See ROI_std_dev
+        See ROI_stats
 
         Returns
         -------
@@ -470,10 +1341,9 @@ class ImageSet(object):
 
         """
 
-        if data is None:
-            data = self.ROI_data(left, bottom, right, top)
-        maximum = np.nanmax(data)
-        return maximum
+        stats = self.ROI_stats(
+            left, bottom, right, top, data, median=False, by_band=False)
+        return stats.maximum
 
 
 class PDSController(object):
@@ -535,11 +1405,25 @@ class PDSViewer(QtWidgets.QMainWindow):
     image_set: list
         A list of ginga objects with attributes set in ImageStamp"""
 
+    # Carries previewed channels from the thread that read them
+    _preview_ready = QtCore.Signal(object)
+
+    # Carries images from the thread that found their whole-image statistics
+    _whole_stats_ready = QtCore.Signal(object)
+
+    # Carries the statistics of a large ROI from the thread that found them
+    _ROI_stats_ready = QtCore.Signal(object)
+
     def __init__(self, image_set):
         super(PDSViewer, self).__init__()
 
         self.image_set = image_set
         self.image_set.register(self)
+        self._preview_ready.connect(self._finish_preview)
+        self._whole_stats_ready.connect(self._finish_whole_stats)
+        self._ROI_stats_ready.connect(self._finish_ROI_stats)
+        # The statistics of the drawn ROI that are being found
+        self._ROI_stats = None
         self.controller = PDSController(self.image_set, self)
 
         # Set the sub window names here. This implementation will help prevent
@@ -552,6 +1436,10 @@ class PDSViewer(QtWidgets.QMainWindow):
         self.channels_window = None
         self.channels_window_is_open = False
         self.channels_window_pos = None
+        self.roi_table_window = None
+        self.named_ROIs_window = None
+        # The canvas object that draws the named ROIs
+        self._named_ROIs = None
 
         self.view_canvas = ImageViewCanvas(render='widget')
         self.view_canvas.set_autocut_params('zscale')
@@ -566,7 +1454,16 @@ class PDSViewer(QtWidgets.QMainWindow):
         # Activate click and drag to update values
         self.view_canvas.set_callback('cursor-move', self.display_values)
         self.view_canvas.set_callback('draw-down', self.start_ROI)
+        self.view_canvas.set_callback('draw-move', self.move_ROI)
         self.view_canvas.set_callback('draw-up', self.stop_ROI)
+        # The statistics shown while an ROI is drawn are updated at most once
+        # per frame of the display
+        self._ROI_start = None
+        self._live_ROI = None
+        self._live_ROI_timer = QtCore.QTimer(self)
+        self._live_ROI_timer.setSingleShot(True)
+        self._live_ROI_timer.setInterval(_frame_interval())
+        self._live_ROI_timer.timeout.connect(self._set_live_ROI_text)
         self.view_canvas.enable_draw(True)
         self.view_canvas.set_drawtype('rectangle')
 
@@ -597,6 +1494,13 @@ class PDSViewer(QtWidgets.QMainWindow):
         self.restore_defaults.clicked.connect(self.restore)
         self.channels_button = QtWidgets.QPushButton("Channels")
         self.channels_button.clicked.connect(self.channels_dialog)
+        self.measure_all_button = QtWidgets.QPushButton("Measure All")
+        self.measure_all_button.clicked.connect(self.measure_all)
+        self.named_ROIs_button = QtWidgets.QPushButton("Named ROIs")
+        self.named_ROIs_button.clicked.connect(self.named_ROIs_dialog)
+        self.ROI_shape_box = QtWidgets.QComboBox()
+        self.ROI_shape_box.addItems([name for name, drawtype in ROI_SHAPES])
+        self.ROI_shape_box.currentIndexChanged.connect(self.set_ROI_shape)
         # Set Text so the size of the boxes are at an appropriate size
         self.x_value_lbl = QtWidgets.QLabel('X: #####')
         self.y_value_lbl = QtWidgets.QLabel('Y: #####')
@@ -637,6 +1541,8 @@ class PDSViewer(QtWidgets.QMainWindow):
         min_width = self.histogram_widget.histogram.width()
         for widget in (open_file, self.next_image_btn, self.previous_image_btn,
                        self.channels_button, self.open_label,
+                       self.measure_all_button, self.named_ROIs_button,
+                       self.ROI_shape_box,
                        self.restore_defaults, self.rgb_check_box,
                        self.x_value_lbl, self.y_value_lbl, quit_button,
                        self.next_channel_btn, self.previous_channel_btn,
@@ -677,7 +1583,11 @@ class PDSViewer(QtWidgets.QMainWindow):
         main_layout.addWidget(self.pixel_value_lbl, 8, 0, 1, 2)
         main_layout.addWidget(self.view_canvas.get_widget(), 2, 2, 9, 4)
 
-        main_layout.setRowStretch(9, 1)
+        main_layout.addWidget(self.measure_all_button, 9, 0)
+        main_layout.addWidget(self.ROI_shape_box, 9, 1)
+        main_layout.addWidget(self.named_ROIs_button, 10, 0)
+
+        main_layout.setRowStretch(11, 1)
         main_layout.setColumnStretch(5, 1)
 
         vw = QtWidgets.QWidget()
@@ -689,6 +1599,10 @@ class PDSViewer(QtWidgets.QMainWindow):
         if self.image_set.current_image:
             self.display_image()
             self._reset_display_values()
+            # The product may have been read before the viewer registered,
+            # when there was no view to be told
+            if self.image_set.preview_read(self.image_set.current_image):
+                self._finish_preview(self.image_set.current_image)
 
     @property
     def current_image(self):
@@ -698,7 +1612,12 @@ class PDSViewer(QtWidgets.QMainWindow):
         self.controller.update_rgb()
         self._set_rgb_state()
         self._update_channels_image()
-        self.view_canvas.set_image(self.current_image)
+        if self._has_prepared_cuts:
+            # restore will apply the prepared cuts so there is no need for
+            # ginga to calculate the cut levels when the image is set
+            self._set_image_without_autocuts()
+        else:
+            self.view_canvas.set_image(self.current_image)
         if self.current_image.not_been_displayed:
             self.restore()
         else:
@@ -717,16 +1636,88 @@ class PDSViewer(QtWidgets.QMainWindow):
 
         self.setWindowTitle(self.current_image.image_name)
 
+    @property
+    def _has_prepared_cuts(self):
+        image = self.current_image
+        rgb = self.rgb_check_box.checkState() == QtCore.Qt.Checked
+        return image.prepared_cuts is not None and not rgb
+
+    def _set_image_without_autocuts(self):
+        autocuts = self.view_canvas.get_settings().get('autocuts')
+        self.view_canvas.enable_autocuts('off')
+        self.view_canvas.set_image(self.current_image)
+        self.view_canvas.enable_autocuts(autocuts)
+
+    def preview_loaded(self, channels):
+        """Swap in the data of previewed channels once it has been read
+
+        This may be called from any thread, the data is swapped in the thread
+        of the viewer.
+        """
+        self._preview_ready.emit(channels)
+
+    def _finish_preview(self, channels):
+        if not self.image_set.finish_preview(channels):
+            return
+        if channels is not self.image_set.current_image:
+            return
+        # ginga redraws the image when its data is set
+        self.histogram.set_data()
+        self._reset_ROI()
+        if '????' not in self.pixel_value_lbl.text():
+            self._renew_display_values()
+
     def _refresh_ROI_text(self):
         self.stop_ROI(self.view_canvas, None, None, None)
 
     def _reset_ROI(self):
-        if len(self.view_canvas.objects) > 1:
+        if self._drawn_ROI() is not None:
             self._refresh_ROI_text()
             self.view_canvas.update_canvas()
         else:
-            self.set_ROI_text(
-                0, 0, self.current_image.width, self.current_image.height)
+            self._set_whole_image_text()
+        self._update_named_ROIs()
+
+    def _set_whole_image_text(self):
+        """Set the ROI text of the whole image
+
+        The statistics of large bands are found in the background after the
+        image is displayed (see ImageStamp.whole_stats), so they show ????
+        until then.
+        """
+        self._ROI_stats = None
+        image = self.current_image
+        whole_stats = image.whole_stats()
+        if whole_stats is None:
+            self.set_ROI_text(0, 0, image.width, image.height)
+        elif whole_stats.done():
+            self.pixels.setText('#Pixels: %d' % (image.width * image.height))
+            self._set_gray_stats_text(whole_stats.result())
+        else:
+            self.pixels.setText('#Pixels: %d' % (image.width * image.height))
+            self._set_pending_stats_text(
+                (self.std_dev, 'Std Dev'), (self.mean, 'Mean'))
+            whole_stats.add_done_callback(
+                lambda future: self._whole_stats_ready.emit(image))
+
+    def _set_pending_stats_text(self, *info_boxes):
+        """Show ???? in the statistics that are still being found"""
+        info_boxes += ((self.median, 'Median'), (self.min, 'Min'),
+                       (self.max, 'Max'))
+        for info_box, name in info_boxes:
+            info_box.setText('%s: ????' % (name))
+
+    def _finish_whole_stats(self, image):
+        # The user may have moved on or drawn an ROI in the meantime
+        if image is self.current_image and self._drawn_ROI() is None:
+            self._set_whole_image_text()
+
+    def _drawn_ROI(self):
+        """The canvas object of the ROI drawn by the user, None if none"""
+        for draw_obj in reversed(self.view_canvas.objects[1:]):
+            if draw_obj is not self._named_ROIs:
+                return draw_obj
+        return None
 
     def _update_channels_image(self):
         if self.channels_window:
@@ -792,12 +1783,15 @@ class PDSViewer(QtWidgets.QMainWindow):
 
     def display_rgb_image(self):
         rgb_image = self.image_set.create_rgb_image()
-        self.current_image.set_data(rgb_image)
+        self.current_image.set_data(
+            rgb_image, data_key=self.image_set.rgb_key)
         self.next_channel_btn.setEnabled(False)
         self.previous_channel_btn.setEnabled(False)
 
     def _undo_display_rgb_image(self):
-        self.current_image.set_data(self.current_image.data)
+        # A preview is not replaced until the band is loaded
+        if not self.current_image.is_preview:
+            self.current_image.set_data(self.current_image.data)
         if len(self.image_set.current_image) == 3:
             self.next_channel_btn.setEnabled(True)
             self.previous_channel_btn.setEnabled(True)
@@ -822,6 +1816,7 @@ class PDSViewer(QtWidgets.QMainWindow):
             self._undo_display_rgb_image()
         if len(self.view_canvas.objects) >= 1:
             self._refresh_ROI_text()
+        self._update_named_ROIs()
 
         if self.view_canvas.get_image() is not None:
             self.histogram.set_data()
@@ -928,6 +1923,125 @@ class PDSViewer(QtWidgets.QMainWindow):
             self.channels_window.move(self.channels_window_pos)
         self.channels_window.show()
 
+    def measure_all(self):
+        """Display the statistics of the ROI in every image in a table
+
+        Only rectangles are measured in every image, see ROI_is_rectangle.
+        """
+        if not self._check_rectangle():
+            return
+        if self.roi_table_window is not None:
+            self.roi_table_window.close()
+        left, bottom, right, top = self.current_ROI()
+        measurement = self.image_set.measure_ROI(left, bottom, right, top)
+        self.roi_table_window = ROITable(measurement)
+        self.roi_table_window.show()
+
+    def named_ROIs_dialog(self):
+        """Display the statistics of the named ROIs in a table"""
+        if self.named_ROIs_window is None:
+            self.named_ROIs_window = NamedROITable(self)
+            self._update_ROI_actions()
+        self.named_ROIs_window.show()
+
+    def add_named_ROI(self, name=None):
+        """Name the current ROI so it is measured in every image
+
+        Parameters
+        ----------
+        name : str
+            The name of the ROI, see ROISet.add
+
+        Returns
+        -------
+        name : str
+            The name of the ROI, None when the ROI is not a rectangle (see
+            ROI_is_rectangle)
+
+        """
+
+        if not self._check_rectangle():
+            return None
+        name = self.image_set.rois.add(*self.current_ROI(), name=name)
+        self._update_named_ROIs()
+        return name
+
+    def remove_named_ROI(self, name):
+        """Remove a named ROI"""
+        self.image_set.rois.remove(name)
+        self._update_named_ROIs()
+
+    def load_named_ROIs(self, path):
+        """Replace the named ROIs with the ones saved in a file"""
+        self.image_set.rois = ROISet.load(path)
+        self._update_named_ROIs()
+
+    def _update_named_ROIs(self):
+        """Draw the named ROIs and measure them all in one pass"""
+        if self._named_ROIs is not None:
+            self.view_canvas.delete_object(self._named_ROIs, redraw=False)
+            self._named_ROIs = None
+        if self.image_set.rois:
+            Rectangle = self.view_canvas.get_draw_class('rectangle')
+            Text = self.view_canvas.get_draw_class('text')
+            CompoundObject = self.view_canvas.get_draw_class('compoundobject')
+            draw_objs = []
+            for name, sides in self.image_set.rois.items():
+                left, bottom, right, top = sides
+                draw_objs.append(Rectangle(
+                    left, bottom, right, top, color='cyan'))
+                draw_objs.append(Text(left, top, text=name, color='cyan'))
+            named_ROIs = CompoundObject(*draw_objs)
+            # The named ROIs are drawn beneath the ROI drawn by the user
+            self.view_canvas.add(
+                named_ROIs, belowThis=self._drawn_ROI(), redraw=False)
+            self._named_ROIs = named_ROIs
+        self.view_canvas.update_canvas()
+        if self.named_ROIs_window is not None:
+            self.named_ROIs_window.refresh()
+
+    @property
+    def ROI_is_rectangle(self):
+        """Whether the ROI is a rectangle or the whole image
+
+        Polygon and ellipse ROIs are only measured in the displayed image,
+        so the ROI cannot be measured in every image or named.
+        """
+        draw_obj = self._drawn_ROI()
+        return draw_obj is None or draw_obj.kind == 'rectangle'
+
+    def _check_rectangle(self):
+        if self.ROI_is_rectangle:
+            return True
+        warnings.warn(
+            "Only rectangular ROIs can be measured in every image")
+        return False
+
+    def _update_ROI_actions(self):
+        """Enable the actions that measure the ROI in every image"""
+        enabled = self.ROI_is_rectangle
+        self.measure_all_button.setEnabled(enabled)
+        if self.named_ROIs_window is not None:
+            self.named_ROIs_window.add_button.setEnabled(enabled)
+
+    def current_ROI(self):
+        """The left, bottom, right and top sides of the ROI
+
+        The whole image is the ROI when none is drawn. The sides of a
+        polygon or ellipse ROI are those of the pixels that hold it.
+        """
+        draw_obj = self._drawn_ROI()
+        if draw_obj is not None and draw_obj.kind != 'rectangle':
+            shape_mask = self._shape_mask(draw_obj)
+            if shape_mask is not None:
+                x1, y1, x2, y2 = shape_mask[0]
+                return x1 - 0.5, y1 - 0.5, x2 - 0.5, y2 - 0.5
+        elif draw_obj is not None:
+            left_x, right_x, bot_y, top_y = self.left_right_bottom_top(
+                draw_obj.x1, draw_obj.x2, draw_obj.y1, draw_obj.y2)[:4]
+            return left_x, bot_y, right_x, top_y
+        return 0, 0, self.current_image.width, self.current_image.height
+
     def save_parameters(self):
         """Save the view parameters on the image"""
         last_image = self.image_set.current_image[self.image_set.channel]
@@ -968,7 +2082,11 @@ class PDSViewer(QtWidgets.QMainWindow):
         """Restore image to the default settings"""
         self.view_canvas.get_rgbmap().reset_sarr()
         self.view_canvas.enable_autocuts('on')
-        self.view_canvas.auto_levels()
+        if self._has_prepared_cuts:
+            loval, hival = self.current_image.prepared_cuts
+            self.view_canvas.cut_levels(loval, hival, True)
+        else:
+            self.view_canvas.auto_levels()
         self.view_canvas.enable_autocuts('override')
         self.view_canvas.rotate(0.0)
         # The default transform/rotation of the image will be image specific so
@@ -999,9 +2117,61 @@ class PDSViewer(QtWidgets.QMainWindow):
 
         """
 
-        if len(view_canvas.objects) > 1:
+        self._ROI_start = (data_x, data_y)
+        self._ROI_stats = None
+        if self._drawn_ROI() is not None:
             self.delete_ROI()
 
+    def move_ROI(self, view_canvas, button, data_x, data_y):
+        """Show estimated statistics of the Region of Interest being drawn
+
+        The mean, standard deviation and number of pixels are marked as
+        provisional and updated at most once per frame of the display (see
+        ImageSet.ROI_estimate). stop_ROI sets the exact statistics when
+        drawing stops.
+
+        Parameters
+        ----------
+        See start_ROI parameters
+
+        """
+
+        if self._ROI_start is None:
+            return
+        if self.view_canvas.get_drawtype() != 'rectangle':
+            return
+        self._live_ROI = self._ROI_start + (data_x, data_y)
+        if not self._live_ROI_timer.isActive():
+            self._live_ROI_timer.start()
+
+    def _set_live_ROI_text(self):
+        if self._live_ROI is None:
+            return
+        x1, y1, x2, y2 = self._live_ROI
+        self._live_ROI = None
+        image = self.current_image
+        left_x, right_x, bot_y, top_y = self.left_right_bottom_top(
+            x1, x2, y1, y2)[:4]
+        top_y, top_in_image = self.top_right_pixel_snap(top_y, image.height)
+        bot_y, bot_in_image = self.bottom_left_pixel_snap(bot_y, image.height)
+        right_x, right_in_image = self.top_right_pixel_snap(
+            right_x, image.width)
+        left_x, left_in_image = self.bottom_left_pixel_snap(
+            left_x, image.width)
+        in_image = all(
+            (left_in_image, right_in_image, top_in_image, bot_in_image))
+        if not in_image or left_x >= right_x or bot_y >= top_y:
+            return
+        ROI_pixels = self.image_set.ROI_pixels(left_x, bot_y, right_x, top_y)
+        count, mean, std_dev = self.image_set.ROI_estimate(
+            left_x, bot_y, right_x, top_y)
+        self.pixels.setText('#Pixels: %d' % (ROI_pixels) + PROVISIONAL)
+        self.std_dev.setText('Std Dev: %.6f' % (std_dev) + PROVISIONAL)
+        self.mean.setText('Mean: %.4f' % (mean) + PROVISIONAL)
+        self.median.setText('Median: ????')
+        self.min.setText('Min: ????')
+        self.max.setText('Max: ????')
+
     def stop_ROI(self, view_canvas, button, data_x, data_y):
         """Create a Region of Interest (ROI)
 
@@ -1022,13 +2192,29 @@ class PDSViewer(QtWidgets.QMainWindow):
 
         """
 
+        # Drop the estimate of the ROI that is still being shown
+        self._ROI_start = None
+        self._live_ROI = None
+        self._live_ROI_timer.stop()
+
         # If there are no draw objects, stop
         current_image = self.image_set.current_image[self.image_set.channel]
-        if len(view_canvas.objects) == 1:
-            self.set_ROI_text(0, 0, current_image.width, current_image.height)
+        draw_obj = self._drawn_ROI()
+        self._update_ROI_actions()
+        if draw_obj is None:
+            self._set_whole_image_text()
             return
 
-        draw_obj = view_canvas.objects[1]
+        if draw_obj.kind != 'rectangle':
+            shape_mask = self._shape_mask(draw_obj)
+            if shape_mask is None:
+                # No pixel of the image is in the ROI
+                self.delete_ROI()
+                self._set_whole_image_text()
+            else:
+                box, mask = shape_mask
+                self.set_ROI_text(*box, mask=mask)
+            return
 
         # Retrieve the left, right, top, & bottom x and y values
         roi = self.left_right_bottom_top(
@@ -1037,8 +2223,8 @@ class PDSViewer(QtWidgets.QMainWindow):
 
         # Single right click deletes any ROI & sets the whole image as the ROI
         if left_x == right_x and bot_y == top_y:
-            self.set_ROI_text(0, 0, current_image.width, current_image.height)
             self.delete_ROI()
+            self._set_whole_image_text()
             return
 
         # Determine if the ROI is outside the image.
@@ -1055,8 +2241,8 @@ class PDSViewer(QtWidgets.QMainWindow):
             (left_in_image, right_in_image, top_in_image, bot_in_image)
         )
         if not in_image:
-            self.set_ROI_text(0, 0, current_image.width, current_image.height)
             self.delete_ROI()
+            self._set_whole_image_text()
             return
 
         # Snap the ROI to the edge of the image if it is outside the image
@@ -1077,6 +2263,44 @@ class PDSViewer(QtWidgets.QMainWindow):
 
         self.set_ROI_text(left_x, bot_y, right_x, top_y)
 
+    def set_ROI_shape(self, index):
+        """Draw ROIs of the shape at the index of ROI_SHAPES"""
+        self.view_canvas.set_drawtype(ROI_SHAPES[index][1])
+
+    def _shape_mask(self, draw_obj):
+        """The pixels of the image in a polygon or ellipse ROI
+
+        Returns
+        -------
+        shape_mask : tuple
+            The first and one past the last sample and line of the pixels
+            that hold the ROI and the mask of the ones in it. None when no
+            pixel of the image is in it
+
+        """
+
+        image = self.current_image
+        if draw_obj.kind == 'ellipse':
+            shape = (draw_obj.x, draw_obj.y, draw_obj.xradius,
+                     draw_obj.yradius, draw_obj.rot_deg)
+            x1, y1, x2, y2 = masks.ellipse_box(*shape)
+        elif draw_obj.kind == 'polygon':
+            x1, y1, x2, y2 = masks.polygon_box(draw_obj.points)
+        else:
+            # A polygon of fewer than three points is drawn as a line
+            return None
+        box = (max(x1, 0), max(y1, 0),
+               min(x2, image.width), min(y2, image.height))
+        if box[0] >= box[2] or box[1] >= box[3]:
+            return None
+        if draw_obj.kind == 'ellipse':
+            mask = masks.ellipse_mask(*shape, box=box)
+        else:
+            mask = masks.polygon_mask(draw_obj.points, box)
+        if not mask.any():
+            return None
+        return box, mask
+
     def top_right_pixel_snap(self, ROI_side, image_edge):
         """Snaps the top or right side of the ROI to the inclusive pixel
 
@@ -1210,11 +2434,13 @@ class PDSViewer(QtWidgets.QMainWindow):
     def delete_ROI(self):
         """Deletes the Region of Interest"""
         try:
-            self.view_canvas.deleteObject(self.view_canvas.objects[1])
+            self.view_canvas.deleteObject(self._drawn_ROI())
         except:
             return
+        finally:
+            self._update_ROI_actions()
 
-    def set_ROI_text(self, left, bottom, right, top):
+    def set_ROI_text(self, left, bottom, right, top, mask=None):
         """Set the text of the ROI information boxes
 
         When the image has three bands (colored), the ROI value boxes will
@@ -1230,63 +2456,117 @@ class PDSViewer(QtWidgets.QMainWindow):
             The x coordinate value of the right side of the ROI
         bottom : float
             The y coordinate value of the top side of the ROI
+        mask : array
+            Whether each pixel within the sides is in a polygon or ellipse
+            ROI
 
         """
 
-        data = self.image_set.ROI_data(
-            left, bottom, right, top)
         # Calculate the number of pixels in the ROI
-        ROI_pixels = self.image_set.ROI_pixels(left, bottom, right, top)
-        self.pixels.setText('#Pixels: %d' % (ROI_pixels))
-        if data.ndim == 2:
+        if mask is None:
+            ROI_pixels = self.image_set.ROI_pixels(left, bottom, right, top)
+        else:
+            ROI_pixels = np.count_nonzero(mask)
+        pixels_text = '#Pixels: %d' % (ROI_pixels)
+        if self.image_set.provisional:
+            # The statistics are of the previewed pixels only
+            pixels_text += PROVISIONAL
+        self.pixels.setText(pixels_text)
+        # The statistics of rectangles are looked up in ImageSet.stats_cache
+        # when they are calculated from the sides
+        self._ROI_stats = None
+        sides = (left, bottom, right, top)
+        if self.current_image.ndim == 2 and mask is None:
             # 2 band image is a gray scale image
-            self.set_ROI_gray_text(data)
-        elif data.ndim == 3:
+            self._start_gray_stats_text(sides)
+        elif self.current_image.ndim == 2:
+            self._set_gray_stats_text(self.image_set.ROI_stats(
+                *sides, by_band=False, mask=mask))
+        elif self.current_image.ndim == 3:
             # Three band image is a RGB colored image
             try:
-                self.set_ROI_RGB_text(data)
+                self._set_RGB_stats_text(self.image_set.ROI_stats(
+                    *sides, mask=mask))
             except:
                 # If the ROI does not contain values for each band, treat the
                 # ROI like a gray scale image
-                self.set_ROI_gray_text(data)
+                self._set_gray_stats_text(self.image_set.ROI_stats(
+                    *sides, by_band=False, mask=mask))
 
-    def set_ROI_gray_text(self, data):
+    def set_ROI_gray_text(self, data, mask=None):
         """Set the values for the ROI in the text boxes for a gray image
 
         Parameters
         ----------
         data : array
             The data from the Region of Interest
+        mask : array
+            Whether each pixel of the data is in the Region of Interest
 
         """
 
-        ROI_std_dev = self.image_set.ROI_std_dev(data=data)
-        ROI_mean = self.image_set.ROI_mean(data=data)
-        ROI_median = self.image_set.ROI_median(data=data)
-        ROI_min = self.image_set.ROI_min(data=data)
-        ROI_max = self.image_set.ROI_max(data=data)
-        self.std_dev.setText('Std Dev: %.6f' % (ROI_std_dev))
-        self.mean.setText('Mean: %.4f' % (ROI_mean))
-        self.median.setText('Median: %.1f' % (ROI_median))
-        self.min.setText('Min: %d' % (ROI_min))
-        self.max.setText('Max: %d' % (ROI_max))
-
-    def set_ROI_RGB_text(self, data):
+        stats = self.image_set.ROI_stats(data=data, by_band=False, mask=mask)
+        self._set_gray_stats_text(stats)
+
+    def _start_gray_stats_text(self, sides):
+        """Set the ROI text of a rectangle in a gray image
+
+        The number of pixels, mean and std dev of large rectangles are shown
+        right away from the summed-area tables, or estimated until they are
+        built (see ImageSet.ROI_estimate). The median, min and max are filled
+        in once found in the background (see ImageSet.start_ROI_stats).
+        """
+        future = self.image_set.start_ROI_stats(*sides, by_band=False)
+        if future.done():
+            self._set_gray_stats_text(future.result())
+            return
+        count, mean, std_dev = self.image_set.ROI_estimate(*sides)
+        table = self.current_image.summed_area_table()
+        estimated = '' if table is not None and table.ready else PROVISIONAL
+        self.std_dev.setText(
+            'Std Dev: %.6f' % (round(std_dev, 6)) + estimated)
+        self.mean.setText('Mean: %.4f' % (round(mean, 4)) + estimated)
+        self._set_pending_stats_text()
+        self._ROI_stats = future
+        future.add_done_callback(self._ROI_stats_ready.emit)
+
+    def _finish_ROI_stats(self, future):
+        # The ROI may have been redrawn or removed in the meantime
+        if future is not self._ROI_stats:
+            return
+        self._ROI_stats = None
+        if not future.cancelled() and future.exception() is None:
+            self._set_gray_stats_text(future.result())
+
+    def _set_gray_stats_text(self, stats):
+        self.std_dev.setText('Std Dev: %.6f' % (round(stats.std_dev, 6)))
+        self.mean.setText('Mean: %.4f' % (round(stats.mean, 4)))
+        self.median.setText('Median: %.1f' % (stats.median))
+        self.min.setText('Min: %d' % (stats.minimum))
+        self.max.setText('Max: %d' % (stats.maximum))
+
+    def set_ROI_RGB_text(self, data, mask=None):
         """Set the values for the ROI in the text boxes for a RGB image
 
         Parameters
         ----------
         data : array
             The data from the Region of Interest
+        mask : array
+            Whether each pixel of the data is in the Region of Interest
 
         """
 
-        calc = self.image_set
-        ROI_stdev = [calc.ROI_std_dev(data=data[:, :, n]) for n in range(3)]
-        ROI_mean = [calc.ROI_mean(data=data[:, :, n]) for n in range(3)]
-        ROI_median = [calc.ROI_median(data=data[:, :, n]) for n in range(3)]
-        ROI_max = [int(calc.ROI_max(data=data[:, :, n])) for n in range(3)]
-        ROI_min = [int(calc.ROI_min(data=data[:, :, n])) for n in range(3)]
+        # All three bands are described in one pass over the data
+        stats = self.image_set.ROI_stats(data=data[:, :, :3], mask=mask)
+        self._set_RGB_stats_text(stats)
+
+    def _set_RGB_stats_text(self, stats):
+        ROI_stdev = [round(value, 6) for value in stats.std_dev[:3]]
+        ROI_mean = [round(value, 4) for value in stats.mean[:3]]
+        ROI_median = list(stats.median[:3])
+        ROI_max = [int(value) for value in stats.maximum[:3]]
+        ROI_min = [int(value) for value in stats.minimum[:3]]
         self.std_dev.setText(
             'Std Dev: R: %.6f G: %.6f B: %.6f' % (tuple(ROI_stdev)))
         self.mean.setText(
@@ -1310,16 +2590,59 @@ class PDSViewer(QtWidgets.QMainWindow):
             self._label_window.cancel()
         if self.channels_window:
             self.channels_window.hide()
+        if self.roi_table_window is not None:
+            self.roi_table_window.close()
+        if self.named_ROIs_window is not None:
+            self.named_ROIs_window.close()
+        if self.image_set.prefetcher is not None:
+            self.image_set.prefetcher.shutdown()
+        if self.image_set.previews is not None:
+            self.image_set.previews.shutdown()
         self.close()
 
 
-def pdsview(inlist=None):
+def _frame_interval():
+    """The milliseconds between frames of the primary screen"""
+    screen = app.primaryScreen()
+    rate = screen.refreshRate() if screen is not None else 0
+    if not rate or rate <= 0:
+        rate = 60.0
+    return max(1, int(1000 / rate))
+
+
+def pdsview(inlist=None, lazy=False, prefetch_next=0, prefetch_previous=0,
+            max_cache_mb=None, processes=None, index_path=None,
+            overview_cache=None, preview_step=None):
     """Run pdsview from python shell or command line with arguments
 
     Parameters
     ----------
     inlist : list
         A list of file names/paths to display in the pdsview
+    lazy : bool
+        Load each image when it is first displayed instead of loading every
+        image at start up (see :class:`ImageSet`)
+    prefetch_next : int
+        The number of images after the current image to load in the
+        background. Implies lazy loading
+    prefetch_previous : int
+        The number of images before the current image to load in the
+        background. Implies lazy loading
+    max_cache_mb : float
+        The number of megabytes of image data to keep in memory. The data of
+        the least recently viewed images is released and loaded again when
+        they are displayed. No limit by default
+    processes : int
+        Open the images in this many worker processes at start up
+    index_path : str
+        Path to a file that keeps the labels of the opened images so they do
+        not have to be parsed again next time
+    overview_cache : str
+        Directory to save the zoomed out overviews of large images in so they
+        do not have to be built again next time
+    preview_step : int
+        Show every preview_step-th line and sample of a large image while it
+        is loaded in the background. Implies lazy loading
 
     Examples
     --------
@@ -1346,6 +2669,31 @@ def pdsview(inlist=None):
 
     pdsview * path/to/other/directory/
 
+    To only load each image when it is displayed (for large directories):
+
+    pdsview --lazy path/to/large/directory/
+
+    To keep at most 500 MB of image data in memory:
+
+    pdsview --max-cache-mb 500 path/to/large/directory/
+
+    To open the images in 8 processes at start up:
+
+    pdsview --processes 8 path/to/large/directory/
+
+    To remember the labels of the images between sessions:
+
+    pdsview --index ~/.pdsview_index.sqlite path/to/archive/
+
+    To keep the overviews of large images between sessions:
+
+    pdsview --overview-cache ~/.pdsview_overviews path/to/large/images/
+
+    To show a preview of every 8th line and sample of large images while they
+    load:
+
+    pdsview --preview-step 8 path/to/large/images/
+
     From the (i)python command line:
 
     >>> from pdsview.pdsview import pdsview
@@ -1375,8 +2723,29 @@ def pdsview(inlist=None):
     elif inlist is None:
         files = glob('*')
 
-    image_set = ImageSet(files)
+    # Only open the files that look like PDS images
+    pds_files = [filepath for filepath in files if is_pds_image(filepath)]
+    if len(pds_files) < len(files):
+        warnings.warn(
+            '%d files skipped, they are not PDS images' % (
+                len(files) - len(pds_files)))
+    files = pds_files
+
+    if overview_cache is not None:
+        overviews.disk_cache = overviews.OverviewDiskCache(overview_cache)
+    prefetch = prefetch_next > 0 or prefetch_previous > 0
+    max_cache_bytes = None
+    if max_cache_mb is not None:
+        max_cache_bytes = int(max_cache_mb * 1024 * 1024)
+    image_set = ImageSet(
+        files, lazy=lazy or prefetch or preview_step is not None,
+        max_cache_bytes=max_cache_bytes, processes=processes,
+        index_path=index_path, preview_step=preview_step)
     w = PDSViewer(image_set)
+    if prefetch:
+        image_set.enable_prefetch(
+            prefetch_next, prefetch_previous,
+            autocuts=w.view_canvas.autocuts)
     w.resize(780, 770)
     w.show()
     w.view_canvas.zoom_fit()
@@ -1401,5 +2770,43 @@ def cli():
         'file', nargs='*',
         help="Input filename or glob for files with certain extensions"
         )
+    parser.add_argument(
+        '--lazy', action='store_true',
+        help="Only read the labels at start up and load images when displayed"
+        )
+    parser.add_argument(
+        '--prefetch-next', type=int, default=0, metavar='N',
+        help="Load the next N images in the background (implies --lazy)"
+        )
+    parser.add_argument(
+        '--prefetch-previous', type=int, default=0, metavar='M',
+        help="Load the previous M images in the background (implies --lazy)"
+        )
+    parser.add_argument(
+        '--max-cache-mb', type=float, default=None, metavar='MB',
+        help="Release the least recently viewed images over MB of data"
+        )
+    parser.add_argument(
+        '--processes', type=int, default=None, metavar='N',
+        help="Open the images in N processes at start up"
+        )
+    parser.add_argument(
+        '--index', default=None, metavar='PATH',
+        help="Keep the labels of opened images in an index file at PATH"
+        )
+    parser.add_argument(
+        '--overview-cache', default=None, metavar='DIR',
+        help="Save the overviews of large images in DIR"
+        )
+    parser.add_argument(
+        '--preview-step', type=int, default=None, metavar='K',
+        help="Preview every K-th line and sample of large images while they "
+        "load (implies --lazy)"
+        )
     args = parser.parse_args()
-    pdsview(args.file)
+    pdsview(
+        args.file, lazy=args.lazy, prefetch_next=args.prefetch_next,
+        prefetch_previous=args.prefetch_previous,
+        max_cache_mb=args.max_cache_mb, processes=args.processes,
+        index_path=args.index, overview_cache=args.overview_cache,
+        preview_step=args.preview_step)
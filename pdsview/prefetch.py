@@ -0,0 +1,154 @@
+"""Decode the images around the current image in background threads"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from ginga.BaseImage import BaseImage
+
+from .reader import read_product, band_arrays
+
+
+class Prefetcher(object):
+    """Decode the next and previous products of an :class:`ImageSet`
+
+    Products within ``forward`` images after and ``backward`` images before
+    the current image are opened in a thread pool while the current image is
+    displayed. When the current image moves, work that is still waiting for a
+    thread and results that are outside of the new window are dropped.
+
+    Parameters
+    ----------
+    image_set : :class:`ImageSet`
+        The image set to prefetch the products of
+    forward : :obj:`int`
+        The number of products after the current image to decode
+    backward : :obj:`int`
+        The number of products before the current image to decode
+    max_workers : :obj:`int`
+        The number of threads decoding products
+    autocuts : :class:`ginga.AutoCuts.AutoCutsBase`
+        When given, the cut levels of each channel are calculated along with
+        the data so the viewer does not have to calculate them
+
+    Attributes
+    ----------
+    hits : :obj:`int`
+        The number of loads served by a prefetched product
+    misses : :obj:`int`
+        The number of loads that had to decode the product themselves
+    cancelled : :obj:`int`
+        The number of prefetches dropped because the current image moved away
+    """
+
+    def __init__(self, image_set, forward=2, backward=1, max_workers=2,
+                 autocuts=None):
+        self.image_set = image_set
+        self.forward = forward
+        self.backward = backward
+        self.autocuts = autocuts
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._futures = {}
+        self.hits = 0
+        self.misses = 0
+        self.cancelled = 0
+
+    def __contains__(self, filepath):
+        return filepath in self._futures
+
+    @property
+    def hit_rate(self):
+        """:obj:`float` The fraction of loads served by a prefetched product"""
+        loads = self.hits + self.misses
+        if loads == 0:
+            return 0.0
+        return self.hits / float(loads)
+
+    def window(self, index):
+        """The indices of the images to prefetch around the index
+
+        Parameters
+        ----------
+        index : :obj:`int`
+            The index of the current image
+
+        Returns
+        -------
+        indices : :obj:`list`
+            The indices in the order they should be decoded, closest first
+        """
+        number_of_images = len(self.image_set.images)
+        indices = []
+        for step in range(1, max(self.forward, self.backward) + 1):
+            offsets = []
+            if step <= self.forward:
+                offsets.append(step)
+            if step <= self.backward:
+                offsets.append(-step)
+            for offset in offsets:
+                neighbor = (index + offset) % number_of_images
+                if neighbor != index and neighbor not in indices:
+                    indices.append(neighbor)
+        return indices
+
+    def update(self, index):
+        """Schedule the products around the index and drop the others
+
+        Parameters
+        ----------
+        index : :obj:`int`
+            The index of the current image
+        """
+        images = self.image_set.images
+        window = [images[neighbor] for neighbor in self.window(index)]
+        wanted = set(channels[0].filepath for channels in window)
+        wanted.add(images[index][0].filepath)
+        for filepath in list(self._futures):
+            if filepath not in wanted:
+                future = self._futures.pop(filepath)
+                if future.cancel() or not future.done():
+                    self.cancelled += 1
+        for channels in window:
+            filepath = channels[0].filepath
+            if channels[0].is_loaded or filepath in self._futures:
+                continue
+            self._futures[filepath] = self._executor.submit(
+                self._decode, filepath, len(channels), channels[0].label,
+                channels[0].layout)
+
+    def pop(self, filepath):
+        """Take the prefetched product, waiting for it if it is being decoded
+
+        Parameters
+        ----------
+        filepath : :obj:`str`
+            The path of the product
+
+        Returns
+        -------
+        product : :obj:`tuple`
+            The :class:`PDS3Image`, its image data and the cut levels of each
+            channel (None when not calculated). None when the product was not
+            prefetched.
+        """
+        future = self._futures.pop(filepath, None)
+        if future is None or future.cancelled():
+            self.misses += 1
+            return None
+        self.hits += 1
+        return future.result()
+
+    def shutdown(self):
+        """Drop the scheduled work and stop the threads"""
+        for future in self._futures.values():
+            future.cancel()
+        self._futures.clear()
+        self._executor.shutdown(wait=False)
+
+    def _decode(self, filepath, bands, label_array, layout):
+        pds_image, image_data = read_product(filepath, label_array, layout)
+        cuts = None
+        if self.autocuts is not None and image_data is not None:
+            cuts = [
+                self.autocuts.calc_cut_levels(BaseImage(data_np=data))
+                for data in band_arrays(image_data, bands)
+            ]
+        return pds_image, image_data, cuts
@@ -0,0 +1,139 @@
+"""Show strided previews of large images while they load in the background"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from ginga.BaseImage import BaseImage
+
+from .reader import read_product, band_arrays
+from .tiles import TiledImage
+
+
+#: Previews show every this many lines and samples by default
+PREVIEW_STEP = 8
+
+#: Appended to the pixel value and ROI texts while a preview is displayed
+PROVISIONAL = ' (preview)'
+
+
+def read_preview(layout, band, step):
+    """Read every ``step``-th line and sample of a band from the file
+
+    Parameters
+    ----------
+    layout : :obj:`tuple`
+        The layout of the image object (see :func:`reader.image_layout`)
+    band : :obj:`int`
+        The band to read
+    step : :obj:`int`
+        The number of lines and samples between the previewed pixels
+
+    Returns
+    -------
+    preview : :class:`numpy.ndarray`
+        The previewed lines and samples
+    """
+    return TiledImage(layout, band)[::step, ::step]
+
+
+class PreviewLoader(object):
+    """Display previews of products while their data is read in a thread
+
+    Each channel shows a strided preview read directly from the file (see
+    :meth:`ImageStamp.show_preview`) until :meth:`finish` swaps in the full
+    data. The limits of each band are found in the thread as well, so the
+    swap does not have to read the whole band again.
+
+    Parameters
+    ----------
+    step : :obj:`int`
+        The number of lines and samples between the previewed pixels
+    max_workers : :obj:`int`
+        The number of threads reading products
+    """
+
+    def __init__(self, step=PREVIEW_STEP, max_workers=1):
+        self.step = step
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._futures = {}
+
+    def __contains__(self, filepath):
+        return filepath in self._futures
+
+    def is_read(self, filepath):
+        """Whether a product being previewed has been read"""
+        future = self._futures.get(filepath)
+        return future is not None and future.done()
+
+    def start(self, channels, done=None):
+        """Show the previews of a product's channels and start reading it
+
+        Parameters
+        ----------
+        channels : :obj:`list`
+            The :class:`ImageStamp` of each channel of the product. Their
+            layout must be known
+        done : callable
+            Called with ``channels`` from the reading thread once the data has
+            been read
+
+        A product that is already being read is not read again, and one that
+        has been read is finished (see :meth:`finish`).
+        """
+        filepath = channels[0].filepath
+        if self.is_read(filepath):
+            self.finish(channels)
+            return
+        if filepath in self._futures:
+            return
+        for image in channels:
+            image.show_preview(
+                read_preview(image.layout, image.band, self.step), self.step)
+        future = self._executor.submit(
+            _read, filepath, len(channels), channels[0].label,
+            channels[0].layout)
+        if done is not None:
+            future.add_done_callback(lambda future: done(channels))
+        self._futures[filepath] = future
+
+    def finish(self, channels):
+        """Set the full data of the channels, waiting for it to be read
+
+        Channels that were loaded in the meantime keep their data.
+
+        Parameters
+        ----------
+        channels : :obj:`list`
+            The :class:`ImageStamp` of each channel of the product
+
+        Returns
+        -------
+        finished : :obj:`bool`
+            False when the product was not being read
+        """
+        future = self._futures.pop(channels[0].filepath, None)
+        if future is None:
+            return False
+        pds_image, image_data, minmax = future.result()
+        band_data = band_arrays(image_data, len(channels))
+        for image, data, limits in zip(channels, band_data, minmax):
+            if not image.is_loaded:
+                image.set_band_data(pds_image, data, minmax=limits)
+        return True
+
+    def shutdown(self):
+        """Drop the reads that have not started and stop the thread"""
+        for future in self._futures.values():
+            future.cancel()
+        self._futures.clear()
+        self._executor.shutdown(wait=False)
+
+
+def _read(filepath, bands, label_array, layout):
+    pds_image, image_data = read_product(filepath, label_array, layout)
+    minmax = []
+    for data in band_arrays(image_data, bands):
+        image = BaseImage(data_np=data)
+        minmax.append(
+            (image.minval, image.maxval, image.minval_noinf,
+             image.maxval_noinf))
+    return pds_image, image_data, minmax
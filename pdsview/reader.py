@@ -0,0 +1,338 @@
+"""Helpers to read PDS products from disk"""
+
+import os
+import re
+
+import pvl
+import numpy as np
+from planetaryimage import PDS3Image
+from planetaryimage.pds3image import Pointer
+
+
+#: The number of bytes read at once to find the end of a label
+LABEL_CHUNK_BYTES = 64 * 1024
+
+#: The most bytes that are read to find the end of a label
+MAX_LABEL_BYTES = 1024 * 1024
+
+#: The number of bytes read to recognize a PDS product
+SIGNATURE_BYTES = 512
+
+_END = re.compile(br'^[ \t]*END[ \t]*\r?$', re.MULTILINE)
+_RECORD_BYTES = re.compile(br'^[ \t]*RECORD_BYTES[ \t]*=[ \t]*(\d+)', re.M)
+_LABEL_RECORDS = re.compile(br'^[ \t]*LABEL_RECORDS[ \t]*=[ \t]*(\d+)', re.M)
+_SIGNATURE = re.compile(br'^[ \t]*(PDS|ODL)_VERSION_ID[ \t]*=', re.M)
+_IMAGE_POINTER = re.compile(br'^[ \t]*\^IMAGE[ \t]*=', re.M)
+
+
+def _label_size(chunk):
+    """The size of the label area in bytes or None if it is not given"""
+    record_bytes = _RECORD_BYTES.search(chunk)
+    label_records = _LABEL_RECORDS.search(chunk)
+    if record_bytes is None or label_records is None:
+        return None
+    return int(record_bytes.group(1)) * int(label_records.group(1))
+
+
+def is_pds_image(filepath):
+    """Whether a file looks like a PDS product with an image object
+
+    Only the start of the file is read. It must have a ``PDS_VERSION_ID`` or
+    ``ODL_VERSION_ID`` statement and an ``^IMAGE`` pointer. When the label is
+    longer than :data:`SIGNATURE_BYTES`, up to :data:`LABEL_CHUNK_BYTES` are
+    searched for the pointer.
+
+    Parameters
+    ----------
+    filepath : :obj:`str`
+        Path to the file
+
+    Returns
+    -------
+    is_pds_image : :obj:`bool`
+        False when the file is certainly not a PDS image
+    """
+    try:
+        with open(filepath, 'rb') as f:
+            head = f.read(SIGNATURE_BYTES)
+            if _SIGNATURE.search(head) is None:
+                return False
+            if _IMAGE_POINTER.search(head) is not None:
+                return True
+            if len(head) < SIGNATURE_BYTES or _END.search(head) is not None:
+                return False
+            head += f.read(LABEL_CHUNK_BYTES - len(head))
+    except (IOError, OSError):
+        # Directories and files that cannot be read
+        return False
+    end = _END.search(head)
+    if end is not None:
+        head = head[:end.end()]
+    return _IMAGE_POINTER.search(head) is not None
+
+
+def read_label_lines(filepath, max_bytes=MAX_LABEL_BYTES):
+    """Read the PDS label of a product without reading the image data
+
+    The start of the file is read at once and searched for the ``END``
+    statement. The rest of the label area (``LABEL_RECORDS`` *
+    ``RECORD_BYTES``) is only read when the label is longer than the first
+    read, and never more than ``max_bytes``.
+
+    Parameters
+    ----------
+    filepath : :obj:`str`
+        Path to the PDS product
+    max_bytes : :obj:`int`
+        The most bytes to read from the file
+
+    Returns
+    -------
+    label_array : :obj:`list`
+        The lines of the label up to and including the ``END`` statement
+
+    Raises
+    ------
+    ValueError
+        When there is no ``END`` statement and the size of the label area is
+        not given
+    """
+    with open(filepath, 'rb') as f:
+        chunk = f.read(min(LABEL_CHUNK_BYTES, max_bytes))
+        label_size = _label_size(chunk)
+        end = _END.search(chunk)
+        limit = min(label_size or max_bytes, max_bytes)
+        if end is None and len(chunk) < limit:
+            chunk += f.read(limit - len(chunk))
+            end = _END.search(chunk)
+    if end is not None:
+        label_bytes = chunk[:end.end()]
+    elif label_size is not None:
+        # The END statement is missing, use the label area instead
+        label_bytes = chunk[:label_size].rstrip(b'\x00 \r\n')
+    else:
+        raise ValueError(
+            'No END statement in the first %d bytes of %s' % (
+                len(chunk), filepath))
+    return [line.rstrip() for line in label_bytes.decode().split('\n')]
+
+
+def probe_product(filepath):
+    """Read what is needed to open a product from its label alone
+
+    Parameters
+    ----------
+    filepath : :obj:`str`
+        Path to the PDS product
+
+    Returns
+    -------
+    bands : :obj:`int`
+        The number of bands in the image object
+    label_array : :obj:`list`
+        The lines of the label (see :func:`read_label_lines`)
+    layout : :obj:`tuple`
+        The layout of the image object (see :func:`image_layout`), None when
+        it cannot be mapped
+    """
+    label_array = read_label_lines(filepath)
+    label = pvl.loads('\n'.join(label_array))
+    bands = label['IMAGE']['BANDS']
+    try:
+        layout = image_layout(filepath, label)
+    except ValueError:
+        layout = None
+    return bands, label_array, layout
+
+
+class MappedPDS3Image(PDS3Image):
+    """A :class:`PDS3Image` with its image object mapped into memory
+
+    The data is a read-only :class:`numpy.memmap` of the image object so
+    opening the product only parses the label. The pages are read by the
+    operating system as the data is accessed.
+
+    Parameters
+    ----------
+    filename : :obj:`str`
+        Path to the PDS product
+    label : :class:`pvl.PVLModule`
+        The parsed label of the product. When the layout is given, the lines of
+        the label can be given instead and they are parsed when the label is
+        first used
+    layout : :obj:`tuple`
+        The layout of the image object (see :func:`image_layout`). Found
+        from the label when not given
+
+    Raises
+    ------
+    ValueError
+        When the layout of the image object cannot be mapped
+    """
+
+    def __init__(self, filename, label, layout=None):
+        self.filename = filename
+        self.compression = None
+        self.label = label
+        if layout is None:
+            layout = image_layout(filename, label)
+        self.layout = layout
+        data_filepath, offset, dtype, shape = layout
+        self.data = np.memmap(
+            data_filepath, dtype=dtype, mode='r', offset=offset, shape=shape)
+
+    @property
+    def label(self):
+        """:class:`pvl.PVLModule` The parsed label of the product"""
+        if isinstance(self._label, list):
+            self._label = pvl.loads('\n'.join(self._label))
+        return self._label
+
+    @label.setter
+    def label(self, label):
+        self._label = label
+
+    @property
+    def image(self):
+        """The lines, samples (and bands) of the data without copying it"""
+        if self.bands == 1:
+            return self.data[0]
+        elif self.bands == 3:
+            # Move the bands to the last axis without copying so each band is
+            # still a contiguous plane of the file
+            return self.data.transpose(1, 2, 0)
+
+
+def image_layout(filepath, label):
+    """Locate the image object of a product from its label
+
+    Parameters
+    ----------
+    filepath : :obj:`str`
+        Path to the PDS product
+    label : :class:`pvl.PVLModule`
+        The parsed label of the product
+
+    Returns
+    -------
+    data_filepath : :obj:`str`
+        The path of the file the image object is in
+    offset : :obj:`int`
+        The byte offset of the image object in the file
+    dtype : :class:`numpy.dtype`
+        The type of the samples
+    shape : :obj:`tuple`
+        The number of bands, lines and samples
+
+    Raises
+    ------
+    ValueError
+        When the image object is not stored as uncompressed band sequential
+        samples without line prefix or suffix bytes
+    """
+    if filepath.endswith(('.gz', '.bz2')):
+        raise ValueError('Compressed products cannot be mapped')
+    image = label['IMAGE']
+    bands = image.get('BANDS', 1)
+    storage = image.get('BAND_STORAGE_TYPE', 'BAND_SEQUENTIAL')
+    if bands > 1 and storage != 'BAND_SEQUENTIAL':
+        raise ValueError('Unsupported band storage type: %r' % storage)
+    if image.get('LINE_PREFIX_BYTES', 0) or image.get('LINE_SUFFIX_BYTES', 0):
+        raise ValueError('Lines with prefix or suffix bytes cannot be mapped')
+    try:
+        sample_type = PDS3Image.SAMPLE_TYPES[image['SAMPLE_TYPE']]
+    except KeyError:
+        raise ValueError('Unsupported sample type: %r' % image['SAMPLE_TYPE'])
+    if sample_type[1] == 'S':
+        raise ValueError('Bit string samples cannot be mapped')
+    dtype = np.dtype('%s%d' % (sample_type, image['SAMPLE_BITS'] // 8))
+    shape = (bands, image['LINES'], image['LINE_SAMPLES'])
+    pointer = Pointer.parse(label['^IMAGE'], label.get('RECORD_BYTES', 0))
+    data_filepath = filepath
+    if pointer.filename is not None:
+        data_filepath = os.path.join(
+            os.path.dirname(filepath), pointer.filename)
+    size = int(np.prod(shape)) * dtype.itemsize
+    if pointer.bytes + size > os.path.getsize(data_filepath):
+        raise ValueError('The image object extends past the end of the file')
+    return data_filepath, pointer.bytes, dtype, shape
+
+
+def read_product(filepath, label_array=None, layout=None):
+    """Open a product, mapping its image object into memory when possible
+
+    Parameters
+    ----------
+    filepath : :obj:`str`
+        Path to the PDS product
+    label_array : :obj:`list`
+        The lines of the label when they have already been read (see
+        :func:`read_label_lines`)
+    layout : :obj:`tuple`
+        The layout of the image object when it is already known (see
+        :func:`image_layout`). The label is then not parsed
+
+    Returns
+    -------
+    pds_image : :class:`PDS3Image`
+        The opened product
+    image_data : :class:`numpy.ndarray`
+        The image of the product as lines, samples (and bands when there are
+        3 bands). None when the number of bands is not supported
+    """
+    try:
+        if label_array is None:
+            label_array = read_label_lines(filepath)
+        if layout is None:
+            label = pvl.loads('\n'.join(label_array))
+        else:
+            label = label_array
+        pds_image = MappedPDS3Image(filepath, label, layout)
+    except ValueError:
+        # Compressed products and layouts that cannot be mapped are decoded
+        # by planetaryimage
+        pds_image = PDS3Image.open(filepath)
+    return pds_image, pds_image.image
+
+
+def is_mapped(data):
+    """Whether an array is a view of a file mapped into memory
+
+    The pages of mapped data are read, and dropped, by the operating system
+    as they are used, so the array takes hardly any memory of its own.
+
+    Parameters
+    ----------
+    data : :class:`numpy.ndarray`
+        The array to check
+
+    Returns
+    -------
+    mapped : :obj:`bool`
+        True when the array or an array it views is a :class:`numpy.memmap`
+    """
+    while isinstance(data, np.ndarray):
+        if isinstance(data, np.memmap):
+            return True
+        data = data.base
+    return False
+
+
+def band_arrays(image_data, bands):
+    """Split the image data into the data for each of the channels
+
+    Parameters
+    ----------
+    image_data : :class:`numpy.ndarray`
+        The image of the product
+    bands : :obj:`int`
+        The number of channels the product is displayed as
+
+    Returns
+    -------
+    arrays : :obj:`list`
+        A view of the data for each channel
+    """
+    if bands == 3 and image_data.ndim == 3:
+        return [image_data[:, :, n] for n in range(bands)]
+    return [image_data] * bands
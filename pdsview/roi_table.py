@@ -0,0 +1,180 @@
+from qtpy import QtWidgets, QtCore
+
+from .batch import write_csv
+
+
+class ROITable(QtWidgets.QDialog):
+    """A table of the statistics of one ROI in every image
+
+    The rows are filled in as the images are measured.
+
+    Parameters
+    ----------
+    measurement : ROIMeasurement object
+        The measurement to show, started by the table
+    """
+
+    columns = ['Image', 'Pixels', 'Mean', 'Std Dev', 'Median', 'Min', 'Max']
+
+    # Carries the rows of an image from the thread that measured it
+    _measured = QtCore.Signal(int, object)
+
+    def __init__(self, measurement):
+        super(ROITable, self).__init__()
+        self.measurement = measurement
+        self.measured = 0
+
+        # The first row of each image, its channels are the rows after it
+        self._first_rows = []
+        row = 0
+        for channels in measurement.images:
+            self._first_rows.append(row)
+            row += len(channels)
+
+        self.table = QtWidgets.QTableWidget(
+            len(measurement), len(self.columns))
+        self.table.setHorizontalHeaderLabels(self.columns)
+        self.table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        channels = [image for images in measurement.images for image in images]
+        for row, image in enumerate(channels):
+            self.table.setItem(row, 0, QtWidgets.QTableWidgetItem(
+                image.image_name))
+
+        self.progress = QtWidgets.QLabel()
+        self.export_button = QtWidgets.QPushButton('Export CSV')
+        self.export_button.clicked.connect(self.export)
+        self.close_button = QtWidgets.QPushButton('Close')
+        self.close_button.clicked.connect(self.close)
+
+        layout = QtWidgets.QGridLayout()
+        layout.addWidget(self.table, 0, 0, 1, 3)
+        layout.addWidget(self.progress, 1, 0)
+        layout.addWidget(self.export_button, 1, 1)
+        layout.addWidget(self.close_button, 1, 2)
+        self.setLayout(layout)
+        self.setWindowTitle('ROI Statistics')
+        self.resize(700, 400)
+        self._set_progress_text()
+
+        self._measured.connect(self.add_rows)
+        measurement.start(self._measured.emit)
+
+    def add_rows(self, index, rows):
+        """Show the statistics of an image once it has been measured"""
+        first_row = self._first_rows[index]
+        for row, stats in enumerate(rows, first_row):
+            values = [
+                '%d' % (stats.pixels), '%.4f' % (stats.mean),
+                '%.6f' % (stats.std_dev), '%.1f' % (stats.median),
+                '%s' % (stats.minimum), '%s' % (stats.maximum)]
+            for column, value in enumerate(values, 1):
+                self.table.setItem(
+                    row, column, QtWidgets.QTableWidgetItem(value))
+        self.measured += 1
+        self._set_progress_text()
+
+    def _set_progress_text(self):
+        self.progress.setText('%d of %d images measured' % (
+            self.measured, len(self.measurement.images)))
+
+    def export(self, path=None):
+        """Save the statistics to a CSV file, asking where when not given"""
+        if not path:
+            path = QtWidgets.QFileDialog.getSaveFileName(
+                self, 'Export CSV', 'roi_statistics.csv', 'CSV (*.csv)')[0]
+        if path:
+            write_csv(self.measurement, path)
+
+    def closeEvent(self, event):
+        self.measurement.cancel()
+        super(ROITable, self).closeEvent(event)
+
+
+class NamedROITable(QtWidgets.QDialog):
+    """A table of the statistics of the named ROIs in the displayed image
+
+    The table is refreshed by the viewer whenever the image, the channel or
+    the named ROIs change.
+
+    Parameters
+    ----------
+    viewer : PDSViewer object
+        The viewer whose named ROIs are shown
+    """
+
+    columns = ['ROI', 'Pixels', 'Mean', 'Std Dev', 'Median', 'Min', 'Max']
+
+    def __init__(self, viewer):
+        super(NamedROITable, self).__init__()
+        self.viewer = viewer
+
+        self.table = QtWidgets.QTableWidget(0, len(self.columns))
+        self.table.setHorizontalHeaderLabels(self.columns)
+        self.table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
+
+        self.add_button = QtWidgets.QPushButton('Add ROI')
+        self.add_button.clicked.connect(self.add)
+        self.remove_button = QtWidgets.QPushButton('Remove')
+        self.remove_button.clicked.connect(self.remove)
+        self.save_button = QtWidgets.QPushButton('Save')
+        self.save_button.clicked.connect(self.save)
+        self.load_button = QtWidgets.QPushButton('Load')
+        self.load_button.clicked.connect(self.load)
+        self.close_button = QtWidgets.QPushButton('Close')
+        self.close_button.clicked.connect(self.close)
+
+        layout = QtWidgets.QGridLayout()
+        layout.addWidget(self.table, 0, 0, 1, 5)
+        for column, button in enumerate((
+                self.add_button, self.remove_button, self.save_button,
+                self.load_button, self.close_button)):
+            layout.addWidget(button, 1, column)
+        self.setLayout(layout)
+        self.setWindowTitle('Named ROIs')
+        self.resize(700, 300)
+        self.refresh()
+
+    def refresh(self):
+        """Measure every named ROI in the displayed image at once"""
+        stats = self.viewer.image_set.named_ROI_stats()
+        self.table.setRowCount(len(stats))
+        for row, (name, roi) in enumerate(stats.items()):
+            values = [
+                name, '%d' % (roi.count), '%.4f' % (roi.mean),
+                '%.6f' % (roi.std_dev), '%.1f' % (roi.median),
+                '%s' % (roi.minimum), '%s' % (roi.maximum)]
+            for column, value in enumerate(values):
+                self.table.setItem(
+                    row, column, QtWidgets.QTableWidgetItem(value))
+
+    @property
+    def selected_names(self):
+        indexes = self.table.selectedIndexes()
+        rows = sorted(set(index.row() for index in indexes))
+        return [self.table.item(row, 0).text() for row in rows]
+
+    def add(self):
+        """Name the ROI drawn in the viewer"""
+        self.viewer.add_named_ROI()
+
+    def remove(self):
+        """Remove the selected ROIs"""
+        for name in self.selected_names:
+            self.viewer.remove_named_ROI(name)
+
+    def save(self, path=None):
+        """Save the named ROIs, asking where when not given"""
+        if not path:
+            path = QtWidgets.QFileDialog.getSaveFileName(
+                self, 'Save ROIs', 'rois.json', 'JSON (*.json)')[0]
+        if path:
+            self.viewer.image_set.rois.save(path)
+
+    def load(self, path=None):
+        """Load named ROIs, asking for the file when not given"""
+        if not path:
+            path = QtWidgets.QFileDialog.getOpenFileName(
+                self, 'Load ROIs', '', 'JSON (*.json)')[0]
+        if path:
+            self.viewer.load_named_ROIs(path)
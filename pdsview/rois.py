@@ -0,0 +1,148 @@
+"""Named Regions of Interest that are measured together"""
+
+import io
+import json
+import math
+from collections import OrderedDict
+
+from .stats import roi_stats
+
+
+class ROISet(object):
+    """Named rectangular Regions of Interest that apply to every image
+
+    Each Region of Interest is kept as its left, bottom, right and top sides,
+    like :meth:`ImageSet.ROI_data` takes them. Sets are saved as JSON so a
+    campaign's standard regions can be loaded again.
+
+    Parameters
+    ----------
+    rois : :obj:`list`
+        The name and sides of each Region of Interest
+    """
+
+    def __init__(self, rois=()):
+        self._rois = OrderedDict()
+        for name, sides in rois:
+            self._rois[name] = tuple(sides)
+
+    def __len__(self):
+        return len(self._rois)
+
+    def __iter__(self):
+        return iter(self._rois)
+
+    def __contains__(self, name):
+        return name in self._rois
+
+    def __getitem__(self, name):
+        return self._rois[name]
+
+    def items(self):
+        """The name and sides of each Region of Interest, in order"""
+        return list(self._rois.items())
+
+    def add(self, left, bottom, right, top, name=None):
+        """Add a Region of Interest, replacing any with the same name
+
+        Parameters
+        ----------
+        left, bottom, right, top : :obj:`float`
+            The sides of the Region of Interest
+        name : :obj:`str`
+            The name of the Region of Interest. ``ROI n`` by default
+
+        Returns
+        -------
+        name : :obj:`str`
+            The name of the Region of Interest
+        """
+        if name is None:
+            number = len(self._rois) + 1
+            while 'ROI %d' % number in self._rois:
+                number += 1
+            name = 'ROI %d' % number
+        self._rois[name] = (left, bottom, right, top)
+        return name
+
+    def remove(self, name):
+        """Remove a Region of Interest by name"""
+        del self._rois[name]
+
+    def clear(self):
+        self._rois.clear()
+
+    def save(self, path):
+        """Save the Regions of Interest to a JSON file"""
+        rois = [
+            OrderedDict([
+                ('name', name), ('left', left), ('bottom', bottom),
+                ('right', right), ('top', top)])
+            for name, (left, bottom, right, top) in self._rois.items()
+        ]
+        text = json.dumps({'rois': rois}, indent=2)
+        with io.open(path, 'w', encoding='utf-8') as roi_file:
+            roi_file.write(u'%s\n' % text)
+
+    @classmethod
+    def load(cls, path):
+        """Load the Regions of Interest saved with :meth:`save`"""
+        with io.open(path, encoding='utf-8') as roi_file:
+            rois = json.load(roi_file)['rois']
+        return cls(
+            (roi['name'], (roi['left'], roi['bottom'], roi['right'],
+                           roi['top']))
+            for roi in rois)
+
+    def measure(self, image):
+        """Calculate the statistics of every Region of Interest of an image
+
+        The area that holds all of the Regions of Interest is cut out of the
+        image at once, so the image is read once. Regions that are far apart
+        are cut out separately.
+
+        Parameters
+        ----------
+        image : :class:`ImageStamp`
+            The image to measure
+
+        Returns
+        -------
+        stats : :class:`collections.OrderedDict`
+            The :class:`stats.ROIStats` of each Region of Interest by name
+        """
+        boxes = OrderedDict(
+            (name, _pixel_box(sides, image.width, image.height))
+            for name, sides in self._rois.items())
+        results = OrderedDict()
+        if not boxes:
+            return results
+        x1 = min(box[0] for box in boxes.values())
+        y1 = min(box[1] for box in boxes.values())
+        x2 = max(box[2] for box in boxes.values())
+        y2 = max(box[3] for box in boxes.values())
+        area = sum(_area(box) for box in boxes.values())
+        cutout = None
+        if _area((x1, y1, x2, y2)) <= 2 * area:
+            cutout = image.cutout_data(x1, y1, x2, y2)
+        for name, box in boxes.items():
+            left, bottom, right, top = box
+            if cutout is None:
+                data = image.cutout_data(left, bottom, right, top)
+            else:
+                data = cutout[bottom - y1:top - y1, left - x1:right - x1]
+            results[name] = roi_stats(data, by_band=False)
+        return results
+
+
+def _pixel_box(sides, width, height):
+    """The first and one past the last sample and line in the image"""
+    left, bottom, right, top = [int(math.ceil(side)) for side in sides]
+    left, right = [min(max(x, 0), width) for x in (left, right)]
+    bottom, top = [min(max(y, 0), height) for y in (bottom, top)]
+    return left, bottom, max(left, right), max(bottom, top)
+
+
+def _area(box):
+    left, bottom, right, top = box
+    return (right - left) * (top - bottom)
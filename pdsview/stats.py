@@ -0,0 +1,510 @@
+"""Statistics of the pixels in a Region of Interest"""
+
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+#: The number of pixels summarized at a time
+CHUNK_PIXELS = 1024 * 1024
+
+#: Bands whose summed-area tables would take more bytes do not get them
+SUMMED_AREA_MAX_BYTES = 512 * 1024 * 1024
+
+_executor = ThreadPoolExecutor(max_workers=1)
+
+
+class ROIStats(namedtuple(
+        'ROIStats',
+        ['count', 'mean', 'std_dev', 'minimum', 'maximum', 'median'])):
+    """Statistics of a Region of Interest
+
+    Each field is a number for a single band and an array with a value per
+    band for several bands. ``minimum`` and ``maximum`` ignore NaN values
+    like :func:`numpy.nanmin`, the other fields are NaN when the region has
+    NaN values like :func:`numpy.mean`.
+
+    Attributes
+    ----------
+    count : :obj:`int`
+        The number of pixels
+    mean : :obj:`float`
+        The mean pixel value
+    std_dev : :obj:`float`
+        The population standard deviation of the pixel values
+    minimum : number
+        The smallest pixel value, of the type of the data
+    maximum : number
+        The largest pixel value, of the type of the data
+    median : :obj:`float`
+        The median pixel value. None when not calculated
+    """
+
+    __slots__ = ()
+
+
+def roi_stats(data, median=True, by_band=True, chunk_pixels=CHUNK_PIXELS,
+              mask=None):
+    """Calculate the statistics of a Region of Interest in one pass
+
+    The lines of the region are summarized ``chunk_pixels`` at a time. The
+    mean and spread of each chunk are merged into the running totals (Chan et
+    al.), which keeps the standard deviation accurate for large values. The
+    bands of a 3 dimensional region are summarized together. The median of
+    integers of up to 16 bits is found exactly from a count of each value
+    made in the same pass (see :func:`roi_percentiles`).
+
+    A mask restricts the statistics to some of the pixels, such as those of
+    a polygon or ellipse (see :mod:`masks`). The masked pixels are summarized
+    where they are instead of being gathered into a copy, except to find the
+    median of data that is not counted.
+
+    Parameters
+    ----------
+    data : :class:`numpy.ndarray`
+        The lines and samples, and possibly bands, of the region
+    median : :obj:`bool`
+        Whether to find the median, which is the only statistic that needs
+        the whole region at once
+    by_band : :obj:`bool`
+        Whether to describe each band of a 3 dimensional region. All of the
+        values are described together otherwise
+    chunk_pixels : :obj:`int`
+        The number of pixels to summarize at a time
+    mask : :class:`numpy.ndarray`
+        Whether each line and sample of the region is described. All of them
+        are by default
+
+    Returns
+    -------
+    stats : :class:`ROIStats`
+        The statistics of the region
+    """
+    mask = _as_mask(mask, data, by_band)
+    data, single_band = _as_bands(data, by_band)
+    bands = data.shape[2]
+
+    count = 0
+    mean = np.zeros(bands)
+    m2 = np.zeros(bands)
+    minimum = maximum = None
+    counts = None
+    if median and _countable(data.dtype):
+        counts = np.zeros((bands, _value_range(data.dtype)), dtype=np.int64)
+    for chunk, chunk_mask in _chunks(data, chunk_pixels, mask):
+        if chunk_mask is None:
+            chunk_count = chunk.shape[0]
+        else:
+            chunk_count = np.count_nonzero(chunk_mask)
+            if chunk_count == 0:
+                continue
+            chunk_mask = chunk_mask[:, np.newaxis]
+        if counts is not None:
+            counts += _count_values(chunk, chunk_mask)
+        values = chunk.astype(np.float64)
+        # Values that are not counted add nothing to the sums
+        if chunk_mask is not None:
+            np.copyto(values, 0.0, where=~chunk_mask)
+        chunk_mean = values.sum(axis=0) / chunk_count
+        values -= chunk_mean
+        if chunk_mask is not None:
+            np.copyto(values, 0.0, where=~chunk_mask)
+        chunk_m2 = np.einsum('ij,ij->j', values, values)
+        delta = chunk_mean - mean
+        total = count + chunk_count
+        mean += delta * chunk_count / total
+        m2 += chunk_m2 + delta ** 2 * count * chunk_count / total
+        count = total
+        if chunk_mask is None:
+            chunk_minimum = np.fmin.reduce(chunk, axis=0)
+            chunk_maximum = np.fmax.reduce(chunk, axis=0)
+        else:
+            lowest, highest = _value_limits(chunk.dtype)
+            chunk_minimum = np.fmin.reduce(
+                np.where(chunk_mask, chunk, highest), axis=0)
+            chunk_maximum = np.fmax.reduce(
+                np.where(chunk_mask, chunk, lowest), axis=0)
+        if minimum is None:
+            minimum, maximum = chunk_minimum, chunk_maximum
+        else:
+            minimum = np.fmin(minimum, chunk_minimum)
+            maximum = np.fmax(maximum, chunk_maximum)
+
+    if count == 0:
+        mean = std_dev = np.full(bands, np.nan)
+        minimum = maximum = np.full(bands, np.nan)
+    else:
+        std_dev = np.sqrt(m2 / count)
+    middle = None
+    if median:
+        if count == 0:
+            middle = np.full(bands, np.nan)
+        elif counts is not None:
+            middle = _percentiles_from_counts(counts, data.dtype, [50])[:, 0]
+        else:
+            middle = np.median(_pixels(data, mask), axis=0)
+
+    fields = [mean, std_dev, minimum, maximum, middle]
+    if single_band:
+        fields = [None if field is None else field[0] for field in fields]
+    return ROIStats(count, *fields)
+
+
+def start_roi_stats(data, median=True, by_band=True):
+    """Calculate :func:`roi_stats` in the background
+
+    Parameters
+    ----------
+    data : :class:`numpy.ndarray`
+        The region, or a function called without arguments that returns it
+        (or None to skip it) once the calculation starts, so data released
+        while the calculation waits its turn is not kept in memory
+    median, by_band : :obj:`bool`
+        See :func:`roi_stats`
+
+    Returns
+    -------
+    future : :class:`concurrent.futures.Future`
+        The :class:`ROIStats` of the region once calculated, None when it
+        was skipped
+    """
+    return _executor.submit(_start_roi_stats, data, median, by_band)
+
+
+def _start_roi_stats(data, median, by_band):
+    if callable(data):
+        data = data()
+        if data is None:
+            return None
+    return roi_stats(data, median=median, by_band=by_band)
+
+
+class SummedAreaTable(object):
+    """Integral images of a band's values and squared values
+
+    Once built, the number of pixels, mean and standard deviation of any
+    rectangle of the band are found with four lookups in each table instead
+    of a pass over its pixels. Integers of up to 16 bits are summed exactly
+    in 64 bit integers. Other data is summed in 64 bit floats, offset by an
+    estimate of its mean to keep the squares small. The standard deviation
+    of a few pixels of a large float image is then only accurate to about
+    ``1e-16`` of the image's sum of squares.
+
+    Parameters
+    ----------
+    data : :class:`numpy.ndarray`
+        The lines and samples of the band
+
+    Attributes
+    ----------
+    values : :class:`numpy.ndarray`
+        The sums of the values above and to the left of each pixel, with an
+        extra line and sample of zeros at the start. None until built
+    squares : :class:`numpy.ndarray`
+        The sums of the squared values, like ``values``
+    invalid : :class:`numpy.ndarray`
+        The number of NaN and infinite values, like ``values``. None for
+        integer data
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.values = self.squares = self.invalid = None
+        self.offset = 0
+        self._exact = data.dtype.kind in 'biu' and data.dtype.itemsize <= 2
+        self._future = None
+
+    @staticmethod
+    def table_bytes(data):
+        """The number of bytes the tables of a band take"""
+        lines, samples = data.shape[:2]
+        exact = data.dtype.kind in 'biu' and data.dtype.itemsize <= 2
+        tables = 2 if exact else 3
+        return tables * 8 * (lines + 1) * (samples + 1)
+
+    @property
+    def nbytes(self):
+        """:obj:`int` The number of bytes the built tables take"""
+        tables = (self.values, self.squares, self.invalid)
+        return sum(table.nbytes for table in tables if table is not None)
+
+    @property
+    def ready(self):
+        """:obj:`bool` Whether the tables have been built"""
+        # The values table is set last
+        return self.values is not None
+
+    def start(self):
+        """Build the tables in the background if not started yet"""
+        if self._future is None:
+            self._future = _executor.submit(self.build)
+
+    def wait(self):
+        """Wait for the tables to be built"""
+        self.start()
+        self._future.result()
+
+    def build(self, chunk_pixels=CHUNK_PIXELS):
+        """Build the tables a strip of lines at a time, see :meth:`start`"""
+        data = self.data
+        lines, samples = data.shape
+        dtype = np.int64 if self._exact else np.float64
+        offset = 0
+        if not self._exact:
+            step = max(1, int(np.sqrt(data.size / 65536.0)))
+            sample = np.asarray(data[::step, ::step], dtype=np.float64)
+            sample = sample[np.isfinite(sample)]
+            if sample.size:
+                offset = float(sample.mean())
+        values = np.zeros((lines + 1, samples + 1), dtype=dtype)
+        squares = np.zeros((lines + 1, samples + 1), dtype=dtype)
+        invalid = None
+        if not self._exact:
+            invalid = np.zeros((lines + 1, samples + 1), dtype=np.int64)
+        step = max(1, chunk_pixels // max(1, samples))
+        for first in range(0, lines, step):
+            last = min(first + step, lines)
+            strip = np.array(data[first:last], dtype=dtype)
+            if invalid is not None:
+                bad = ~np.isfinite(strip)
+                strip -= offset
+                strip[bad] = 0
+                _accumulate(invalid, first, last, bad.astype(np.int64))
+            _accumulate(values, first, last, strip)
+            _accumulate(squares, first, last, strip * strip)
+        self.offset = offset
+        self.invalid = invalid
+        self.squares = squares
+        self.values = values
+
+    def moments(self, x1, y1, x2, y2):
+        """The statistics of ``data[y1:y2, x1:x2]``
+
+        Parameters
+        ----------
+        x1, y1, x2, y2 : :obj:`int`
+            The first and one past the last sample and line of the rectangle
+
+        Returns
+        -------
+        moments : :obj:`tuple`
+            The number of pixels, mean and standard deviation. None when the
+            tables are not built, the rectangle has NaN or infinite values,
+            or it has negative bounds
+        """
+        if not self.ready or min(x1, y1, x2, y2) < 0:
+            return None
+        lines, samples = self.data.shape
+        x1, x2 = min(x1, samples), min(x2, samples)
+        y1, y2 = min(y1, lines), min(y2, lines)
+        count = max(0, x2 - x1) * max(0, y2 - y1)
+        if count == 0:
+            return 0, np.nan, np.nan
+        corners = (y1, x1, y2, x2)
+        if self.invalid is not None and _rectangle_sum(self.invalid, corners):
+            return None
+        total = _rectangle_sum(self.values, corners)
+        squares = _rectangle_sum(self.squares, corners)
+        if self._exact:
+            # Python integers keep the variance exact
+            total, squares = int(total), int(squares)
+            variance = (squares * count - total * total) / float(count ** 2)
+        else:
+            variance = squares / count - (total / count) ** 2
+        mean = total / float(count) + self.offset
+        return count, mean, np.sqrt(max(variance, 0.0))
+
+
+def _accumulate(table, first, last, strip):
+    """Add the sums of a strip of lines to the lines of the table below it"""
+    sums = np.cumsum(np.cumsum(strip, axis=1), axis=0)
+    sums += table[first, 1:]
+    table[first + 1:last + 1, 1:] = sums
+
+
+def _rectangle_sum(table, corners):
+    y1, x1, y2, x2 = corners
+    return table[y2, x2] - table[y1, x2] - table[y2, x1] + table[y1, x1]
+
+
+def roi_percentiles(data, q, by_band=True, chunk_pixels=CHUNK_PIXELS,
+                    mask=None):
+    """Calculate percentiles of a Region of Interest
+
+    The percentiles of integers of up to 16 bits are found exactly from a
+    count of each value, made ``chunk_pixels`` at a time without copying the
+    region. Other data falls back to :func:`numpy.percentile`. Both
+    interpolate between values like :func:`numpy.percentile`.
+
+    Parameters
+    ----------
+    data : :class:`numpy.ndarray`
+        The lines and samples, and possibly bands, of the region
+    q : :obj:`list`
+        The percentiles to find, between 0 and 100
+    by_band : :obj:`bool`
+        See :func:`roi_stats`
+    chunk_pixels : :obj:`int`
+        See :func:`roi_stats`
+    mask : :class:`numpy.ndarray`
+        See :func:`roi_stats`
+
+    Returns
+    -------
+    percentiles : :class:`numpy.ndarray`
+        The value at each percentile, with a line for each band of a 3
+        dimensional region
+    """
+    mask = _as_mask(mask, data, by_band)
+    data, single_band = _as_bands(data, by_band)
+    bands = data.shape[2]
+    q = np.asarray(q, dtype=np.float64)
+    if data.size == 0 or (mask is not None and not mask.any()):
+        percentiles = np.full((bands, q.size), np.nan)
+    elif _countable(data.dtype):
+        counts = _band_counts(data, chunk_pixels, mask)
+        percentiles = _percentiles_from_counts(counts, data.dtype, q)
+    else:
+        percentiles = np.percentile(
+            _pixels(data, mask), q, axis=0).T.reshape(bands, q.size)
+    if single_band:
+        return percentiles[0]
+    return percentiles
+
+
+def value_counts(data, chunk_pixels=CHUNK_PIXELS):
+    """Count the pixels of each value of integers of up to 16 bits
+
+    The values are counted ``chunk_pixels`` at a time without copying the
+    data, like :func:`roi_percentiles` counts them.
+
+    Parameters
+    ----------
+    data : :class:`numpy.ndarray`
+        The integers to count
+    chunk_pixels : :obj:`int`
+        See :func:`roi_stats`
+
+    Returns
+    -------
+    values : :class:`numpy.ndarray`
+        The values in the data, in increasing order
+    counts : :class:`numpy.ndarray`
+        The number of pixels of each value
+    """
+    data, _ = _as_bands(data, by_band=False)
+    if not _countable(data.dtype):
+        raise TypeError('Only integers of up to 16 bits can be counted')
+    counts = _band_counts(data, chunk_pixels)[0]
+    values = np.flatnonzero(counts)
+    return values + np.iinfo(data.dtype).min, counts[values]
+
+
+def _band_counts(data, chunk_pixels, mask=None):
+    """The number of times each value is in each band of the region"""
+    counts = np.zeros(
+        (data.shape[2], _value_range(data.dtype)), dtype=np.int64)
+    for chunk, chunk_mask in _chunks(data, chunk_pixels, mask):
+        if chunk_mask is not None:
+            chunk_mask = chunk_mask[:, np.newaxis]
+        counts += _count_values(chunk, chunk_mask)
+    return counts
+
+
+def _as_bands(data, by_band):
+    """The region as lines, samples and bands, and whether it is one band"""
+    data = np.asanyarray(data)
+    single_band = data.ndim < 3 or not by_band
+    if data.ndim < 2:
+        data = data.reshape(1, -1)
+    if data.ndim == 2:
+        data = data[:, :, np.newaxis]
+    elif not by_band:
+        data = data.reshape(data.shape[0], -1, 1)
+    return data, single_band
+
+
+def _as_mask(mask, data, by_band):
+    """The mask of each line and sample of the region given to _as_bands"""
+    if mask is None:
+        return None
+    mask = np.asarray(mask, dtype=bool)
+    if np.ndim(data) == 3 and not by_band:
+        # The bands of each pixel become samples
+        mask = np.repeat(mask, np.shape(data)[2], axis=1)
+    return mask
+
+
+def _chunks(data, chunk_pixels, mask=None):
+    """The pixels of the region a few lines at a time, one column per band
+
+    The mask of the pixels of each chunk is given with it, None without a
+    mask.
+    """
+    lines, samples, bands = data.shape
+    step = max(1, chunk_pixels // max(1, samples))
+    for first_line in range(0, lines, step):
+        chunk = data[first_line:first_line + step].reshape(-1, bands)
+        if chunk.size:
+            chunk_mask = None
+            if mask is not None:
+                chunk_mask = mask[first_line:first_line + step].reshape(-1)
+            yield chunk, chunk_mask
+
+
+def _pixels(data, mask):
+    """The pixels of the region, one column per band, only the masked ones"""
+    pixels = data.reshape(-1, data.shape[2])
+    if mask is not None:
+        pixels = pixels[mask.reshape(-1)]
+    return pixels
+
+
+def _value_limits(dtype):
+    """The lowest and highest values of a type"""
+    if dtype.kind in 'iu':
+        info = np.iinfo(dtype)
+        return info.min, info.max
+    return -np.inf, np.inf
+
+
+def _countable(dtype):
+    return dtype.kind in 'iu' and dtype.itemsize <= 2
+
+
+def _value_range(dtype):
+    return 1 << (8 * dtype.itemsize)
+
+
+def _count_values(chunk, mask=None):
+    """The number of times each value is in each band of the chunk"""
+    value_range = _value_range(chunk.dtype)
+    bands = chunk.shape[1]
+    # Give each band its own range of bins so one bincount covers them all
+    bins = chunk.astype(np.int64) - np.iinfo(chunk.dtype).min
+    bins += np.arange(bands) * value_range
+    size = bands * value_range
+    if mask is not None:
+        # Pixels outside the mask go in an extra bin that is dropped
+        np.copyto(bins, size, where=~mask)
+        size += 1
+    counts = np.bincount(bins.ravel(), minlength=size)[:bands * value_range]
+    return counts.reshape(bands, value_range)
+
+
+def _percentiles_from_counts(counts, dtype, q):
+    """Interpolated percentiles of each band from its value counts"""
+    cumulative = np.cumsum(counts, axis=1)
+    percentiles = np.empty((counts.shape[0], len(q)))
+    for band, band_cumulative in enumerate(cumulative):
+        # The positions of the percentiles in the sorted values
+        positions = np.asarray(q, dtype=np.float64) / 100.0 * (
+            band_cumulative[-1] - 1)
+        lower = np.floor(positions)
+        upper = np.minimum(lower + 1, band_cumulative[-1] - 1)
+        lower_values = np.searchsorted(band_cumulative, lower, side='right')
+        upper_values = np.searchsorted(band_cumulative, upper, side='right')
+        percentiles[band] = lower_values + (positions - lower) * (
+            upper_values - lower_values)
+    return percentiles + np.iinfo(dtype).min
@@ -0,0 +1,203 @@
+"""Read the image object of a product a tile at a time"""
+
+from collections import OrderedDict
+
+import numpy as np
+
+
+#: Bands with at least this many bytes are read as tiles
+TILED_MIN_BYTES = 64 * 1024 * 1024
+
+
+class TileCache(object):
+    """Least recently used tiles of any number of images within a byte budget
+
+    Parameters
+    ----------
+    max_bytes : :obj:`int`
+        The number of bytes of tiles to keep
+
+    Attributes
+    ----------
+    hits : :obj:`int`
+        The number of tiles found in the cache
+    misses : :obj:`int`
+        The number of tiles read from the file
+    resident_bytes : :obj:`int`
+        The number of bytes of tiles in the cache
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._tiles = OrderedDict()
+        self.resident_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._tiles)
+
+    def get(self, key, read):
+        """Get a tile, reading it when it is not in the cache
+
+        Parameters
+        ----------
+        key : :obj:`tuple`
+            Identifies the tile
+        read : callable
+            Called without arguments to read the tile when it is not cached
+
+        Returns
+        -------
+        tile : :class:`numpy.ndarray`
+            The tile
+        """
+        tile = self._tiles.pop(key, None)
+        if tile is None:
+            self.misses += 1
+            tile = read()
+            self.resident_bytes += tile.nbytes
+        else:
+            self.hits += 1
+        self._tiles[key] = tile
+        while self.resident_bytes > self.max_bytes and len(self._tiles) > 1:
+            key, evicted = self._tiles.popitem(last=False)
+            self.resident_bytes -= evicted.nbytes
+        return tile
+
+    def clear(self):
+        self._tiles.clear()
+        self.resident_bytes = 0
+
+
+#: The tiles of every :class:`TiledImage` that is not given a cache
+tile_cache = TileCache()
+
+
+class TiledImage(object):
+    """A band of an image object that is read from the file as needed
+
+    It is indexed like the lines and samples of the band, with slices,
+    integers or arrays of indices. Views of neighboring lines are assembled
+    from square tiles kept in a :class:`TileCache`. Views that skip lines, as
+    when the image is zoomed out, read only the lines they need.
+
+    Parameters
+    ----------
+    layout : :obj:`tuple`
+        The layout of the image object (see :func:`reader.image_layout`)
+    band : :obj:`int`
+        The band to read
+    tile_size : :obj:`int`
+        The number of lines and samples in a tile
+    cache : :class:`TileCache`
+        Where the tiles are kept. :data:`tile_cache` by default
+    """
+
+    def __init__(self, layout, band=0, tile_size=256, cache=None):
+        self.filepath, self.offset, dtype, shape = layout
+        self.dtype = np.dtype(dtype)
+        self.lines, self.samples = shape[1:]
+        self.band = band
+        self.tile_size = tile_size
+        self.cache = tile_cache if cache is None else cache
+
+    @property
+    def shape(self):
+        return (self.lines, self.samples)
+
+    @property
+    def nbytes(self):
+        return self.lines * self.samples * self.dtype.itemsize
+
+    def __getitem__(self, view):
+        rows, cols = view
+        if isinstance(rows, np.ndarray) or isinstance(cols, np.ndarray):
+            return self._take(rows, cols)
+        rows, row_index = _as_slice(rows, self.lines)
+        cols, col_index = _as_slice(cols, self.samples)
+        y0, y1, ystep = rows.indices(self.lines)
+        x0, x1, xstep = cols.indices(self.samples)
+        if ystep < 1 or xstep < 1:
+            raise IndexError('Only positive steps are supported')
+        y1 = max(y0, y1)
+        x1 = max(x0, x1)
+        if ystep == 1:
+            data = self._read_tiles(y0, y1, x0, x1)
+        else:
+            data = self._read_lines(range(y0, y1, ystep), x0, x1)
+        data = data[:, ::xstep]
+        if row_index:
+            data = data[0]
+        if col_index:
+            data = data[..., 0]
+        return data
+
+    def tile(self, row, column):
+        """Get the tile in a row and column of tiles"""
+        size = self.tile_size
+        y0 = row * size
+        x0 = column * size
+        return self.cache.get(
+            (self.filepath, self.offset, self.band, size, row, column),
+            lambda: self._read_lines(
+                range(y0, min(y0 + size, self.lines)),
+                x0, min(x0 + size, self.samples)))
+
+    def _take(self, rows, cols):
+        # ginga scales the displayed area with a mesh of line and sample
+        # indices
+        rows, cols = np.broadcast_arrays(rows, cols)
+        if rows.size == 0:
+            return np.empty(rows.shape, dtype=self.dtype)
+        for indices, length in ((rows, self.lines), (cols, self.samples)):
+            if indices.min() < 0 or indices.max() >= length:
+                raise IndexError('Indices are out of range')
+        y0, y1 = rows.min(), rows.max() + 1
+        x0, x1 = cols.min(), cols.max() + 1
+        lines = np.unique(rows)
+        if 2 * len(lines) > y1 - y0:
+            return self._read_tiles(y0, y1, x0, x1)[rows - y0, cols - x0]
+        data = self._read_lines(lines, x0, x1)
+        return data[np.searchsorted(lines, rows), cols - x0]
+
+    def _read_tiles(self, y0, y1, x0, x1):
+        data = np.empty((y1 - y0, x1 - x0), dtype=self.dtype)
+        if data.size == 0:
+            return data
+        size = self.tile_size
+        for row in range(y0 // size, (y1 - 1) // size + 1):
+            for column in range(x0 // size, (x1 - 1) // size + 1):
+                tile = self.tile(row, column)
+                top, left = row * size, column * size
+                first_line, last_line = max(y0, top), min(y1, top + size)
+                first_sample, last_sample = max(x0, left), min(x1, left + size)
+                data[first_line - y0:last_line - y0,
+                     first_sample - x0:last_sample - x0] = \
+                    tile[first_line - top:last_line - top,
+                         first_sample - left:last_sample - left]
+        return data
+
+    def _read_lines(self, lines, x0, x1):
+        lines = list(lines)
+        data = np.empty((len(lines), x1 - x0), dtype=self.dtype)
+        if data.size == 0:
+            return data
+        itemsize = self.dtype.itemsize
+        with open(self.filepath, 'rb') as f:
+            for n, line in enumerate(lines):
+                sample = (self.band * self.lines + line) * self.samples + x0
+                f.seek(self.offset + sample * itemsize)
+                f.readinto(data[n])
+        return data
+
+
+def _as_slice(index, length):
+    if isinstance(index, slice):
+        return index, False
+    index = int(index)
+    if index < 0:
+        index += length
+    if index < 0 or index >= length:
+        raise IndexError('Index %d is out of range' % index)
+    return slice(index, index + 1), True
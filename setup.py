@@ -36,7 +36,8 @@ setup(
         'ginga==2.6.0',
         'planetaryimage>=0.5.0',
         'matplotlib>=1.5.1',
-        'QtPy>=1.2.1'
+        'QtPy>=1.2.1',
+        'futures; python_version < "3.0"',
     ],
     license="BSD",
     zip_safe=False,
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import os
+import csv
+
+import pytest
+import numpy as np
+
+from pdsview import pdsview, batch
+
+FILE_1 = os.path.join(
+    'tests', 'mission_data', '2m132591087cfd1800p2977m2f1.img')
+FILE_2 = os.path.join(
+    'tests', 'mission_data', '2p129641989eth0361p2600r8m1.img')
+FILE_3 = os.path.join(
+    'tests', 'mission_data', '1p190678905erp64kcp2600l8c1.img')
+
+
+def test_measure_ROI(tmpdir):
+    test_set = pdsview.ImageSet([FILE_1, FILE_2, FILE_3], lazy=True)
+    measurement = test_set.measure_ROI(1.5, 2.5, 9.5, 12.5, max_workers=2)
+    assert len(measurement) == 3
+    rows = list(measurement)
+    assert [row.filepath for row in rows] == sorted([FILE_1, FILE_2, FILE_3])
+    for row, channels in zip(rows, test_set.images):
+        data = channels[0].data[3:13, 2:10]
+        assert row.image == channels[0].image_name
+        assert row.pixels == data.size
+        assert row.mean == np.mean(data)
+        assert row.median == np.median(data)
+        assert row.minimum == data.min()
+
+    path = tmpdir.join('roi.csv').strpath
+    measurement.write_csv(path)
+    with open(path) as csv_file:
+        lines = list(csv.reader(csv_file))
+    assert lines[0] == batch.CSV_HEADER
+    assert len(lines) == 4
+    assert lines[1][0] == rows[0].image
+    assert float(lines[1][3]) == rows[0].mean
+
+
+def test_measure_ROI_done(recwarn):
+    test_set = pdsview.ImageSet([FILE_3])
+    measured = []
+    measurement = batch.ROIMeasurement(test_set.images, 0, 0, 4, 4)
+    measurement.images.append(
+        [pdsview.ImageStamp(FILE_3, 'missing', label=[])])
+    measurement.images[-1][0].filepath = 'missing.img'
+    measurement.start(lambda index, rows: measured.append((index, rows)))
+    rows = list(measurement)
+    assert len(rows) == 1
+    assert sorted(index for index, rows in measured) == [0, 1]
+    assert dict(measured)[1] == []
+    assert 'missing.img cannnot be opened' in str(recwarn.pop().message)
+
+
+def test_measure_unloaded(monkeypatch):
+    test_set = pdsview.ImageSet([FILE_2, FILE_3], lazy=True)
+    loaded, unloaded = test_set.images
+    expected = [np.array(channels[0].data[:4, :4])
+                for channels in test_set.images]
+    unloaded[0].unload()
+    assert loaded[0].is_loaded
+    # Released images are read again without loading them in the thread
+    monkeypatch.setattr(
+        pdsview.ImageStamp, 'load', lambda image: pytest.fail('loaded'))
+    rows = list(batch.ROIMeasurement(test_set.images, 0, 0, 4, 4))
+    assert [row.mean for row in rows] == [np.mean(data) for data in expected]
+    assert not unloaded[0].is_loaded
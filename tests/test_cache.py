@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import os
+
+import numpy as np
+
+from pdsview import pdsview, cache
+
+FILE_1 = os.path.join(
+    'tests', 'mission_data', '2m132591087cfd1800p2977m2f1.img')
+FILE_2 = os.path.join(
+    'tests', 'mission_data', '2p129641989eth0361p2600r8m1.img')
+FILE_3 = os.path.join(
+    'tests', 'mission_data', '1p190678905erp64kcp2600l8c1.img')
+FILE_4 = os.path.join(
+    'tests', 'mission_data', '0047MH0000110010100214C00_DRCL.IMG')
+filepaths = [FILE_1, FILE_2, FILE_3]
+
+
+def _read_into_memory(monkeypatch):
+    """Decode the products into memory like compressed products are"""
+    read_product = pdsview.read_product
+
+    def read(*args):
+        pds_image, image_data = read_product(*args)
+        return pds_image, np.array(image_data)
+
+    monkeypatch.setattr(pdsview, 'read_product', read)
+
+
+def test_hits():
+    test_set = pdsview.ImageSet(
+        filepaths, lazy=True, max_cache_bytes=10 ** 9)
+    cache = test_set.cache
+    assert cache.misses == 1
+    test_set.current_image_index = 1
+    test_set.current_image_index = 0
+    assert cache.hits == 1
+    assert cache.misses == 2
+    assert cache.evictions == 0
+    assert cache.resident_bytes == sum(
+        image.nbytes for channels in test_set.images[:2] for image in channels)
+
+
+def test_eviction(monkeypatch):
+    _read_into_memory(monkeypatch)
+    test_set = pdsview.ImageSet(filepaths, lazy=True, max_cache_bytes=1)
+    cache = test_set.cache
+    first = test_set.current_image[0]
+    expected = np.array(first.data)
+    first.cuts = (10, 20)
+    test_set.current_image_index = 1
+    # Only the displayed image is kept
+    assert cache.evictions == 1
+    assert len(cache) == 1
+    assert not first.is_loaded
+    assert first.cuts == (10, 20)
+    assert 'PDS' in first.label[0]
+    test_set.current_image_index = 0
+    assert cache.misses == 3
+    assert first.is_loaded
+    assert np.array_equal(first.data, expected)
+    assert cache.resident_bytes == first.nbytes
+
+
+def test_mapped():
+    test_set = pdsview.ImageSet(filepaths, lazy=True, max_cache_bytes=1)
+    cache = test_set.cache
+    first = test_set.current_image[0]
+    assert first.nbytes == 0
+    assert first.mapped_bytes == first.data.nbytes
+    # Mapped products take hardly any memory so they are kept
+    test_set.current_image_index = 1
+    assert cache.evictions == 0
+    assert first.is_loaded
+    assert cache.resident_bytes == 0
+    assert cache.mapped_bytes == sum(
+        image.data.nbytes for channels in test_set.images[:2]
+        for image in channels)
+
+
+def test_eager_eviction(monkeypatch):
+    _read_into_memory(monkeypatch)
+    test_set = pdsview.ImageSet(filepaths, max_cache_bytes=1)
+    # Every product is released once the next one is loaded
+    assert test_set.cache.evictions == len(filepaths)
+    assert test_set.current_image[0].is_loaded
+    last = test_set.images[-1][0]
+    assert not last.is_loaded
+    expected = pdsview.ImageSet([sorted(filepaths)[-1]]).images[0][0]
+    assert last.width == expected.width
+    assert last.is_loaded
+
+
+def test_stats_cache():
+    stats_cache = cache.StatsCache(max_entries=2)
+    assert stats_cache.get('a', lambda: 1) == 1
+    assert stats_cache.get('a', lambda: 2) == 1
+    stats_cache.get('b', lambda: 3)
+    stats_cache.get('a', lambda: 4)
+    # b is the least recently used
+    stats_cache.get('c', lambda: 5)
+    assert 'b' not in stats_cache
+    assert 'a' in stats_cache
+    assert (stats_cache.hits, stats_cache.misses) == (2, 3)
+    assert stats_cache.evictions == 1
+    assert stats_cache.hit_rate == 0.4
+
+
+def test_image_set_stats_cache():
+    test_set = pdsview.ImageSet([FILE_3])
+    stats_cache = test_set.stats_cache
+    roi = test_set.ROI_stats(9.5, 18.5, 11.5, 20.5)
+    assert test_set.ROI_stats(9.2, 18.1, 11.4, 20.5) is roi
+    assert stats_cache.hits == 1
+    # Different statistics of the same pixels are kept apart
+    test_set.ROI_stats(9.5, 18.5, 11.5, 20.5, by_band=False, median=False)
+    assert stats_cache.misses == 2
+    # Setting other data changes them
+    image = test_set.current_image[0]
+    image.set_data(image.data + 1)
+    assert test_set.ROI_stats(9.5, 18.5, 11.5, 20.5).mean == roi.mean + 1
+    assert stats_cache.misses == 3
+    # Statistics of given data are not kept
+    test_set.ROI_stats(data=test_set.ROI_data(9.5, 18.5, 11.5, 20.5))
+    assert len(stats_cache) == 3
+    # Setting the band's data again finds them
+    image.set_data(image.data)
+    assert test_set.ROI_stats(9.5, 18.5, 11.5, 20.5) is roi
+    # Replacing the band's data does not
+    image.set_band_data(image.pds_image, image.data + 1)
+    assert test_set.ROI_stats(9.5, 18.5, 11.5, 20.5) is not roi
+    assert stats_cache.misses == 4
+
+
+def test_stats_cache_rgb():
+    test_set = pdsview.ImageSet([FILE_4])
+    viewer = pdsview.PDSViewer(test_set)
+    stats_cache = test_set.stats_cache
+    band = test_set.ROI_stats(2.5, 3.5, 10.5, 12.5)
+    viewer.display_rgb_image()
+    composite = test_set.ROI_stats(2.5, 3.5, 10.5, 12.5)
+    assert composite is not band
+    hits, misses = stats_cache.hits, stats_cache.misses
+    # Toggling the composite off and on again finds the statistics of both
+    viewer._undo_display_rgb_image()
+    assert test_set.ROI_stats(2.5, 3.5, 10.5, 12.5) is band
+    viewer.display_rgb_image()
+    assert test_set.ROI_stats(2.5, 3.5, 10.5, 12.5) is composite
+    assert stats_cache.hits == hits + 2
+    assert stats_cache.misses == misses
@@ -1,11 +1,13 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 import os
+import time
 
 import pytest
 import numpy as np
 from qtpy import QtWidgets, QtCore
 from matplotlib.lines import Line2D
+from matplotlib.backend_bases import MouseEvent
 
 
 from pdsview import pdsview, histogram
@@ -16,6 +18,8 @@ FILE_2 = os.path.join(
     'tests', 'mission_data', '2p129641989eth0361p2600r8m1.img')
 FILE_3 = os.path.join(
     'tests', 'mission_data', '1p134482118erp0902p2600r8m1.img')
+FILE_4 = os.path.join(
+    'tests', 'mission_data', '0047MH0000110010100214C00_DRCL.IMG')
 
 test_images = pdsview.ImageSet([FILE_1, FILE_2])
 window = pdsview.PDSViewer(test_images)
@@ -101,6 +105,132 @@ def test_model_data():
     assert np.array_equal(model.data, image_view.get_image().data)
 
 
+def test_model_histogram():
+    model = histogram.HistogramModel(image_view)
+    counts, edges = model.histogram()
+    expected_counts, expected_edges = np.histogram(model.data, 100)
+    assert np.array_equal(counts, expected_counts)
+    assert np.allclose(edges, expected_edges)
+    assert model.histogram()[0] is counts
+    assert model.histograms.hits == 1
+    model.bins = 20
+    assert len(model.histogram()[0]) == 20
+    # Setting other data finds the counts again
+    image = image_view.get_image()
+    data = image.get_data()
+    image.set_data(data.copy())
+    model.bins = 100
+    assert model.histogram()[0] is not counts
+    assert model.histograms.misses == 3
+    # Setting the band's data again does not
+    image.set_data(data)
+    assert model.histogram()[0] is counts
+
+
+def test_model_histogram_rgb():
+    viewer = pdsview.PDSViewer(pdsview.ImageSet([FILE_4]))
+    model = histogram.HistogramModel(viewer.view_canvas)
+    band = model.histogram()[0]
+    viewer.display_rgb_image()
+    composite = model.histogram()[0]
+    assert model.histograms.misses == 2
+    # Toggling the composite off and on again does not read the pixels
+    viewer._undo_display_rgb_image()
+    assert model.histogram()[0] is band
+    viewer.display_rgb_image()
+    assert model.histogram()[0] is composite
+    assert model.histograms.hits == 2
+    assert model.base_histograms.misses == 2
+
+
+def test_model_rebin(monkeypatch):
+    model = histogram.HistogramModel(image_view)
+    base_counts, values, scale = model.base_histogram()
+    assert base_counts.sum() == model.data.size
+    assert scale == 1
+    for bins in (100, 7, 256):
+        model.bins = bins
+        counts, edges = model.histogram()
+        expected_counts, expected_edges = np.histogram(
+            model.data, bins, range=model.value_range)
+        assert np.array_equal(counts, expected_counts)
+        assert np.array_equal(edges, expected_edges)
+    # The pixels are only read once
+    assert model.base_histograms.misses == 1
+    assert model.base_histograms.hits == 3
+
+    # Images that are not integers are rebinned from fine bins
+    monkeypatch.setattr(histogram, 'BASE_HISTOGRAM_BINS', 64)
+    image = image_view.get_image()
+    data = image.get_data()
+    image.set_data(np.random.RandomState(2).normal(0, 1, (50, 40)))
+    model.bins = 32
+    counts, edges = model.histogram()
+    assert np.array_equal(counts, np.histogram(image.get_data(), 32)[0])
+    model.bins = 10
+    assert model.histogram()[0].sum() == 2000
+    image.set_data(data)
+
+
+def test_model_sampled():
+    data = image_view.get_image().get_data()
+    lines, samples = data.shape[:2]
+    model = histogram.HistogramModel(
+        image_view, max_pixels=lines * samples / 9.0)
+    assert model.sample_step == 3
+    assert model.sampled
+    counts, edges = model.histogram()
+    sample = data[::3, ::3]
+    expected_counts, expected_edges = np.histogram(
+        sample, 100, range=model.value_range)
+    scale = data.size / float(sample.size)
+    assert np.allclose(counts, expected_counts * scale)
+    assert counts.sum() == pytest.approx(data.size)
+    errors = model.sampling_errors()
+    assert np.all(errors[expected_counts > 0] > 0)
+    assert np.all(errors[expected_counts == 0] == 0)
+
+    # Refining finds the exact histogram in the background
+    future = model.refine()
+    assert model.refine() is future
+    future.result()
+    assert not model.sampled
+    assert model.refine() is None
+    counts, edges = model.histogram()
+    assert np.array_equal(
+        counts, np.histogram(data, 100, range=model.value_range)[0])
+    assert not np.any(model.sampling_errors())
+
+
+def test_histogram_refine(qtbot, monkeypatch):
+    monkeypatch.setattr(histogram, 'REFINE_DELAY', 10)
+    data = image_view.get_image().get_data()
+    model = histogram.HistogramModel(image_view, max_pixels=data.size // 4)
+    test_hist = histogram.Histogram(model)
+    test_hist.set_data()
+    assert test_hist._refine_timer.isActive()
+    # The closed outline repeats its first vertex
+    sampled = test_hist._outline.get_xy()[:-1]
+    # The exact histogram is shown once the user stops
+    counts, edges = np.histogram(data, 100, range=model.value_range)
+    exact = histogram._outline(counts, edges)
+    assert not np.array_equal(sampled, exact)
+    qtbot.waitUntil(
+        lambda: np.array_equal(test_hist._outline.get_xy()[:-1], exact))
+    assert not model.sampled
+    assert not test_hist._refine_timer.isActive()
+    # The refined histogram of other data is not shown
+    image = model.image_view.get_image()
+    image.set_data(data.copy())
+    test_hist._show_refined((image, ('band', image.data_version)))
+    assert np.array_equal(test_hist._outline.get_xy()[:-1], exact)
+    model.refine_when_idle = False
+    model.max_pixels = 1
+    test_hist.set_data()
+    assert not test_hist._refine_timer.isActive()
+    image.set_data(data)
+
+
 def test_model_register():
     model = histogram.HistogramModel(image_view)
     mock_view = QtWidgets.QWidget()
@@ -240,10 +370,75 @@ def test_histogram_change_bins():
     test_hist = histogram.Histogram(model)
     test_hist.set_data()
     assert model.bins == 100
-    assert len(test_hist._ax.patches) == 100
+    # The bins are drawn as one outline
+    assert len(test_hist._ax.patches) == 1
+    assert len(model.histogram()[0]) == 100
     model._bins = 50
     test_hist.change_bins()
-    assert len(test_hist._ax.patches) == 50
+    assert len(test_hist._ax.patches) == 1
+    assert len(model.histogram()[0]) == 50
+
+
+def test_histogram_blit_vlines(monkeypatch):
+    model = histogram.HistogramModel(image_view)
+    test_hist = histogram.Histogram(model)
+    test_hist.set_data()
+    assert test_hist._left_vline.get_animated()
+    assert test_hist._background is not None
+    draws = []
+    blits = []
+    monkeypatch.setattr(test_hist, 'draw', lambda: draws.append(True))
+    monkeypatch.setattr(test_hist, 'blit', blits.append)
+    # Moving a cut only draws the lines over the cached histogram
+    model.cut_low = model.cut_low + 1
+    model.cuts = model.cut_low + 1, model.cut_high - 1
+    assert draws == []
+    assert blits == [test_hist._ax.bbox] * 2
+    test_hist._background = None
+    model.cut_high = model.cut_high - 1
+    assert draws == [True]
+
+
+def _motion_latency(test_hist, events=20):
+    """The mean time to handle a drag of the low cut"""
+    x, y = test_hist._ax.transData.transform(
+        (test_hist.model.cut_low, 0.5))
+    event = MouseEvent(
+        'motion_notify_event', test_hist, x, y, button=1)
+    start = time.time()
+    for _ in range(events):
+        test_hist.callbacks.process('motion_notify_event', event)
+    return (time.time() - start) / events
+
+
+def test_histogram_soak(monkeypatch):
+    images = [channels[0] for channels in test_images.images]
+    first_image = image_view.get_image()
+    cuts = image_view.get_cut_levels()
+    model = histogram.HistogramModel(image_view)
+    test_hist = histogram.Histogram(model)
+    callbacks = test_hist.callbacks.callbacks
+    motion_callbacks = len(callbacks['motion_notify_event'])
+    press_callbacks = len(callbacks['button_press_event'])
+    test_hist.set_data()
+    latency = _motion_latency(test_hist)
+    # Flip through 1,000 images without drawing each one
+    with monkeypatch.context() as patch:
+        patch.setattr(test_hist, 'draw', lambda: None)
+        for flip in range(1000):
+            image_view.set_image(images[flip % len(images)])
+            test_hist.set_data()
+    image_view.set_image(first_image)
+    test_hist.set_data()
+    assert len(callbacks['motion_notify_event']) == motion_callbacks
+    assert len(callbacks['button_press_event']) == press_callbacks
+    assert _motion_latency(test_hist) < 3 * latency + 0.005
+    # Each drag sets the cut once
+    cut_lows = []
+    monkeypatch.setattr(test_hist.controller, 'set_cut_low', cut_lows.append)
+    _motion_latency(test_hist, events=5)
+    assert len(cut_lows) == 5
+    image_view.cut_levels(*cuts)
 
 
 def get_xdata(ax, x):
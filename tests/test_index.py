@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import os
+
+import numpy as np
+
+from pdsview import pdsview, reader
+from pdsview.index import MetadataIndex
+
+FILE_1 = os.path.join(
+    'tests', 'mission_data', '2m132591087cfd1800p2977m2f1.img')
+FILE_3 = os.path.join(
+    'tests', 'mission_data', '1p190678905erp64kcp2600l8c1.img')
+FILE_6 = os.path.join(
+    'tests', 'mission_data', '0047MH0000110010100214C00_DRCL.IMG')
+filepaths = [FILE_1, FILE_3, FILE_6]
+
+
+def test_get(tmpdir):
+    index = MetadataIndex(str(tmpdir.join('index.sqlite')))
+    assert index.get(FILE_6) is None
+    bands, label_array, layout = reader.probe_product(FILE_6)
+    index.add(FILE_6, bands, label_array, layout)
+    index.commit()
+    index.close()
+    entry = MetadataIndex(str(tmpdir.join('index.sqlite'))).get(FILE_6)
+    assert entry.bands == 3
+    assert entry.label_array == label_array
+    data_path, offset, dtype, shape = entry.layout
+    assert data_path == os.path.abspath(layout[0])
+    assert (offset, dtype, shape) == layout[1:]
+
+
+def test_changed_product(tmpdir):
+    product = tmpdir.join('product.img')
+    product.write_binary(open(FILE_3, 'rb').read())
+    index = MetadataIndex(str(tmpdir.join('index.sqlite')))
+    index.add(str(product), *reader.probe_product(str(product)))
+    assert index.get(str(product)) is not None
+    with open(str(product), 'ab') as f:
+        f.write(b'\0')
+    assert index.get(str(product)) is None
+
+
+def test_image_set(tmpdir):
+    index_path = str(tmpdir.join('index.sqlite'))
+    expected = pdsview.ImageSet(filepaths)
+    pdsview.ImageSet(filepaths, lazy=True, index_path=index_path)
+    test_set = pdsview.ImageSet(filepaths, index_path=index_path)
+    for filepath in filepaths:
+        assert test_set.index.get(filepath) is not None
+    for channels, expected_channels in zip(test_set.images, expected.images):
+        for image, expected_image in zip(channels, expected_channels):
+            assert image.image_name == expected_image.image_name
+            assert image.label == expected_image.label
+            assert image.layout is not None
+            assert np.array_equal(image.data, expected_image.data)
@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import time
+
+import numpy as np
+from matplotlib.path import Path
+
+from pdsview import masks
+
+
+def test_polygon_mask():
+    triangle = [(0.5, 0.5), (10.5, 0.5), (0.5, 10.5)]
+    box = masks.polygon_box(triangle)
+    assert box == (1, 1, 11, 11)
+    mask = masks.polygon_mask(triangle, box)
+    assert mask.shape == (10, 10)
+    assert mask.dtype == bool
+    # The pixels on and left of the diagonal
+    assert np.array_equal(mask, np.flipud(np.tri(10, dtype=bool)))
+    # Crossings outside of the box are clipped to it
+    mask = masks.polygon_mask(triangle, (3, 2, 6, 4))
+    assert mask.all()
+
+
+def test_polygon_mask_large():
+    angles = np.linspace(0, 2 * np.pi, 10000, endpoint=False)
+    radii = 2000 * (0.6 + 0.4 * np.random.RandomState(0).rand(angles.size))
+    points = np.column_stack(
+        [2048 + radii * np.cos(angles), 2048 + radii * np.sin(angles)])
+    start = time.time()
+    mask = masks.polygon_mask(points, (0, 0, 4096, 4096))
+    assert time.time() - start < 1
+    lines, samples = np.mgrid[0:4096:37, 0:4096:37]
+    centers = np.column_stack([samples.ravel(), lines.ravel()])
+    inside = Path(points).contains_points(centers).reshape(lines.shape)
+    assert np.array_equal(mask[::37, ::37], inside)
+
+
+def test_ellipse_mask():
+    box = masks.ellipse_box(10, 20, 5, 2, 90)
+    assert box == (8, 15, 13, 26)
+    mask = masks.ellipse_mask(10, 20, 5, 2, 90, box)
+    lines, samples = np.mgrid[15:26, 8:13]
+    expected = ((samples - 10) / 2.0) ** 2 + ((lines - 20) / 5.0) ** 2 <= 1
+    assert np.array_equal(mask, expected)
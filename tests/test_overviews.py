@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import os
+
+import numpy as np
+
+from pdsview import pdsview, overviews
+
+FILE_3 = os.path.join(
+    'tests', 'mission_data', '1p190678905erp64kcp2600l8c1.img')
+
+
+def test_pyramid(monkeypatch):
+    monkeypatch.setattr(overviews, 'OVERVIEW_MIN_SIZE', 4)
+    data = np.arange(35 * 18, dtype='>i2').reshape(35, 18)
+    pyramid = overviews.OverviewPyramid(data)
+    assert pyramid.depth == 2
+    assert pyramid.level_for(0.25) is None
+    pyramid.wait()
+    assert pyramid.levels[1].shape == (17, 9)
+    assert pyramid.levels[2].shape == (8, 4)
+    expected = data[:34].reshape(17, 2, 9, 2).mean(axis=(1, 3))
+    assert np.allclose(pyramid.levels[1], expected)
+    assert pyramid.level_for(0.75) is None
+    assert pyramid.level_for(0.5)[0] == 2
+    factor, level = pyramid.level_for(0.1)
+    assert factor == 4
+    assert level is pyramid.levels[2]
+
+
+def test_disk_cache(monkeypatch, tmpdir):
+    monkeypatch.setattr(overviews, 'OVERVIEW_MIN_SIZE', 4)
+    data = np.random.random((40, 40))
+    disk_cache = overviews.OverviewDiskCache(str(tmpdir))
+    pyramid = overviews.OverviewPyramid(data, ('a', 1), disk_cache)
+    pyramid.wait()
+    assert len(tmpdir.listdir()) == pyramid.depth
+    # Saved overviews are loaded instead of built
+    monkeypatch.setattr(overviews.OverviewPyramid, '_build', None)
+    loaded = overviews.OverviewPyramid(data, ('a', 1), disk_cache)
+    loaded.wait()
+    for level in pyramid.levels:
+        assert np.array_equal(loaded.levels[level], pyramid.levels[level])
+
+
+def test_image_stamp(monkeypatch):
+    monkeypatch.setattr(overviews, 'OVERVIEW_MIN_PIXELS', 0)
+    monkeypatch.setattr(overviews, 'OVERVIEW_MIN_SIZE', 16)
+    image = pdsview.ImageSet([FILE_3]).current_image[0]
+    height, width = image.shape
+    args = (0, 0, width - 1, height - 1, width // 4, height // 4)
+    expected = image.get_scaled_cutout_wdht(*args)
+    image.overviews.wait()
+    result = image.get_scaled_cutout_wdht(*args)
+    assert result.data.shape == expected.data.shape
+    assert result.data.dtype == np.float32
+    assert (result.scale_x, result.scale_y) == (
+        expected.scale_x, expected.scale_y)
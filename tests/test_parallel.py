@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import os
+
+import pvl
+import numpy as np
+from planetaryimage import PDS3Image
+
+from pdsview import pdsview, parallel
+
+FILE_1 = os.path.join(
+    'tests', 'mission_data', '2m132591087cfd1800p2977m2f1.img')
+FILE_3 = os.path.join(
+    'tests', 'mission_data', '1p190678905erp64kcp2600l8c1.img')
+FILE_6 = os.path.join(
+    'tests', 'mission_data', '0047MH0000110010100214C00_DRCL.IMG')
+NOT_PDS = os.path.join('tests', 'test_parallel.py')
+
+
+def test_open_products():
+    filepaths = [FILE_3, NOT_PDS, FILE_6]
+    products = list(parallel.open_products(filepaths, max_workers=2))
+    assert [filepath for filepath, product in products] == filepaths
+    assert products[1][1] is None
+    pds_image, image_data, label_array = products[2][1]
+    assert label_array[-1].strip() == 'END'
+    assert pds_image.label['IMAGE']['BANDS'] == 3
+    assert np.array_equal(image_data, PDS3Image.open(FILE_6).image)
+
+
+def test_image_set():
+    filepaths = [FILE_1, FILE_3, FILE_6, NOT_PDS]
+    expected = pdsview.ImageSet(filepaths)
+    test_set = pdsview.ImageSet(filepaths, processes=2)
+    assert len(test_set.images) == len(expected.images)
+    for channels, expected_channels in zip(test_set.images, expected.images):
+        for image, expected_image in zip(channels, expected_channels):
+            assert image.image_name == expected_image.image_name
+            assert np.array_equal(image.data, expected_image.data)
+
+
+def test_pack_label():
+    label = pvl.load(FILE_6)
+    assert parallel._unpack_label(parallel._pack_label(label)) == label
+
+
+def test_share_array():
+    data = np.arange(24, dtype='>i2').reshape(2, 3, 4)
+    shared = parallel._receive_array(parallel._share_array(data))
+    assert shared.dtype == data.dtype
+    assert np.array_equal(shared, data)
@@ -8,7 +8,7 @@ from qtpy import QtWidgets, QtCore
 from planetaryimage import PDS3Image
 from ginga.qtw.ImageViewCanvasQt import ImageViewCanvas
 
-from pdsview import pdsview
+from pdsview import pdsview, masks
 from pdsview.channels_dialog import ChannelsDialog
 from pdsview.histogram import HistogramWidget, HistogramModel
 
@@ -69,6 +69,25 @@ class TestImageSet(object):
         assert self.test_set.rgb == []
         assert self.test_set.current_image is not None
 
+    def test_lazy_init(self):
+        test_set = pdsview.ImageSet(self.filepaths, lazy=True)
+        assert test_set.lazy
+        assert len(test_set.images) == len(self.filepaths)
+        assert test_set.next_prev_enabled
+        # Only the current image is loaded
+        assert test_set.images[0][0].is_loaded
+        for image in test_set.images[1:]:
+            assert not image[0].is_loaded
+        # Changing the image loads the new current image
+        test_set.current_image_index = 2
+        assert test_set.images[2][0].is_loaded
+        assert not test_set.images[1][0].is_loaded
+        expected = self.test_set.images[2][0].data
+        assert np.array_equal(test_set.images[2][0].data, expected)
+        # Accessing the data of an image that is not loaded loads it
+        assert test_set.images[3][0].data is not None
+        assert test_set.images[3][0].is_loaded
+
     def test_next_prev_enabled(self):
         assert self.test_set.next_prev_enabled
 
@@ -586,6 +605,57 @@ class TestPDSViewer(object):
         assert self.viewer.min.text() == 'Min: 22'
         assert self.viewer.max.text() == 'Max: 24'
 
+    def test_move_ROI(self):
+        canvas = self.viewer.view_canvas
+        self.viewer.start_ROI(canvas, None, 1.5, 6.5)
+        self.viewer.move_ROI(canvas, None, 4.5, 2.5)
+        assert self.viewer._live_ROI_timer.isActive()
+        self.viewer._set_live_ROI_text()
+        data = self.test_set.ROI_data(1.5, 2.5, 4.5, 6.5)
+        assert self.viewer.pixels.text() == '#Pixels: 12 (preview)'
+        assert self.viewer.mean.text() == 'Mean: %.4f (preview)' % (
+            np.mean(data))
+        assert self.viewer.std_dev.text() == 'Std Dev: %.6f (preview)' % (
+            np.std(data))
+        assert self.viewer.median.text() == 'Median: ????'
+        self.viewer.move_ROI(canvas, None, 3.5, 3.5)
+        self.viewer.stop_ROI(canvas, None, 3.5, 3.5)
+        assert not self.viewer._live_ROI_timer.isActive()
+        assert not self.viewer.pixels.text().endswith('(preview)')
+
+    def test_shape_ROI(self):
+        canvas = self.viewer.view_canvas
+        self.viewer.ROI_shape_box.setCurrentIndex(1)
+        assert canvas.get_drawtype() == 'ellipse'
+        Ellipse = canvas.get_draw_class('ellipse')
+        canvas.add(Ellipse(15, 12, 6.5, 3.5, rot_deg=30))
+        self.viewer.stop_ROI(canvas, None, None, None)
+        box = masks.ellipse_box(15, 12, 6.5, 3.5, 30)
+        mask = masks.ellipse_mask(15, 12, 6.5, 3.5, 30, box)
+        data = self.test_set.ROI_data(*box)
+        assert self.viewer.pixels.text() == '#Pixels: %d' % (mask.sum())
+        assert self.viewer.mean.text() == 'Mean: %.4f' % (
+            np.mean(data[mask]))
+        assert self.viewer.current_ROI() == tuple(x - 0.5 for x in box)
+        # Shapes are not measured in every image as their bounding box
+        assert not self.viewer.ROI_is_rectangle
+        assert not self.viewer.measure_all_button.isEnabled()
+        with pytest.warns(UserWarning):
+            assert self.viewer.add_named_ROI() is None
+        assert len(self.test_set.rois) == 0
+        self.viewer.delete_ROI()
+        assert self.viewer.measure_all_button.isEnabled()
+        # Polygons outside of the image are deleted
+        Polygon = canvas.get_draw_class('freepolygon')
+        canvas.add(Polygon([(-9, -9), (-2, -9), (-2, -1)]))
+        self.viewer.stop_ROI(canvas, None, None, None)
+        assert self.viewer._drawn_ROI() is None
+        image = self.viewer.current_image
+        assert self.viewer.pixels.text() == '#Pixels: %d' % (
+            image.width * image.height)
+        self.viewer.ROI_shape_box.setCurrentIndex(0)
+        assert canvas.get_drawtype() == 'rectangle'
+
     def test_top_right_pixel_snap(self):
         test_snap_1 = self.viewer.top_right_pixel_snap(10, 5)
         assert test_snap_1[0] == 5.5
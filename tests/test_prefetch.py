@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import os
+
+import numpy as np
+
+from pdsview import pdsview, prefetch
+
+FILE_1 = os.path.join(
+    'tests', 'mission_data', '2m132591087cfd1800p2977m2f1.img')
+FILE_2 = os.path.join(
+    'tests', 'mission_data', '2p129641989eth0361p2600r8m1.img')
+FILE_3 = os.path.join(
+    'tests', 'mission_data', '1p190678905erp64kcp2600l8c1.img')
+FILE_4 = os.path.join(
+    'tests', 'mission_data', 'h58n3118.img')
+FILE_5 = os.path.join(
+    'tests', 'mission_data', '1p134482118erp0902p2600r8m1.img')
+filepaths = [FILE_1, FILE_2, FILE_3, FILE_4, FILE_5]
+
+
+def test_window():
+    test_set = pdsview.ImageSet(filepaths, lazy=True)
+    prefetcher = prefetch.Prefetcher(test_set, forward=2, backward=1)
+    assert prefetcher.window(0) == [1, 4, 2]
+    assert prefetcher.window(4) == [0, 3, 1]
+    prefetcher = prefetch.Prefetcher(test_set, forward=10, backward=10)
+    assert sorted(prefetcher.window(2)) == [0, 1, 3, 4]
+    prefetcher.shutdown()
+
+
+def test_prefetch_hits():
+    test_set = pdsview.ImageSet(filepaths, lazy=True)
+    test_set.enable_prefetch(forward=1, backward=0)
+    prefetcher = test_set.prefetcher
+    assert prefetcher.hits == 0
+    assert prefetcher.misses == 0
+    test_set.current_image_index = 1
+    assert prefetcher.hits == 1
+    assert prefetcher.misses == 0
+    assert prefetcher.hit_rate == 1.0
+    second_file = sorted(filepaths)[1]
+    expected = pdsview.ImageSet([second_file]).images[0][0].data
+    assert np.array_equal(test_set.current_image[0].data, expected)
+    # Jumping outside of the window is a miss
+    test_set.current_image_index = 3
+    assert prefetcher.misses == 1
+    assert prefetcher.hit_rate == 0.5
+    prefetcher.shutdown()
+
+
+def test_prefetch_cuts():
+    test_set = pdsview.ImageSet(filepaths, lazy=True)
+    viewer = pdsview.PDSViewer(pdsview.ImageSet(filepaths))
+    autocuts = viewer.view_canvas.autocuts
+    test_set.enable_prefetch(forward=1, backward=0, autocuts=autocuts)
+    test_set.current_image_index = 1
+    viewer.next_image()
+    expected = viewer.view_canvas.get_cut_levels()
+    assert test_set.current_image[0].prepared_cuts == expected
+    test_set.prefetcher.shutdown()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import os
+import threading
+
+import numpy as np
+from planetaryimage import PDS3Image
+
+from pdsview import pdsview, preview, reader
+
+FILE_3 = os.path.join(
+    'tests', 'mission_data', '1p190678905erp64kcp2600l8c1.img')
+FILE_4 = os.path.join(
+    'tests', 'mission_data', '2p129641989eth0361p2600r8m1.img')
+
+
+def _hold_reads(monkeypatch, request):
+    """Keep the products from being read until the event is set
+
+    The event is set when the test ends, even if it fails, so the reading
+    thread is never left waiting.
+    """
+    read = threading.Event()
+    request.addfinalizer(read.set)
+    _read = preview._read
+
+    def held_read(*args):
+        read.wait()
+        return _read(*args)
+
+    monkeypatch.setattr(preview, '_read', held_read)
+    return read
+
+
+def test_read_preview():
+    bands, label_array, layout = reader.probe_product(FILE_3)
+    expected = PDS3Image.open(FILE_3).image
+    assert np.array_equal(
+        preview.read_preview(layout, 0, 3), expected[::3, ::3])
+
+
+def test_image_set(monkeypatch):
+    monkeypatch.setattr(pdsview, 'TILED_MIN_BYTES', 0)
+    test_set = pdsview.ImageSet([FILE_3], lazy=True, preview_step=4)
+    channels = test_set.current_image
+    image = channels[0]
+    expected = PDS3Image.open(FILE_3).image
+    assert image.is_preview
+    assert not image.is_loaded
+    assert image.shape == expected.shape
+    assert test_set.provisional
+    assert test_set.pixel_value_text.endswith(preview.PROVISIONAL)
+    assert np.array_equal(
+        test_set.ROI_data(0, 0, image.width, image.height),
+        expected[::4, ::4])
+    assert image.get_data_xy(9, 6) == expected[4, 8]
+    cutout = image.get_scaled_cutout_wdht(0, 0, 15, 15, 8, 8)
+    assert cutout.data.shape == (8, 8)
+    assert cutout.data[3, 5] == expected[4, 8]
+
+    assert test_set.finish_preview(channels)
+    assert not test_set.finish_preview(channels)
+    assert image.is_loaded
+    assert not image.is_preview
+    assert not test_set.provisional
+    assert np.array_equal(image.data, expected)
+    assert image.get_minmax() == (expected.min(), expected.max())
+
+
+def test_image_set_without_previews():
+    test_set = pdsview.ImageSet([FILE_3], lazy=True, preview_step=4)
+    image = test_set.current_image[0]
+    # Small images are loaded right away
+    assert image.is_loaded
+    assert not image.is_preview
+    assert test_set.previews is not None
+    assert not test_set.finish_preview(test_set.current_image)
+
+
+def test_viewer(qtbot, monkeypatch, request):
+    monkeypatch.setattr(pdsview, 'TILED_MIN_BYTES', 0)
+    read = _hold_reads(monkeypatch, request)
+    test_set = pdsview.ImageSet([FILE_3], lazy=True, preview_step=4)
+    viewer = pdsview.PDSViewer(test_set)
+    qtbot.add_widget(viewer)
+    assert viewer.pixels.text() == '#Pixels: 3000' + preview.PROVISIONAL
+    read.set()
+    viewer.preview_loaded(test_set.current_image)
+    assert viewer.pixels.text() == '#Pixels: 3000'
+    assert viewer.current_image.is_loaded
+
+
+def test_viewer_after_read(qtbot, monkeypatch):
+    monkeypatch.setattr(pdsview, 'TILED_MIN_BYTES', 0)
+    test_set = pdsview.ImageSet([FILE_3], lazy=True, preview_step=4)
+    qtbot.waitUntil(lambda: test_set.preview_read(test_set.current_image))
+    # The product was read before the viewer could be told
+    viewer = pdsview.PDSViewer(test_set)
+    qtbot.add_widget(viewer)
+    assert viewer.current_image.is_loaded
+    assert viewer.pixels.text() == '#Pixels: 3000'
+
+
+def test_image_set_read_while_away(qtbot, monkeypatch, request):
+    monkeypatch.setattr(pdsview, 'TILED_MIN_BYTES', 0)
+    read = _hold_reads(monkeypatch, request)
+    test_set = pdsview.ImageSet([FILE_3, FILE_4], lazy=True, preview_step=4)
+    channels = test_set.current_image
+    test_set.current_image_index = 1
+    assert channels[0].is_preview
+    read.set()
+    qtbot.waitUntil(lambda: test_set.preview_read(channels))
+    # Coming back finishes the product rather than previewing it forever
+    test_set.current_image_index = 0
+    assert channels[0].is_loaded
+    assert not channels[0].is_preview
+    assert not test_set.preview_read(channels)
+    # The loader finishes a product it has read rather than ignoring it
+    channels = test_set.images[1]
+    qtbot.waitUntil(lambda: test_set.preview_read(channels))
+    test_set.previews.start(channels)
+    assert channels[0].is_loaded
+    assert not test_set.preview_read(channels)
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import os
+
+import pvl
+import pytest
+import numpy as np
+from planetaryimage import PDS3Image
+
+from pdsview import reader
+
+FILE_1 = os.path.join(
+    'tests', 'mission_data', '2m132591087cfd1800p2977m2f1.img')
+FILE_3 = os.path.join(
+    'tests', 'mission_data', '1p190678905erp64kcp2600l8c1.img')
+FILE_6 = os.path.join(
+    'tests', 'mission_data', '0047MH0000110010100214C00_DRCL.IMG')
+
+LABEL = """PDS_VERSION_ID = PDS3
+RECORD_BYTES = 64
+^IMAGE = 2
+OBJECT = IMAGE
+  LINES = 4
+  LINE_SAMPLES = 32
+  SAMPLE_TYPE = MSB_INTEGER
+  SAMPLE_BITS = 16
+END_OBJECT = IMAGE
+END
+"""
+
+
+def test_read_label_lines():
+    label_array = reader.read_label_lines(FILE_1)
+    assert 'PDS' in label_array[0]
+    assert label_array[-1].strip() == 'END'
+
+
+def test_read_label_lines_bounded(tmpdir):
+    label = LABEL.replace(
+        'RECORD_BYTES = 64', 'RECORD_BYTES = 64\nLABEL_RECORDS = 4')
+    product = tmpdir.join('no_end.img')
+    # Without an END statement the label area is used
+    label_area = label.replace('END\n', '').ljust(256).encode()
+    product.write_binary(label_area + b'\xff' * 256)
+    label_array = reader.read_label_lines(str(product))
+    assert label_array[0] == 'PDS_VERSION_ID = PDS3'
+    assert label_array[-1] == 'END_OBJECT = IMAGE'
+    # Without LABEL_RECORDS no more than max_bytes is searched
+    product.write_binary(b'\xff' * 256 + LABEL.encode())
+    with pytest.raises(ValueError):
+        reader.read_label_lines(str(product), max_bytes=128)
+
+
+def test_is_pds_image(tmpdir):
+    assert reader.is_pds_image(FILE_1)
+    assert not reader.is_pds_image(__file__)
+    assert not reader.is_pds_image(str(tmpdir))
+    product = tmpdir.join('no_image.lbl')
+    product.write(LABEL.replace('^IMAGE', '^TABLE'))
+    assert not reader.is_pds_image(str(product))
+    # The pointer is searched for past the first bytes of long labels
+    comment = '/* %s */\n' % ('x' * reader.SIGNATURE_BYTES)
+    product.write(LABEL.replace('RECORD_BYTES', comment + 'RECORD_BYTES'))
+    assert reader.is_pds_image(str(product))
+
+
+def test_probe_product():
+    bands, label_array, layout = reader.probe_product(FILE_3)
+    assert bands == 1
+    assert label_array == reader.read_label_lines(FILE_3)
+    assert layout == reader.image_layout(FILE_3, PDS3Image.open(FILE_3).label)
+    bands, label_array, layout = reader.probe_product(FILE_6)
+    assert bands == 3
+    assert layout[3][0] == 3
+
+
+def test_read_product_with_layout():
+    bands, label_array, layout = reader.probe_product(FILE_6)
+    pds_image, image_data = reader.read_product(FILE_6, label_array, layout)
+    assert np.array_equal(image_data, PDS3Image.open(FILE_6).image)
+    # The label is only parsed when it is used
+    assert isinstance(pds_image._label, list)
+    assert pds_image.label['IMAGE']['BANDS'] == 3
+
+
+def test_read_product_is_mapped():
+    pds_image, image_data = reader.read_product(FILE_3)
+    assert isinstance(pds_image, reader.MappedPDS3Image)
+    assert isinstance(image_data, np.memmap)
+
+
+@pytest.mark.parametrize('filepath', [FILE_1, FILE_3, FILE_6])
+def test_read_product(filepath):
+    pds_image, image_data = reader.read_product(filepath)
+    expected = PDS3Image.open(filepath).image
+    assert image_data.shape == expected.shape
+    assert np.array_equal(image_data, expected)
+
+
+def test_band_arrays():
+    pds_image, image_data = reader.read_product(FILE_6)
+    bands = reader.band_arrays(image_data, 3)
+    assert len(bands) == 3
+    for n, band in enumerate(bands):
+        assert np.array_equal(band, image_data[:, :, n])
+    pds_image, image_data = reader.read_product(FILE_3)
+    assert reader.band_arrays(image_data, 1)[0] is image_data
+
+
+def test_image_layout():
+    label = pvl.loads(LABEL)
+    data_filepath, offset, dtype, shape = reader.image_layout(FILE_3, label)
+    assert data_filepath == FILE_3
+    assert offset == 64
+    assert dtype == np.dtype('>i2')
+    assert shape == (1, 4, 32)
+
+
+@pytest.mark.parametrize(
+    'key, value',
+    [
+        ('LINE_PREFIX_BYTES', 12),
+        ('SAMPLE_TYPE', 'MSB_BIT_STRING'),
+        ('LINES', 10 ** 9),
+    ])
+def test_image_layout_cannot_map(key, value):
+    label = pvl.loads(LABEL)
+    label['IMAGE'][key] = value
+    with pytest.raises(ValueError):
+        reader.image_layout(FILE_3, label)
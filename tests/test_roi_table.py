@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import os
+
+from pdsview import pdsview, roi_table
+
+FILE_1 = os.path.join(
+    'tests', 'mission_data', '2m132591087cfd1800p2977m2f1.img')
+FILE_3 = os.path.join(
+    'tests', 'mission_data', '1p190678905erp64kcp2600l8c1.img')
+
+
+def test_roi_table(qtbot, tmpdir):
+    test_set = pdsview.ImageSet([FILE_1, FILE_3], lazy=True)
+    measurement = test_set.measure_ROI(0, 0, 10, 10)
+    table = roi_table.ROITable(measurement)
+    qtbot.add_widget(table)
+    qtbot.waitUntil(lambda: table.measured == 2)
+    rows = list(measurement)
+    assert table.progress.text() == '2 of 2 images measured'
+    for row, stats in enumerate(rows):
+        assert table.table.item(row, 0).text() == stats.image
+        assert table.table.item(row, 1).text() == '100'
+        assert table.table.item(row, 2).text() == '%.4f' % (stats.mean)
+    path = tmpdir.join('roi.csv').strpath
+    table.export(path)
+    assert os.path.exists(path)
+
+
+def test_measure_all(qtbot):
+    test_set = pdsview.ImageSet([FILE_1, FILE_3])
+    viewer = pdsview.PDSViewer(test_set)
+    qtbot.add_widget(viewer)
+    image = viewer.current_image
+    assert viewer.current_ROI() == (0, 0, image.width, image.height)
+    viewer.measure_all()
+    table = viewer.roi_table_window
+    qtbot.waitUntil(lambda: table.measured == 2)
+    assert table.measurement.sides == (0, 0, image.width, image.height)
+
+
+def test_named_roi_table(qtbot, tmpdir):
+    test_set = pdsview.ImageSet([FILE_1, FILE_3])
+    viewer = pdsview.PDSViewer(test_set)
+    qtbot.add_widget(viewer)
+    viewer.named_ROIs_dialog()
+    table = viewer.named_ROIs_window
+    assert table.table.rowCount() == 0
+    assert viewer.add_named_ROI() == 'ROI 1'
+    viewer.add_named_ROI(name='corner')
+    assert table.table.rowCount() == 2
+    assert table.table.item(0, 0).text() == 'ROI 1'
+    assert table.table.item(1, 0).text() == 'corner'
+    # The named ROIs do not replace the drawn ROI
+    assert viewer._drawn_ROI() is None
+    assert viewer.view_canvas.objects[1] is viewer._named_ROIs
+    path = tmpdir.join('rois.json').strpath
+    table.save(path)
+    viewer.remove_named_ROI('ROI 1')
+    assert table.table.rowCount() == 1
+    image = viewer.current_image
+    pixels = '%d' % (image.width * image.height)
+    assert table.table.item(0, 1).text() == pixels
+    viewer.next_image()
+    assert viewer.current_image is not image
+    # The same ROI is measured in the next image
+    stats = viewer.image_set.ROI_stats(*viewer.image_set.rois['corner'])
+    assert table.table.item(0, 1).text() == '%d' % (stats.count)
+    assert table.table.item(0, 2).text() == '%.4f' % (stats.mean)
+    table.load(path)
+    assert table.table.rowCount() == 2
+    viewer.image_set.rois.clear()
+    viewer.named_ROIs_window.refresh()
+    assert table.table.rowCount() == 0
@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import os
+
+import numpy as np
+
+from pdsview import pdsview, rois
+
+FILE_3 = os.path.join(
+    'tests', 'mission_data', '1p190678905erp64kcp2600l8c1.img')
+
+
+def test_roi_set(tmpdir):
+    roi_set = rois.ROISet()
+    assert roi_set.add(0, 0, 10, 10) == 'ROI 1'
+    assert roi_set.add(5.5, 4.5, 20.5, 9.5, name='crater') == 'crater'
+    assert roi_set.add(1, 2, 3, 4) == 'ROI 3'
+    roi_set.remove('ROI 1')
+    assert roi_set.add(1, 2, 3, 5) == 'ROI 4'
+    assert list(roi_set) == ['crater', 'ROI 3', 'ROI 4']
+    path = tmpdir.join('rois.json').strpath
+    roi_set.save(path)
+    loaded = rois.ROISet.load(path)
+    assert loaded.items() == roi_set.items()
+    assert loaded['crater'] == (5.5, 4.5, 20.5, 9.5)
+
+
+def test_measure():
+    test_set = pdsview.ImageSet([FILE_3])
+    roi_set = test_set.rois
+    roi_set.add(9.5, 18.5, 11.5, 20.5)
+    roi_set.add(0, 0, 60, 50)
+    roi_set.add(-10, -10, 5, 3)
+    # Far from the others so it is cut out on its own
+    image = test_set.current_image[0]
+    roi_set.add(image.width - 4, image.height - 4, image.width, image.height)
+    stats = test_set.named_ROI_stats()
+    assert list(stats) == list(roi_set)
+    for name, (left, bottom, right, top) in roi_set.items():
+        data = test_set.ROI_data(
+            max(left, 0), max(bottom, 0), right, top)
+        assert stats[name].count == data.size
+        assert stats[name].mean == np.mean(data)
+        assert stats[name].median == np.median(data)
@@ -0,0 +1,265 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import os
+import threading
+from concurrent.futures import Future
+
+import pytest
+import numpy as np
+
+from pdsview import pdsview, stats
+
+FILE_3 = os.path.join(
+    'tests', 'mission_data', '1p190678905erp64kcp2600l8c1.img')
+FILE_4 = os.path.join(
+    'tests', 'mission_data', '2p129641989eth0361p2600r8m1.img')
+
+
+@pytest.mark.parametrize('dtype', [np.uint8, np.int16, np.float32])
+@pytest.mark.parametrize('chunk_pixels', [7, stats.CHUNK_PIXELS])
+def test_roi_stats(dtype, chunk_pixels):
+    data = np.random.RandomState(3).randint(0, 200, (23, 17)).astype(dtype)
+    # A cutout is not contiguous
+    data = data[2:20, 1:15]
+    roi = stats.roi_stats(data, chunk_pixels=chunk_pixels)
+    assert roi.count == data.size
+    assert roi.mean == pytest.approx(np.mean(data))
+    assert roi.std_dev == pytest.approx(np.std(data))
+    assert roi.minimum == data.min()
+    assert roi.maximum == data.max()
+    assert roi.minimum.dtype == data.dtype
+    assert roi.median == np.median(data)
+
+
+def test_roi_stats_bands():
+    data = np.random.RandomState(5).normal(1e6, 3, (40, 30, 3))
+    roi = stats.roi_stats(data, chunk_pixels=100)
+    for band in range(3):
+        assert roi.mean[band] == pytest.approx(np.mean(data[:, :, band]))
+        assert roi.std_dev[band] == pytest.approx(np.std(data[:, :, band]))
+        assert roi.minimum[band] == data[:, :, band].min()
+        assert roi.median[band] == np.median(data[:, :, band])
+    roi = stats.roi_stats(data, median=False, by_band=False)
+    assert roi.count == data.size
+    assert roi.std_dev == pytest.approx(np.std(data))
+    assert roi.median is None
+
+
+def test_roi_stats_nan():
+    data = np.arange(12, dtype=float).reshape(3, 4)
+    data[1, 2] = np.nan
+    roi = stats.roi_stats(data, chunk_pixels=4)
+    assert np.isnan(roi.mean)
+    assert np.isnan(roi.std_dev)
+    assert roi.minimum == 0
+    assert roi.maximum == 11
+    roi = stats.roi_stats(data[:0])
+    assert roi.count == 0
+    assert np.isnan(roi.mean)
+
+
+def test_image_set_ROI_stats():
+    test_set = pdsview.ImageSet([FILE_3])
+    roi = test_set.ROI_stats(9.5, 18.5, 11.5, 20.5)
+    data = test_set.ROI_data(9.5, 18.5, 11.5, 20.5)
+    assert roi.count == 4
+    assert round(roi.std_dev, 6) == test_set.ROI_std_dev(data=data)
+    assert round(roi.mean, 4) == test_set.ROI_mean(data=data)
+    assert roi.median == test_set.ROI_median(data=data)
+    assert roi.minimum == test_set.ROI_min(data=data)
+    assert roi.maximum == test_set.ROI_max(data=data)
+    assert roi.median == np.median(data)
+
+
+@pytest.mark.parametrize('dtype', [np.uint16, np.int16, np.float32])
+def test_summed_area_table(dtype):
+    data = np.random.RandomState(7).randint(-300, 3000, (41, 37))
+    data = data.astype(dtype)
+    table = stats.SummedAreaTable(data)
+    assert table.moments(0, 0, 5, 5) is None
+    table.wait()
+    assert table.nbytes == stats.SummedAreaTable.table_bytes(data)
+    for x1, y1, x2, y2 in [(0, 0, 37, 41), (3, 5, 20, 9), (36, 40, 60, 60)]:
+        count, mean, std_dev = table.moments(x1, y1, x2, y2)
+        roi = data[y1:y2, x1:x2].astype(np.float64)
+        assert count == roi.size
+        assert mean == pytest.approx(np.mean(roi), rel=1e-12)
+        assert std_dev == pytest.approx(np.std(roi), rel=1e-9, abs=1e-3)
+    assert table.moments(5, 5, 5, 9)[0] == 0
+
+
+def test_summed_area_table_invalid():
+    data = np.arange(48, dtype=np.float64).reshape(6, 8)
+    data[4, 6] = np.inf
+    table = stats.SummedAreaTable(data)
+    table.build(chunk_pixels=16)
+    assert table.moments(0, 0, 8, 6) is None
+    count, mean, std_dev = table.moments(0, 0, 8, 4)
+    assert mean == pytest.approx(np.mean(data[:4]))
+    assert data[4, 6] == np.inf
+
+
+def test_image_stamp_summed_area():
+    test_set = pdsview.ImageSet([FILE_3], lazy=True)
+    image = test_set.current_image[0]
+    table = image.summed_area_table()
+    table.wait()
+    assert test_set.ROI_moments(9.5, 18.5, 11.5, 20.5) == table.moments(
+        10, 19, 12, 21)
+    assert test_set.ROI_std_dev(9.5, 18.5, 11.5, 20.5) == round(
+        np.std(test_set.ROI_data(9.5, 18.5, 11.5, 20.5)), 6)
+    assert image.nbytes + image.mapped_bytes == (
+        image.data.nbytes + table.nbytes)
+    image.unload()
+    assert image.summed_area is None
+
+
+@pytest.mark.parametrize('dtype', [np.uint8, np.int16, np.uint16, np.float64])
+def test_roi_percentiles(dtype):
+    info = np.iinfo(dtype) if dtype != np.float64 else np.iinfo(np.int16)
+    data = np.random.RandomState(11).randint(
+        info.min, info.max, (30, 21, 3)).astype(dtype)
+    q = [0, 10, 25, 50, 90, 99.5, 100]
+    percentiles = stats.roi_percentiles(data, q, chunk_pixels=50)
+    for band in range(3):
+        assert np.allclose(
+            percentiles[band], np.percentile(data[:, :, band], q))
+    assert np.allclose(
+        stats.roi_percentiles(data, q, by_band=False),
+        np.percentile(data, q))
+    # The median from the value counts is the same as numpy's
+    roi = stats.roi_stats(data[1:, :20, 0], chunk_pixels=50)
+    assert roi.median == np.median(data[1:, :20, 0])
+
+
+def test_image_set_ROI_percentiles():
+    test_set = pdsview.ImageSet([FILE_3])
+    data = test_set.ROI_data(0, 0, 60, 50)
+    assert np.array_equal(
+        test_set.ROI_percentiles([5, 50, 95], 0, 0, 60, 50),
+        np.percentile(data, [5, 50, 95]))
+
+
+def test_image_set_ROI_estimate(monkeypatch):
+    test_set = pdsview.ImageSet([FILE_3])
+    data = test_set.ROI_data(0, 0, 60, 50)
+    # Sample every other line and sample without summed-area tables
+    monkeypatch.setattr(pdsview, 'SUMMED_AREA_MAX_BYTES', 0)
+    count, mean, std_dev = test_set.ROI_estimate(0, 0, 60, 50, max_pixels=900)
+    assert count == data.size
+    assert mean == pytest.approx(np.mean(data[::2, ::2]))
+    assert std_dev == pytest.approx(np.std(data[::2, ::2]))
+    monkeypatch.undo()
+    test_set.current_image[0].summed_area_table().wait()
+    count, mean, std_dev = test_set.ROI_estimate(0, 0, 60, 50, max_pixels=900)
+    assert mean == pytest.approx(np.mean(data))
+
+
+@pytest.mark.parametrize('dtype', [np.uint8, np.int16, np.float32])
+def test_roi_stats_mask(dtype):
+    random = np.random.RandomState(13)
+    data = random.randint(0, 200, (30, 3, 20)).astype(dtype)
+    data = data.transpose(0, 2, 1)
+    mask = random.rand(30, 20) > 0.6
+    roi = stats.roi_stats(data, mask=mask, chunk_pixels=50)
+    pixels = data[mask]
+    assert roi.count == mask.sum()
+    assert np.allclose(roi.mean, pixels.mean(axis=0))
+    assert np.allclose(roi.std_dev, pixels.astype(np.float64).std(axis=0))
+    assert np.array_equal(roi.minimum, pixels.min(axis=0))
+    assert np.array_equal(roi.maximum, pixels.max(axis=0))
+    assert np.array_equal(roi.median, np.median(pixels, axis=0))
+    roi = stats.roi_stats(data, mask=mask, by_band=False)
+    assert roi.count == pixels.size
+    assert roi.mean == pytest.approx(np.mean(pixels, dtype=np.float64))
+    assert np.allclose(
+        stats.roi_percentiles(data[:, :, 0], [10, 50], mask=mask),
+        np.percentile(pixels[:, 0], [10, 50]))
+
+
+def test_image_stamp_whole_stats(monkeypatch):
+    monkeypatch.setattr(pdsview, 'BACKGROUND_STATS_PIXELS', 0)
+    test_set = pdsview.ImageSet([FILE_3], lazy=True)
+    image = test_set.current_image[0]
+    whole_stats = image.whole_stats()
+    assert image.whole_stats() is whole_stats
+    roi = whole_stats.result()
+    assert roi == stats.roi_stats(image.data)
+    # The statistics are kept for when the image is displayed again
+    image.unload()
+    assert image.whole_stats() is whole_stats
+    image.set_data(np.zeros((3, 3)))
+    assert image.whole_stats() is None
+
+
+def test_cancel_whole_stats(monkeypatch):
+    monkeypatch.setattr(pdsview, 'BACKGROUND_STATS_PIXELS', 0)
+    test_set = pdsview.ImageSet([FILE_3, FILE_4], lazy=True)
+    first = test_set.current_image[0]
+    # Keep the statistics waiting behind another calculation
+    started = threading.Event()
+    stats._executor.submit(started.wait)
+    whole_stats = first.whole_stats()
+    test_set.current_image_index = 1
+    assert whole_stats.cancelled()
+    assert first._whole_stats is None
+    second = test_set.current_image[0]
+    whole_stats = second.whole_stats()
+    # The band is taken when the statistics start being found
+    second.unload()
+    assert whole_stats.cancelled()
+    skipped = stats.start_roi_stats(lambda: None)
+    started.set()
+    assert skipped.result() is None
+    test_set.current_image_index = 0
+    assert first.whole_stats().result() == stats.roi_stats(first.data)
+
+
+def test_deferred_whole_stats(qtbot, monkeypatch):
+    monkeypatch.setattr(pdsview, 'BACKGROUND_STATS_PIXELS', 0)
+    test_set = pdsview.ImageSet([FILE_3])
+    viewer = pdsview.PDSViewer(test_set)
+    qtbot.add_widget(viewer)
+    image = viewer.current_image
+    qtbot.waitUntil(lambda: '????' not in viewer.mean.text())
+    roi = image.whole_stats().result()
+    assert viewer.pixels.text() == '#Pixels: %d' % (roi.count)
+    assert viewer.mean.text() == 'Mean: %.4f' % (roi.mean)
+    assert viewer.median.text() == 'Median: %.1f' % (roi.median)
+
+
+@pytest.mark.parametrize('dtype', [np.uint8, np.dtype('>i2'), np.uint16])
+def test_value_counts(dtype):
+    data = np.random.RandomState(17).randint(-50, 250, (31, 19))
+    data = data.astype(dtype)[::2]
+    values, counts = stats.value_counts(data, chunk_pixels=40)
+    expected_values, expected_counts = np.unique(data, return_counts=True)
+    assert np.array_equal(values, expected_values)
+    assert np.array_equal(counts, expected_counts)
+    with pytest.raises(TypeError):
+        stats.value_counts(data.astype(np.float32))
+
+
+def test_deferred_ROI_stats(qtbot, monkeypatch):
+    test_set = pdsview.ImageSet([FILE_3])
+    viewer = pdsview.PDSViewer(test_set)
+    qtbot.add_widget(viewer)
+    monkeypatch.setattr(pdsview, 'BACKGROUND_STATS_PIXELS', 0)
+    future = Future()
+    monkeypatch.setattr(
+        pdsview, 'start_roi_stats', lambda data, **kwargs: future)
+    sides = (9.5, 18.5, 41.5, 40.5)
+    viewer.set_ROI_text(*sides)
+    # The count, mean and std dev are shown while the rest is found
+    count, mean, std_dev = test_set.ROI_estimate(*sides)
+    assert viewer.pixels.text() == '#Pixels: %d' % (count)
+    assert viewer.mean.text().startswith('Mean: %.4f' % (mean))
+    assert viewer.median.text() == 'Median: ????'
+    assert viewer.max.text() == 'Max: ????'
+    roi = stats.roi_stats(test_set.ROI_data(*sides), by_band=False)
+    future.set_result(roi)
+    qtbot.waitUntil(lambda: '????' not in viewer.median.text())
+    assert viewer.mean.text() == 'Mean: %.4f' % (roi.mean)
+    assert viewer.median.text() == 'Median: %.1f' % (roi.median)
+    assert viewer.max.text() == 'Max: %d' % (roi.maximum)
+    assert test_set.ROI_stats(*sides, by_band=False) is roi
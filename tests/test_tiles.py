@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import os
+
+import pytest
+import numpy as np
+from planetaryimage import PDS3Image
+
+from pdsview import pdsview, reader, tiles
+
+FILE_3 = os.path.join(
+    'tests', 'mission_data', '1p190678905erp64kcp2600l8c1.img')
+FILE_6 = os.path.join(
+    'tests', 'mission_data', '0047MH0000110010100214C00_DRCL.IMG')
+
+
+@pytest.mark.parametrize(
+    'view',
+    [
+        np.s_[:, :],
+        np.s_[5:300, 17:40],
+        np.s_[1:-1:3, 2:50:7],
+        np.s_[10, 20],
+        np.s_[-1, :],
+        np.s_[0:0, :],
+        np.s_[np.arange(0, 40, 3).reshape(-1, 1), np.arange(5, 9)],
+        np.s_[np.arange(2, 20).reshape(-1, 1) // 2, np.arange(20) // 3],
+    ])
+def test_tiled_image(view):
+    bands, label_array, layout = reader.probe_product(FILE_6)
+    mapped = reader.MappedPDS3Image(FILE_6, label_array, layout).data
+    for band in range(bands):
+        tiled = tiles.TiledImage(
+            layout, band, tile_size=16, cache=tiles.TileCache())
+        assert np.array_equal(tiled[view], mapped[band][view])
+
+
+def test_tile_cache():
+    bands, label_array, layout = reader.probe_product(FILE_3)
+    tile_bytes = 16 * 16 * layout[2].itemsize
+    cache = tiles.TileCache(max_bytes=4 * tile_bytes)
+    tiled = tiles.TiledImage(layout, tile_size=16, cache=cache)
+    tiled[0:32, 0:32]
+    assert cache.misses == 4
+    tiled[10, 10]
+    assert cache.hits == 1
+    tiled[0:16, 32:48]
+    assert len(cache) == 4
+    assert cache.resident_bytes == 4 * tile_bytes
+
+
+def test_image_stamp(monkeypatch):
+    monkeypatch.setattr(pdsview, 'TILED_MIN_BYTES', 0)
+    test_set = pdsview.ImageSet([FILE_3])
+    image = test_set.current_image[0]
+    assert image.tiles is not None
+    expected = PDS3Image.open(FILE_3).image
+    assert np.array_equal(
+        test_set.ROI_data(3, 4, 60, 70), expected[4:70, 3:60])
+    assert image.get_data_xy(7, 9) == expected[9, 7]